@@ -5,6 +5,7 @@ import os
 from datetime import datetime
 from typing import Dict, List, Optional
 from audio_utils import start_recording_to_file, encrypt_file
+from audio_source import create_source
 
 # TODO: Uncomment and configure when ready to use
 # from twilio.rest import Client
@@ -29,6 +30,11 @@ class ActionManager:
                 - recordings_dir: where to save recordings
                 - contacts: list of contact dicts with 'phone' and/or 'email'
                 - grace_period: seconds before triggering (default 0)
+                - preroll_seconds: audio before the trigger to include in
+                  recordings taken from a live listener (default 5)
+                - audio_source: source config for recordings made without a
+                  live listener (see audio_source.create_source; default
+                  microphone)
         """
         self.config = config or {}
         self.recordings_dir = self.config.get('recordings_dir', 'data/recordings')
@@ -36,6 +42,10 @@ class ActionManager:
         self.encrypt_recordings = self.config.get('encrypt_recordings', True)
         self.contacts = self.config.get('contacts', [])
         self.grace_period = self.config.get('grace_period', 0)
+        self.preroll_seconds = self.config.get('preroll_seconds', 5)
+        
+        # Running listener to record from instead of reopening the microphone
+        self.live_audio = None
         
         # Create recordings directory
         os.makedirs(self.recordings_dir, exist_ok=True)
@@ -44,6 +54,16 @@ class ActionManager:
         self.last_trigger_time: Optional[float] = None
         self.min_trigger_interval = 60  # seconds
     
+    def attach_live_audio(self, source) -> None:
+        """
+        Record alerts from a running listener.
+        
+        Args:
+            source: Object with is_listening and record_to_file(duration,
+                path, preroll_seconds), e.g. VoskWakeWordDetector
+        """
+        self.live_audio = source
+    
     def trigger_actions(self) -> Dict[str, any]:
         """
         Execute all configured actions when safe word is detected.
@@ -100,7 +120,18 @@ class ActionManager:
         filepath = os.path.join(self.recordings_dir, filename)
         
         print(f"Recording {self.record_duration}s audio clip...")
-        result = start_recording_to_file(self.record_duration, filepath)
+        if (self.live_audio is not None and hasattr(self.live_audio, 'record_to_file')
+                and self.live_audio.is_listening):
+            # Includes pre-roll from before the trigger and reuses the open stream
+            result = self.live_audio.record_to_file(
+                self.record_duration, filepath, self.preroll_seconds
+            )
+        else:
+            try:
+                source = create_source(self.config.get('audio_source'))
+                result = start_recording_to_file(self.record_duration, filepath, source=source)
+            except ValueError as e:
+                result = {'success': False, 'error': str(e)}
         
         if result['success']:
             print(f"✓ Recording saved: {filepath}")
@@ -3,27 +3,54 @@ Flask backend for SafeWord detection system.
 Provides REST API for training, detection, and action management.
 """
 import os
+import json
 import shutil
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 
-from ovos_runner import ovos_runner
-from vosk_wakeword import vosk_detector  # Use working Vosk detector
+from engine_registry import get_engine, list_engines, warm_up
+from model_registry import model_registry
 from audio_utils import save_sample
 from actions import action_manager
+from session_manager import SessionStream
 
-# Use Vosk detector instead of broken OVOS plugin
-wake_word_detector = vosk_detector
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None  # WebSocket ingest is optional: pip install flask-sock
 
 # Load environment variables
 load_dotenv()
 
+# Use Vosk detector instead of broken OVOS plugin (model loads lazily).
+# DETECTOR_PROCESS=true runs it in a child process, away from Flask's GIL;
+# DETECTOR_ENGINE=ensemble runs the engines from the 'ensemble' config
+# section side by side on one capture.
+# Detection sessions (/sessions, /stream, /ws/detect) always decode in this
+# process on the in-process 'vosk' engine: with vosk-process, the first
+# session loads a second copy of the Vosk model here and its decoding
+# shares Flask's GIL.
+DETECTOR_ENGINE = os.getenv('DETECTOR_ENGINE') or (
+    'vosk-process' if os.getenv('DETECTOR_PROCESS', 'false').lower() == 'true' else 'vosk'
+)
+# Engines with the full detector interface the routes below use (model
+# readiness, record_to_file, hotword config); 'ovos' and 'sessions' lack it
+DETECTOR_ENGINES = ('vosk', 'vosk-process', 'ensemble')
+if DETECTOR_ENGINE not in DETECTOR_ENGINES:
+    raise ValueError(f"DETECTOR_ENGINE must be one of {', '.join(DETECTOR_ENGINES)}, "
+                     f"not '{DETECTOR_ENGINE}'")
+wake_word_detector = get_engine(DETECTOR_ENGINE)
+
+# Alert recordings come from the listener's stream, including pre-roll
+action_manager.attach_live_audio(wake_word_detector)
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
+sock = Sock(app) if Sock else None
 
 # In-memory store for detection events
 detection_events = []
@@ -41,8 +68,21 @@ os.makedirs(MODELS_DIR, exist_ok=True)
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint."""
-    return jsonify({'status': 'healthy', 'service': 'safeword-backend'})
+    """Health check endpoint. Answers immediately, even while the model loads."""
+    return jsonify({
+        'status': 'healthy',
+        'service': 'safeword-backend',
+        'ready': wake_word_detector.is_ready,
+        'model': {
+            'loaded': wake_word_detector.is_ready,
+            'loading': wake_word_detector.model_loading,
+            'error': wake_word_detector.model_error,
+            'load_time': wake_word_detector.model_load_time
+        },
+        'engines': list_engines(),
+        # Models shared by this process's engines, with their memory cost
+        'models': model_registry.get_stats()
+    })
 
 
 @app.route('/check-precise', methods=['GET'])
@@ -288,23 +328,28 @@ def start_detection():
     Start listening for the wake word.
     
     Expected JSON body:
-        - threshold: detection sensitivity 0-1 (optional, default 0.5)
-        - hotword_name: which hotword config to use (optional, default 'safe_word')
+        - threshold: minimum word confidence 0-1 (optional, default from
+          each hotword's sensitivity)
+        - hotword_name: which hotword config to use (optional, default all
+          hotwords with listen enabled)
     """
     data = request.get_json() or {}
-    threshold = data.get('threshold', 0.5)
-    hotword_name = data.get('hotword_name', 'safe_word')
+    threshold = data.get('threshold')
+    hotword_name = data.get('hotword_name')
     
     # Define callback for detection events
-    def on_detection():
+    def on_detection(detection=None):
         """Called when wake word is detected."""
         timestamp = datetime.now().isoformat()
         print(f"\n🚨 WAKE WORD DETECTED at {timestamp}! 🚨\n")
         
-        # Add to events list
+        # Add to events list (the detection dict is filled in later with
+        # early-trigger confirmation and latency saved, so keep the reference)
         detection_events.insert(0, {
             'timestamp': timestamp,
-            'message': 'Wake word detected!'
+            'message': 'Wake word detected!',
+            'hotword': detection.get('hotword') if detection else hotword_name,
+            'detection': detection
         })
         # Keep only last 20 events
         if len(detection_events) > 20:
@@ -360,6 +405,141 @@ def get_status():
     })
 
 
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    """
+    Create a detection session with its own recognizer on the shared model.
+    
+    Expected JSON body:
+        - hotword_name: which hotword config to use (optional, default all
+          hotwords with listen enabled)
+    """
+    data = request.get_json(silent=True) or {}
+    result = get_engine('sessions').create_session(data.get('hotword_name'), record_session_detection)
+    return jsonify(result), 200 if result['success'] else 400
+
+
+def record_session_detection(session_id, detection):
+    """Record detections from remote sessions alongside local ones."""
+    detection_events.insert(0, {
+        'timestamp': datetime.now().isoformat(),
+        'message': f'Wake word detected in session {session_id}!',
+        'hotword': detection.get('hotword'),
+        'detection': detection
+    })
+    if len(detection_events) > 20:
+        detection_events.pop()
+
+
+@app.route('/sessions', methods=['GET'])
+def list_sessions():
+    """List detection sessions with per-session throughput."""
+    return jsonify(get_engine('sessions').list_sessions()), 200
+
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def destroy_session(session_id):
+    """Close a detection session."""
+    result = get_engine('sessions').destroy_session(session_id)
+    return jsonify(result), 200 if result['success'] else 404
+
+
+@app.route('/sessions/<session_id>/audio', methods=['POST'])
+def feed_session(session_id):
+    """
+    Feed raw audio to a session.
+    
+    Body: 16 kHz mono 16-bit little-endian PCM (application/octet-stream).
+    Returns any detections since the previous call.
+    """
+    result = get_engine('sessions').feed(session_id, request.get_data())
+    if result.get('busy'):
+        # The session is still decoding earlier audio; the client should back off
+        return jsonify(result), 429
+    return jsonify(result), 200 if result['success'] else 400
+
+
+@app.route('/stream', methods=['POST'])
+def stream_audio():
+    """
+    Stream audio over one chunked HTTP request and receive detections as it runs.
+    
+    Query parameters:
+        - hotword_name: which hotword config to use (optional)
+    
+    Body: 16 kHz mono 16-bit little-endian PCM, sent with chunked transfer
+    encoding. The response is newline-delimited JSON: a 'session' line, a
+    'detection' line per detection as soon as it is decoded, and a final
+    'closed' line with the session stats.
+    """
+    stream = SessionStream(get_engine('sessions'), request.args.get('hotword_name'),
+                           record_session_detection)
+    if not stream.opened['success']:
+        return jsonify(stream.opened), 400
+    
+    def events():
+        try:
+            yield json.dumps(dict(stream.opened, type='session')) + '\n'
+            while True:
+                chunk = request.stream.read(3200)
+                if not chunk:
+                    break
+                result = stream.write(chunk)
+                if not result['success']:
+                    # Sender kept outrunning the decoder past the write timeout
+                    yield json.dumps(dict(result, type='error')) + '\n'
+                    break
+                for detection in stream.detections():
+                    yield json.dumps(dict(detection, type='detection')) + '\n'
+            for detection in stream.finish():
+                yield json.dumps(dict(detection, type='detection')) + '\n'
+        finally:
+            closed = stream.close()
+        yield json.dumps(dict(closed, type='closed')) + '\n'
+    
+    return Response(stream_with_context(events()), mimetype='application/x-ndjson')
+
+
+if sock:
+    @sock.route('/ws/detect')
+    def stream_audio_ws(ws):
+        """
+        WebSocket audio ingest with detections pushed back on the same socket.
+        
+        Query parameters:
+            - hotword_name: which hotword config to use (optional)
+        
+        Client messages: binary frames of 16 kHz mono 16-bit PCM, and
+        {"type": "end"} to finish. Server messages: JSON 'session',
+        'detection' and 'closed' events as for /stream, or 'error'.
+        """
+        stream = SessionStream(get_engine('sessions'), request.args.get('hotword_name'),
+                               record_session_detection)
+        if not stream.opened['success']:
+            ws.send(json.dumps(dict(stream.opened, type='error')))
+            return
+        
+        try:
+            ws.send(json.dumps(dict(stream.opened, type='session')))
+            while True:
+                message = ws.receive(timeout=0.05)
+                if isinstance(message, bytes):
+                    result = stream.write(message)
+                    if not result['success']:
+                        ws.send(json.dumps(dict(result, type='error')))
+                        if result.get('busy'):
+                            break
+                elif message and json.loads(message).get('type') == 'end':
+                    break
+                for detection in stream.detections():
+                    ws.send(json.dumps(dict(detection, type='detection')))
+            for detection in stream.finish():
+                ws.send(json.dumps(dict(detection, type='detection')))
+        finally:
+            closed = stream.close()
+        ws.send(json.dumps(dict(closed, type='closed')))
+
+
 @app.route('/trigger-action', methods=['POST'])
 def trigger_action():
     """Manually trigger actions (for testing)."""
@@ -377,6 +557,7 @@ def configure_actions():
         - encrypt_recordings: boolean
         - contacts: array of {phone, email}
         - grace_period: seconds before triggering
+        - preroll_seconds: seconds of audio before the trigger to keep
     """
     config = request.get_json()
     
@@ -386,6 +567,7 @@ def configure_actions():
     action_manager.encrypt_recordings = config.get('encrypt_recordings', True)
     action_manager.contacts = config.get('contacts', [])
     action_manager.grace_period = config.get('grace_period', 0)
+    action_manager.preroll_seconds = config.get('preroll_seconds', 5)
     
     return jsonify({
         'success': True,
@@ -421,6 +603,11 @@ if __name__ == '__main__':
         print(f"  Key phrase: {config.get('key_phrase', 'Not configured')}")
         print(f"  Sensitivity: {config.get('sensitivity', 0.5)}")
     
+    # Load the model in the background so the port binds immediately
+    if os.getenv('MODEL_WARMUP', 'true').lower() == 'true':
+        warm_up(DETECTOR_ENGINE)
+        print("\nLoading Vosk model in the background (see /health for readiness)")
+    
     print("\nStarting server on http://127.0.0.1:5001")
     print("="*50 + "\n")
     
@@ -0,0 +1,322 @@
+"""
+Audio sources for the detectors and the recording action.
+Every source pushes mono int16 PCM blocks to a callback, the same shape a
+sounddevice input callback produces, so the microphone can be swapped for a
+WAV replay, a raw PCM socket or a synthetic signal on headless machines.
+"""
+import socket
+import threading
+import time
+import wave
+from typing import Optional, Callable, Dict, Any, Iterator, List, Union
+import numpy as np
+
+
+class AudioSource:
+    """Produces mono int16 PCM blocks and pushes them to a callback."""
+
+    type = 'base'
+    # False when the source produces audio faster than real time, so the
+    # consumer should apply back-pressure instead of dropping audio
+    realtime = True
+
+    def __init__(self, sample_rate: int = 16000, block_size: int = 1600):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.samples_produced = 0
+        self.finished = False
+        # Input overflows reported by the device (xruns)
+        self.overflows = 0
+
+    def start(self, callback: Callable[[np.ndarray], None]) -> None:
+        """Start producing audio; callback receives each int16 block."""
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        """Stop producing audio."""
+        raise NotImplementedError
+
+    @property
+    def is_active(self) -> bool:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Source type and how much audio it has produced."""
+        return {
+            'type': self.type,
+            'sample_rate': self.sample_rate,
+            'block_size': self.block_size,
+            'realtime': self.realtime,
+            'active': self.is_active,
+            'seconds_produced': round(self.samples_produced / self.sample_rate, 2),
+            'overflows': self.overflows,
+            'finished': self.finished
+        }
+
+
+class MicrophoneSource(AudioSource):
+    """Live capture through a sounddevice raw int16 input stream."""
+
+    type = 'microphone'
+
+    def __init__(self, sample_rate: int = 16000, block_size: int = 1600,
+                 device: Optional[Union[int, str]] = None):
+        super().__init__(sample_rate, block_size)
+        self.device = device
+        self.stream = None
+
+    def start(self, callback: Callable[[np.ndarray], None]) -> None:
+        import sounddevice as sd
+
+        def audio_callback(indata, frames, time_info, status):
+            if status:
+                if status.input_overflow:
+                    self.overflows += 1
+                print(f"Audio status: {status}")
+            self.samples_produced += frames
+            # Zero-copy view of the PortAudio buffer
+            callback(np.frombuffer(indata, dtype=np.int16))
+
+        self.stream = sd.RawInputStream(
+            samplerate=self.sample_rate,
+            blocksize=self.block_size,
+            dtype='int16',
+            channels=1,
+            device=self.device,
+            callback=audio_callback
+        )
+        self.stream.start()
+
+    def stop(self) -> None:
+        if self.stream:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.stream is not None and self.stream.active
+
+
+class _ThreadedSource(AudioSource):
+    """Base for sources that generate blocks on their own thread."""
+
+    def __init__(self, sample_rate: int = 16000, block_size: int = 1600,
+                 realtime: bool = True):
+        super().__init__(sample_rate, block_size)
+        self.realtime = realtime
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _blocks(self) -> Iterator[np.ndarray]:
+        """Yield int16 blocks until exhausted or stopped."""
+        raise NotImplementedError
+
+    def start(self, callback: Callable[[np.ndarray], None]) -> None:
+        self._stop.clear()
+        self.finished = False
+        self._thread = threading.Thread(target=self._run, args=(callback,), daemon=True)
+        self._thread.start()
+
+    def _run(self, callback: Callable[[np.ndarray], None]) -> None:
+        start = time.perf_counter()
+        sent = 0
+        try:
+            for block in self._blocks():
+                if self._stop.is_set():
+                    break
+                if self.realtime:
+                    # Pace delivery to the clock, as a microphone would
+                    delay = start + sent / self.sample_rate - time.perf_counter()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                callback(block)
+                sent += len(block)
+                self.samples_produced += len(block)
+        except Exception as e:
+            print(f"Error in {self.type} audio source: {e}")
+        self.finished = True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    @property
+    def is_active(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+class WavFileSource(_ThreadedSource):
+    """Replays 16-bit mono WAV files, in real time or as fast as possible."""
+
+    type = 'file'
+
+    def __init__(self, paths: Union[str, List[str]], sample_rate: int = 16000,
+                 block_size: int = 1600, realtime: bool = True, loop: bool = False):
+        """
+        Initialize source.
+
+        Args:
+            paths: WAV file or list of files, played back to back
+            realtime: Pace blocks to the wall clock; otherwise push them as
+                fast as the consumer accepts them
+            loop: Start over after the last file
+
+        Raises:
+            ValueError: If a file is not 16-bit mono at the sample rate
+        """
+        super().__init__(sample_rate, block_size, realtime)
+        self.paths = [paths] if isinstance(paths, str) else list(paths)
+        self.loop = loop
+        for path in self.paths:
+            with wave.open(path, 'rb') as wf:
+                if (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) != (1, 2, sample_rate):
+                    raise ValueError(f'{path}: expected {sample_rate} Hz mono 16-bit PCM')
+
+    def _blocks(self) -> Iterator[np.ndarray]:
+        while True:
+            for path in self.paths:
+                with wave.open(path, 'rb') as wf:
+                    while not self._stop.is_set():
+                        frames = wf.readframes(self.block_size)
+                        if not frames:
+                            break
+                        yield np.frombuffer(frames, dtype=np.int16)
+            if not self.loop or self._stop.is_set():
+                return
+
+
+class SocketSource(_ThreadedSource):
+    """Accepts TCP connections streaming raw int16 mono PCM."""
+
+    type = 'socket'
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 5002,
+                 sample_rate: int = 16000, block_size: int = 1600):
+        super().__init__(sample_rate, block_size, realtime=False)
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self._server: Optional[socket.socket] = None
+
+    def start(self, callback: Callable[[np.ndarray], None]) -> None:
+        self._server = socket.create_server((self.host, self.port))
+        self._server.settimeout(0.5)
+        # Bound port, useful when port 0 picked a free one
+        self.port = self._server.getsockname()[1]
+        super().start(callback)
+
+    def _blocks(self) -> Iterator[np.ndarray]:
+        block_bytes = self.block_size * 2
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn, _ = self._server.accept()
+                except socket.timeout:
+                    continue
+                self.connections += 1
+                conn.settimeout(0.5)
+                pending = bytearray()
+                with conn:
+                    while not self._stop.is_set():
+                        try:
+                            chunk = conn.recv(block_bytes)
+                        except socket.timeout:
+                            continue
+                        if not chunk:
+                            break
+                        pending += chunk
+                        while len(pending) >= block_bytes:
+                            yield np.frombuffer(bytes(pending[:block_bytes]), dtype=np.int16)
+                            del pending[:block_bytes]
+                    usable = len(pending) - len(pending) % 2
+                    if usable:
+                        yield np.frombuffer(bytes(pending[:usable]), dtype=np.int16)
+        finally:
+            self._server.close()
+
+    def stop(self) -> None:
+        super().stop()
+        self._server = None
+
+
+class SyntheticSource(_ThreadedSource):
+    """Deterministic silence, noise or tone for headless tests and benchmarks."""
+
+    type = 'synthetic'
+
+    def __init__(self, kind: str = 'noise', sample_rate: int = 16000, block_size: int = 1600,
+                 realtime: bool = True, duration: Optional[float] = None,
+                 amplitude: float = 0.1, frequency: float = 440.0, seed: int = 0):
+        """
+        Initialize source.
+
+        Args:
+            kind: 'silence', 'noise' or 'tone'
+            duration: Seconds to produce (None runs until stopped)
+            amplitude: Peak level as a fraction of full scale
+            frequency: Tone frequency in Hz
+            seed: Noise seed, so runs are repeatable
+        """
+        if kind not in ('silence', 'noise', 'tone'):
+            raise ValueError(f'Unknown synthetic signal: {kind}')
+        super().__init__(sample_rate, block_size, realtime)
+        self.kind = kind
+        self.duration = duration
+        self.amplitude = amplitude
+        self.frequency = frequency
+        self.seed = seed
+
+    def _blocks(self) -> Iterator[np.ndarray]:
+        rng = np.random.default_rng(self.seed)
+        scale = self.amplitude * 32767
+        total = None if self.duration is None else int(self.duration * self.sample_rate)
+        produced = 0
+        while total is None or produced < total:
+            n = self.block_size if total is None else min(self.block_size, total - produced)
+            if self.kind == 'silence':
+                block = np.zeros(n, dtype=np.int16)
+            elif self.kind == 'noise':
+                block = (rng.standard_normal(n) * scale / 3).clip(-32768, 32767).astype(np.int16)
+            else:
+                t = (produced + np.arange(n)) / self.sample_rate
+                block = (np.sin(2 * np.pi * self.frequency * t) * scale).astype(np.int16)
+            produced += n
+            yield block
+
+
+def create_source(source_config: Optional[Dict[str, Any]] = None, sample_rate: int = 16000,
+                  block_size: int = 1600) -> AudioSource:
+    """
+    Build an audio source from an 'audio_source' config section.
+
+    Args:
+        source_config: Dict with 'type' (microphone, file, socket or
+            synthetic) and that source's options; empty means microphone
+
+    Raises:
+        ValueError: For an unknown source type or missing required options
+    """
+    source_config = dict(source_config or {})
+    source_type = source_config.pop('type', 'microphone')
+
+    if source_type == 'microphone':
+        return MicrophoneSource(sample_rate, block_size, device=source_config.get('device'))
+    if source_type == 'file':
+        if not source_config.get('paths'):
+            raise ValueError('File audio source needs "paths" (a WAV file or list of WAV files)')
+        return WavFileSource(
+            source_config['paths'], sample_rate, block_size,
+            realtime=source_config.get('realtime', True),
+            loop=source_config.get('loop', False)
+        )
+    if source_type == 'socket':
+        return SocketSource(
+            source_config.get('host', '127.0.0.1'), source_config.get('port', 5002),
+            sample_rate, block_size
+        )
+    if source_type == 'synthetic':
+        return SyntheticSource(sample_rate=sample_rate, block_size=block_size, **source_config)
+    raise ValueError(f'Unknown audio source type: {source_type}')
@@ -4,6 +4,7 @@ Audio utilities for saving samples and recording triggered audio.
 import os
 import wave
 import time
+import threading
 from datetime import datetime
 from typing import Optional
 from cryptography.fernet import Fernet
@@ -53,65 +54,90 @@ def save_sample(wav_bytes: bytes, label: str, data_dir: str) -> dict:
         return {'success': False, 'error': str(e)}
 
 
-def start_recording_to_file(duration: int, output_path: str, sample_rate: int = 16000) -> dict:
+def start_recording_to_file(duration: int, output_path: str, sample_rate: int = 16000,
+                            source=None, timeout: Optional[float] = None) -> dict:
     """
-    Record audio from microphone to file (used when alert is triggered).
+    Record audio to file (used when alert is triggered).
     
     Args:
         duration: Recording duration in seconds
         output_path: Path to save the recording
         sample_rate: Audio sample rate
+        source: AudioSource to record from (default: the microphone)
+        timeout: Wall-clock seconds to wait for the audio (default:
+            duration + 5); whatever arrived by then is saved
         
     Returns:
         Dict with success status and file info
     """
+    from audio_source import MicrophoneSource
+    
+    source = source or MicrophoneSource(sample_rate)
+    total = int(duration * source.sample_rate)
+    chunks = []
+    collected = 0
+    done = threading.Event()
+    
+    def on_audio(samples):
+        nonlocal collected
+        if done.is_set():
+            return
+        chunks.append(samples.copy())
+        collected += len(samples)
+        if collected >= total:
+            done.set()
+    
     try:
-        import pyaudio
-        
-        CHUNK = 1024
-        FORMAT = pyaudio.paInt16
-        CHANNELS = 1
-        
-        audio = pyaudio.PyAudio()
-        
         print(f"Recording {duration} seconds to {output_path}...")
+        source.start(on_audio)
+        try:
+            # Finite sources (e.g. a WAV replay) may end before the duration,
+            # and any source may stall (a socket nobody connects to)
+            deadline = time.time() + (duration + 5 if timeout is None else timeout)
+            while not done.wait(0.1):
+                if source.finished or time.time() > deadline:
+                    break
+        finally:
+            source.stop()
+    except ImportError:
+        return {'success': False, 'error': 'sounddevice not installed. Install with: pip install sounddevice'}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+    
+    pcm = b''.join(chunk.tobytes() for chunk in chunks)[:total * 2]
+    result = write_wav(output_path, pcm, source.sample_rate)
+    if result['success']:
+        print(f"Recording saved to {output_path}")
+        result['duration'] = round(len(pcm) / 2 / source.sample_rate, 2)
+        result['source'] = source.type
+    return result
+
+
+def write_wav(output_path: str, pcm: bytes, sample_rate: int = 16000, channels: int = 1) -> dict:
+    """
+    Write 16-bit PCM audio to a WAV file.
+    
+    Args:
+        output_path: Path to save the WAV file
+        pcm: Raw int16 little-endian samples
+        sample_rate: Audio sample rate
+        channels: Number of interleaved channels
         
-        stream = audio.open(
-            format=FORMAT,
-            channels=CHANNELS,
-            rate=sample_rate,
-            input=True,
-            frames_per_buffer=CHUNK
-        )
-        
-        frames = []
-        
-        for i in range(0, int(sample_rate / CHUNK * duration)):
-            data = stream.read(CHUNK)
-            frames.append(data)
-        
-        stream.stop_stream()
-        stream.close()
-        audio.terminate()
-        
-        # Save to WAV file
+    Returns:
+        Dict with success status and file info
+    """
+    try:
         with wave.open(output_path, 'wb') as wf:
-            wf.setnchannels(CHANNELS)
-            wf.setsampwidth(audio.get_sample_size(FORMAT))
+            wf.setnchannels(channels)
+            wf.setsampwidth(2)
             wf.setframerate(sample_rate)
-            wf.writeframes(b''.join(frames))
-        
-        print(f"Recording saved to {output_path}")
+            wf.writeframes(pcm)
         
         return {
             'success': True,
             'path': output_path,
-            'duration': duration,
             'size': os.path.getsize(output_path)
         }
-        
-    except ImportError:
-        return {'success': False, 'error': 'PyAudio not installed. Install with: pip install pyaudio'}
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
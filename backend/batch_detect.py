@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Offline batch wake word detection over WAV corpora.
+Runs archived recordings through the same KeywordSpotter used by the live
+Vosk detector, spread across a process pool with one loaded Model per worker.
+
+Usage:
+    python batch_detect.py data/wake-word data/not-wake-word --workers 4
+    python batch_detect.py clip.wav --key-phrase monster --output report.json
+    python batch_detect.py data/ --grammar
+"""
+import argparse
+import json
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List
+
+from keyword_spotter import KeywordSpotter, PhraseMatcher, active_hotwords, build_grammar
+
+DEFAULT_MODEL_PATH = os.path.expanduser("~/.local/share/vosk/vosk-model-small-en-us-0.15")
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'ovos_config.json')
+DATASET_LABELS = ('wake-word', 'not-wake-word')
+
+# Per-worker state, populated once by _init_worker
+_worker_model = None
+_worker_settings: Dict[str, Any] = {}
+
+
+def _init_worker(model_path: str, hotwords: Dict[str, str], block_size: int,
+                 grammar: Optional[str] = None, threshold: float = 0.0) -> None:
+    """Load the Vosk model once per worker process."""
+    global _worker_model
+    from vosk import Model, SetLogLevel
+
+    SetLogLevel(-1)
+    _worker_model = Model(model_path)
+    _worker_settings.update({
+        'hotwords': hotwords,
+        'block_size': block_size,
+        'grammar': grammar,
+        'threshold': threshold
+    })
+
+
+def load_hotwords(config_path: str = DEFAULT_CONFIG_PATH) -> Dict[str, str]:
+    """Read the key phrases of all hotwords with listen enabled."""
+    try:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return {'safe_word': 'hello'}
+    return active_hotwords(config.get('hotwords', {}))
+
+
+def collect_wav_files(paths: List[str]) -> List[str]:
+    """Expand files and directories into a sorted list of WAV paths."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(
+                    os.path.join(root, name) for name in names if name.endswith('.wav')
+                )
+        elif path.endswith('.wav'):
+            files.append(path)
+    return sorted(files)
+
+
+def detect_file(path: str) -> Dict[str, Any]:
+    """
+    Run one WAV file through the keyword spotter.
+
+    Must be called in a process initialized by _init_worker.
+
+    Returns:
+        Dict with per-file detections, audio duration, decode time and RTF
+    """
+    from vosk import KaldiRecognizer
+
+    label = os.path.basename(os.path.dirname(path))
+    result = {
+        'path': path,
+        'label': label if label in DATASET_LABELS else None
+    }
+
+    try:
+        with wave.open(path, 'rb') as wf:
+            if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                return {**result, 'success': False,
+                        'error': 'Only mono 16-bit PCM WAV files are supported'}
+
+            sample_rate = wf.getframerate()
+            if _worker_settings.get('grammar'):
+                recognizer = KaldiRecognizer(_worker_model, sample_rate,
+                                             _worker_settings['grammar'])
+            else:
+                recognizer = KaldiRecognizer(_worker_model, sample_rate)
+            hotwords = _worker_settings['hotwords']
+            spotter = KeywordSpotter(
+                recognizer,
+                PhraseMatcher(hotwords),
+                sample_rate,
+                min_confidence={name: _worker_settings['threshold'] for name in hotwords}
+            )
+
+            detections = []
+            start = time.perf_counter()
+            while True:
+                data = wf.readframes(_worker_settings['block_size'])
+                if not data:
+                    break
+                detection = spotter.accept(data)
+                if detection:
+                    detections.append(detection)
+
+            detection = spotter.flush()
+            if detection:
+                detections.append(detection)
+            decode_time = time.perf_counter() - start
+
+        duration = spotter.audio_time
+        return {
+            **result,
+            'success': True,
+            'detected': bool(detections),
+            'detections': detections,
+            'duration': round(duration, 3),
+            'decode_time': round(decode_time, 4),
+            'rtf': round(decode_time / duration, 4) if duration else None
+        }
+
+    except Exception as e:
+        return {**result, 'success': False, 'error': str(e)}
+
+
+def run_batch(paths: List[str], hotwords: Dict[str, str], model_path: str = DEFAULT_MODEL_PATH,
+              workers: Optional[int] = None, block_size: int = 8000,
+              grammar: Optional[str] = None, threshold: float = 0.0) -> Dict[str, Any]:
+    """
+    Score a WAV corpus with a process pool.
+
+    Args:
+        paths: WAV files and/or directories to scan
+        hotwords: Hotword name to key phrase, all matched in one pass
+        model_path: Path to the Vosk model directory
+        workers: Number of worker processes (default: CPU count)
+        block_size: Frames fed to the recognizer per call
+        grammar: Optional Vosk grammar JSON to constrain the vocabulary
+        threshold: Minimum word confidence for a detection (every
+            detection reports its confidence either way)
+
+    Returns:
+        Dict with per-file results and aggregate timing/accuracy summary
+    """
+    files = collect_wav_files(paths)
+    if not files:
+        return {'success': False, 'error': 'No WAV files found'}
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(model_path, hotwords, block_size, grammar, threshold)
+    ) as executor:
+        chunksize = max(1, len(files) // ((workers or os.cpu_count() or 1) * 4))
+        results = list(executor.map(detect_file, files, chunksize=chunksize))
+    wall_time = time.perf_counter() - start
+
+    decoded = [r for r in results if r['success']]
+    audio_seconds = sum(r['duration'] for r in decoded)
+    decode_seconds = sum(r['decode_time'] for r in decoded)
+
+    wake = [r for r in decoded if r['label'] == 'wake-word']
+    not_wake = [r for r in decoded if r['label'] == 'not-wake-word']
+
+    return {
+        'success': True,
+        'hotwords': hotwords,
+        'grammar': grammar is not None,
+        'threshold': threshold,
+        'summary': {
+            'files': len(files),
+            'failed': len(results) - len(decoded),
+            'detected': sum(1 for r in decoded if r['detected']),
+            'audio_seconds': round(audio_seconds, 2),
+            'wall_time': round(wall_time, 3),
+            'rtf': round(decode_seconds / audio_seconds, 4) if audio_seconds else None,
+            'speedup': round(audio_seconds / wall_time, 1) if wall_time else None,
+            'hits': sum(1 for r in wake if r['detected']),
+            'misses': sum(1 for r in wake if not r['detected']),
+            'false_alarms': sum(1 for r in not_wake if r['detected'])
+        },
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch wake word detection over WAV files')
+    parser.add_argument('paths', nargs='+', help='WAV files or directories')
+    parser.add_argument('--key-phrase', help='Wake phrase (default: hotwords from ovos_config.json)')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Vosk model directory')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--block-size', type=int, default=8000, help='Frames per recognizer call')
+    parser.add_argument('--grammar', action='store_true',
+                        help='Constrain the recognizer to the key phrase plus [unk]')
+    parser.add_argument('--threshold', type=float, default=0.0,
+                        help='Minimum word confidence for a detection (0-1)')
+    parser.add_argument('--output', help='Write full JSON report to this file')
+    args = parser.parse_args()
+
+    hotwords = {'cli': args.key_phrase} if args.key_phrase else load_hotwords()
+    grammar = build_grammar(hotwords.values()) if args.grammar else None
+    report = run_batch(args.paths, hotwords, args.model, args.workers,
+                       args.block_size, grammar, args.threshold)
+
+    if not report['success']:
+        print(f"✗ {report['error']}")
+        return 1
+
+    for r in report['results']:
+        if not r['success']:
+            print(f"✗ {r['path']}: {r['error']}")
+        elif r['detected']:
+            times = ', '.join(
+                f"{d['hotword']}@{d['audio_time']}s ({d['confidence']})" for d in r['detections']
+            )
+            print(f"🚨 {r['path']}: detected at {times}")
+
+    summary = report['summary']
+    print(f"\n{'='*60}")
+    print(f"Key phrases: {', '.join(repr(p) for p in hotwords.values())}")
+    print(f"Files: {summary['files']} ({summary['failed']} failed)")
+    print(f"Audio: {summary['audio_seconds']}s in {summary['wall_time']}s wall "
+          f"({summary['speedup']}x real time)")
+    print(f"Per-worker RTF: {summary['rtf']}")
+    print(f"Hits: {summary['hits']}  Misses: {summary['misses']}  "
+          f"False alarms: {summary['false_alarms']}")
+    print(f"{'='*60}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report saved: {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
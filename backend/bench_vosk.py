@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+CPU benchmarks for the Vosk wake word path on recorded audio.
+
+Usage:
+    python bench_vosk.py grammar data/wake-word data/not-wake-word
+    python bench_vosk.py blocksize data/wake-word --block-sizes 800,1600,4000,8000
+    python bench_vosk.py nbest data/wake-word data/not-wake-word --alternatives 0,3,5,10
+    python bench_vosk.py soak data/wake-word --hours 8 --reset-after 300
+"""
+import argparse
+import json
+import time
+import wave
+from typing import Optional, Dict, Any, List
+
+from batch_detect import DEFAULT_MODEL_PATH, collect_wav_files, load_hotwords
+from keyword_spotter import KeywordSpotter, PhraseMatcher, build_grammar
+from metrics import LatencyStats, process_memory
+
+
+def load_pcm(files: List[str]) -> List[bytes]:
+    """Read mono 16-bit WAV files into memory so disk I/O is not timed."""
+    clips = []
+    for path in files:
+        with wave.open(path, 'rb') as wf:
+            if wf.getnchannels() == 1 and wf.getsampwidth() == 2 and wf.getframerate() == 16000:
+                clips.append(wf.readframes(wf.getnframes()))
+            else:
+                print(f"Skipping {path}: expected 16 kHz mono 16-bit PCM")
+    return clips
+
+
+def measure_cpu(model, clips: List[bytes], hotwords: Dict[str, str], block_size: int = 8000,
+                grammar: Optional[str] = None, max_alternatives: int = 0) -> Dict[str, Any]:
+    """
+    Decode clips with one recognizer configuration and measure CPU cost.
+
+    Returns:
+        Dict with CPU seconds per audio second, mean decode time per block,
+        detection count and mean detection time
+    """
+    from vosk import KaldiRecognizer
+
+    step = block_size * 2
+    audio_seconds = 0.0
+    detections = 0
+    recovered = 0
+    block_times: List[float] = []
+    detection_times: List[float] = []
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for pcm in clips:
+        if grammar:
+            recognizer = KaldiRecognizer(model, 16000, grammar)
+        else:
+            recognizer = KaldiRecognizer(model, 16000)
+        spotter = KeywordSpotter(recognizer, PhraseMatcher(hotwords),
+                                 max_alternatives=max_alternatives)
+
+        for offset in range(0, len(pcm), step):
+            block_start = time.perf_counter()
+            detection = spotter.accept(pcm[offset:offset + step])
+            block_time = time.perf_counter() - block_start
+            block_times.append(block_time)
+            if detection:
+                detections += 1
+                # Live, the detection is reported once the whole block has
+                # been captured and decoded
+                detection_times.append(detection['audio_time'] + block_time)
+        if spotter.flush():
+            detections += 1
+        audio_seconds += spotter.audio_time
+        recovered += spotter.recovered
+    cpu_time = time.process_time() - cpu_start
+    wall_time = time.perf_counter() - wall_start
+
+    return {
+        'block_size': block_size,
+        'max_alternatives': max_alternatives,
+        'audio_seconds': round(audio_seconds, 2),
+        'cpu_seconds': round(cpu_time, 3),
+        'wall_seconds': round(wall_time, 3),
+        'cpu_per_audio_second': round(cpu_time / audio_seconds, 4) if audio_seconds else None,
+        'mean_block_ms': round(1000 * sum(block_times) / len(block_times), 2) if block_times else None,
+        'detections': detections,
+        'recovered': recovered,
+        'mean_detection_time': round(sum(detection_times) / len(detection_times), 3) if detection_times else None
+    }
+
+
+def bench_grammar(model, clips: List[bytes], hotwords: Dict[str, str],
+                  block_size: int = 8000) -> Dict[str, Any]:
+    """Compare open-vocabulary decoding against the constrained grammar."""
+    grammar = build_grammar(hotwords.values())
+    open_vocab = measure_cpu(model, clips, hotwords, block_size)
+    constrained = measure_cpu(model, clips, hotwords, block_size, grammar)
+
+    speedup = None
+    if constrained['cpu_seconds']:
+        speedup = round(open_vocab['cpu_seconds'] / constrained['cpu_seconds'], 2)
+
+    return {
+        'open': open_vocab,
+        'grammar': constrained,
+        'cpu_reduction': speedup
+    }
+
+
+def bench_block_sizes(model, clips: List[bytes], hotwords: Dict[str, str],
+                      block_sizes: List[int]) -> Dict[str, Any]:
+    """
+    Compare detection latency against CPU cost for several block sizes.
+
+    Detection time is the stream offset at which each detection is
+    reported plus the decode time of that block, averaged over detections.
+    The clips are identical for every size, so the difference to the best
+    size is the extra latency that block size adds.
+    """
+    rows = [measure_cpu(model, clips, hotwords, block_size) for block_size in block_sizes]
+
+    times = [row['mean_detection_time'] for row in rows if row['mean_detection_time'] is not None]
+    best = min(times) if times else None
+    for row in rows:
+        if best is not None and row['mean_detection_time'] is not None:
+            row['latency_vs_best_ms'] = round(1000 * (row['mean_detection_time'] - best))
+        else:
+            row['latency_vs_best_ms'] = None
+
+    return {'block_sizes': rows}
+
+
+def bench_alternatives(model, clips: List[bytes], hotwords: Dict[str, str],
+                       ks: List[int], block_size: int = 8000) -> Dict[str, Any]:
+    """
+    Measure the CPU cost and recall gain of N-best matching for several K.
+
+    Each row reports its CPU time relative to K=0 (best hypothesis only)
+    and how many detections were only found in a lower-ranked alternative.
+    """
+    baseline = measure_cpu(model, clips, hotwords, block_size)
+    rows = [
+        measure_cpu(model, clips, hotwords, block_size, max_alternatives=k) if k else baseline
+        for k in ks
+    ]
+    for row in rows:
+        if baseline['cpu_seconds']:
+            row['cpu_overhead'] = round(row['cpu_seconds'] / baseline['cpu_seconds'] - 1, 3)
+        else:
+            row['cpu_overhead'] = None
+        row['extra_detections'] = row['detections'] - baseline['detections']
+
+    return {'baseline': baseline, 'alternatives': rows}
+
+
+def soak(model, clips: List[bytes], hotwords: Dict[str, str], hours: float,
+         reset_after: float = 0.0, recycle: bool = False, block_size: int = 8000,
+         report_every: float = 600.0) -> Dict[str, Any]:
+    """
+    Decode the clips in a loop, as one continuous stream, for hours of audio.
+
+    A row is recorded every report_every seconds of audio with the process
+    RSS and the decode time per block over that interval, so growth in
+    either shows up as a trend across rows.
+    """
+    from vosk import KaldiRecognizer
+
+    spotter = KeywordSpotter(
+        KaldiRecognizer(model, 16000), PhraseMatcher(hotwords),
+        reset_after=reset_after,
+        recognizer_factory=(lambda: KaldiRecognizer(model, 16000)) if recycle else None
+    )
+    step = block_size * 2
+    target_samples = int(hours * 3600 * 16000)
+    next_report = report_every
+    interval = LatencyStats(window=100000)
+    rows = []
+
+    while spotter.samples_seen < target_samples:
+        for pcm in clips:
+            for offset in range(0, len(pcm), step):
+                start = time.perf_counter()
+                spotter.accept(pcm[offset:offset + step])
+                interval.add(time.perf_counter() - start)
+
+            if spotter.audio_time >= next_report:
+                row = {'audio_hours': round(spotter.audio_time / 3600, 2), 'resets': spotter.resets}
+                row.update(process_memory())
+                row.update(interval.get_stats())
+                rows.append(row)
+                print(json.dumps(row))
+                interval.reset()
+                next_report += report_every
+
+    return {
+        'reset_after': reset_after,
+        'mode': 'recycle' if recycle else 'reset',
+        'rss_growth_mb': round(rows[-1]['rss_mb'] - rows[0]['rss_mb'], 1) if rows else None,
+        'intervals': rows
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Vosk wake word decoding')
+    parser.add_argument('mode', choices=['grammar', 'blocksize', 'nbest', 'soak'], help='Benchmark to run')
+    parser.add_argument('paths', nargs='+', help='WAV files or directories')
+    parser.add_argument('--key-phrase', help='Wake phrase (default: hotwords from ovos_config.json)')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH, help='Vosk model directory')
+    parser.add_argument('--block-size', type=int, default=8000, help='Frames per recognizer call')
+    parser.add_argument('--block-sizes', default='800,1600,4000,8000',
+                        help='Comma-separated block sizes for the blocksize benchmark')
+    parser.add_argument('--alternatives', default='0,3,5,10',
+                        help='Comma-separated N-best sizes for the nbest benchmark')
+    parser.add_argument('--hours', type=float, default=1.0, help='Audio hours for the soak run')
+    parser.add_argument('--reset-after', type=float, default=0.0,
+                        help='Soak run: reset the recognizer every N seconds of audio')
+    parser.add_argument('--recycle', action='store_true',
+                        help='Soak run: recreate the recognizer instead of resetting it')
+    args = parser.parse_args()
+
+    from vosk import Model, SetLogLevel
+    SetLogLevel(-1)
+
+    clips = load_pcm(collect_wav_files(args.paths))
+    if not clips:
+        print("✗ No usable WAV files found")
+        return 1
+
+    hotwords = {'cli': args.key_phrase} if args.key_phrase else load_hotwords()
+    model = Model(args.model)
+
+    if args.mode == 'grammar':
+        report = bench_grammar(model, clips, hotwords, args.block_size)
+    elif args.mode == 'blocksize':
+        block_sizes = [int(size) for size in args.block_sizes.split(',')]
+        report = bench_block_sizes(model, clips, hotwords, block_sizes)
+    elif args.mode == 'nbest':
+        ks = [int(k) for k in args.alternatives.split(',')]
+        report = bench_alternatives(model, clips, hotwords, ks, args.block_size)
+    else:
+        report = soak(model, clips, hotwords, args.hours, args.reset_after,
+                      args.recycle, args.block_size)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,193 @@
+"""
+One audio capture shared by any number of engines.
+The source writes each block once into a shared ring; every subscriber
+keeps its own read cursor and reads views straight out of that ring, so
+adding an engine costs no extra device and no extra copy.
+"""
+import threading
+from typing import Optional, Dict, Any, List
+import numpy as np
+
+from audio_source import AudioSource
+
+
+class BusSubscription:
+    """A reader on the capture bus with its own position in the stream."""
+
+    def __init__(self, bus: 'CaptureBus', name: str, max_read: int, start: int):
+        self.bus = bus
+        self.name = name
+        self.position = start
+        self.dropped_samples = 0
+        self.closed = False
+        # Only used when a read wraps around the end of the ring
+        self._scratch = np.zeros(max(1, max_read), dtype=np.int16)
+
+    @property
+    def lag(self) -> int:
+        """Samples written but not yet read by this subscriber."""
+        return self.bus.write_pos - self.position
+
+    def read(self, n: int, timeout: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        Wait for the next n samples.
+
+        Returns a read-only view into the shared ring (a copy only when the
+        block wraps). The view stays valid until the writer laps this
+        subscriber, i.e. for roughly the bus capacity minus its lag.
+
+        Returns:
+            int16 array, or None on timeout / when the bus or subscription closed
+        """
+        bus = self.bus
+        n = min(n, len(self._scratch))
+        with bus._cond:
+            if not bus._cond.wait_for(
+                    lambda: bus.write_pos - self.position >= n or bus.closed or self.closed,
+                    timeout):
+                return None
+            if self.closed or bus.write_pos - self.position < n:
+                return None
+
+            # Lapped by the writer: skip to the oldest audio still in the ring
+            oldest = bus.write_pos - bus.capacity
+            if self.position < oldest:
+                self.dropped_samples += oldest - self.position
+                self.position = oldest
+
+            start = self.position % bus.capacity
+            self.position += n
+            # Wake a writer waiting for room (non-realtime sources)
+            if bus.blocked_writers:
+                bus._cond.notify_all()
+
+        if start + n <= bus.capacity:
+            view = bus._buffer[start:start + n]
+            view.flags.writeable = False
+            return view
+        first = bus.capacity - start
+        self._scratch[:first] = bus._buffer[start:]
+        self._scratch[first:n] = bus._buffer[:n - first]
+        return self._scratch[:n]
+
+    def close(self) -> None:
+        """Stop reading and wake a waiting read."""
+        self.bus.unsubscribe(self)
+
+
+class CaptureBus:
+    """Single-producer, multi-consumer ring fed by one AudioSource."""
+
+    def __init__(self, sample_rate: int = 16000, capacity_seconds: float = 10.0):
+        """
+        Initialize bus.
+
+        Args:
+            sample_rate: Sample rate of the published audio
+            capacity_seconds: Audio history kept; also how far a subscriber
+                may fall behind before it loses audio
+        """
+        self.sample_rate = sample_rate
+        self.capacity = max(1, int(capacity_seconds * sample_rate))
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        self.write_pos = 0
+        self.closed = False
+        self._cond = threading.Condition()
+        self.subscriptions: List[BusSubscription] = []
+        self.source: Optional[AudioSource] = None
+        self.blocked_writers = 0
+
+    def subscribe(self, name: str, max_read: int, history_seconds: float = 0.0) -> BusSubscription:
+        """
+        Add a reader.
+
+        Args:
+            name: Subscriber name (for stats)
+            max_read: Largest block the subscriber will read
+            history_seconds: Start this far back in already captured audio
+        """
+        with self._cond:
+            history = min(int(history_seconds * self.sample_rate), self.write_pos, self.capacity)
+            subscription = BusSubscription(self, name, max_read, self.write_pos - history)
+            self.subscriptions.append(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription: BusSubscription) -> None:
+        with self._cond:
+            subscription.closed = True
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+            self._cond.notify_all()
+
+    def _has_room(self, n: int) -> bool:
+        """Whether n more samples fit without lapping any subscriber."""
+        return all(self.write_pos + n - s.position <= self.capacity for s in self.subscriptions)
+
+    def write(self, samples: np.ndarray, block: bool = False) -> None:
+        """
+        Publish a block to every subscriber (one copy into the ring).
+
+        Args:
+            samples: int16 block
+            block: Wait until the slowest subscriber has room instead of
+                letting the writer lap it
+        """
+        n = len(samples)
+        if n == 0:
+            return
+
+        with self._cond:
+            if block:
+                self.blocked_writers += 1
+                self._cond.wait_for(lambda: self._has_room(min(n, self.capacity)) or self.closed)
+                self.blocked_writers -= 1
+            if n > self.capacity:
+                # Only the newest capacity samples survive; account for the rest
+                samples = samples[-self.capacity:]
+                self.write_pos += n - self.capacity
+                n = self.capacity
+            start = self.write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._buffer[start:start + first] = samples[:first]
+            if first < n:
+                self._buffer[:n - first] = samples[first:]
+            self.write_pos += n
+            self._cond.notify_all()
+
+    def start(self, source: AudioSource) -> None:
+        """Open the capture and publish its audio."""
+        with self._cond:
+            self.closed = False
+        self.source = source
+        if source.realtime:
+            source.start(self.write)
+        else:
+            # Faster-than-real-time sources wait for the slowest engine
+            source.start(lambda samples: self.write(samples, block=True))
+
+    def stop(self) -> None:
+        """Close the capture and wake all readers and a blocked writer."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        if self.source:
+            self.source.stop()
+            self.source = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Capture position and per-subscriber lag and loss."""
+        with self._cond:
+            subscriptions = list(self.subscriptions)
+        return {
+            'source': self.source.get_stats() if self.source else None,
+            'capacity_seconds': round(self.capacity / self.sample_rate, 1),
+            'seconds_captured': round(self.write_pos / self.sample_rate, 2),
+            'subscribers': [
+                {
+                    'name': s.name,
+                    'lag_ms': round(1000 * s.lag / self.sample_rate),
+                    'dropped_samples': s.dropped_samples
+                }
+                for s in subscriptions
+            ]
+        }
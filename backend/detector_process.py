@@ -0,0 +1,369 @@
+"""
+Process-isolated Vosk detector.
+The child process owns the audio device, the Vosk model and the decoding
+loop, so Flask request handling in the parent never competes with it for
+the GIL. The parent talks to it over a command pipe and receives
+detections and model/listener state on an event queue.
+"""
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Optional, Callable, Dict, Any, List, Tuple
+
+from dispatcher import DetectionDispatcher
+from metrics import LatencyStats
+
+
+# Detector methods the parent may call in the child
+_COMMANDS = {'stop_listener', 'get_status', 'update_config', 'check_ovos_installed'}
+# Commands that change the listener; they run in order on one control
+# thread, so a start that loads the model does not hold up status queries
+_CONTROL_COMMANDS = {'start_listener', 'stop_listener', 'update_config', 'shutdown'}
+
+
+def _create_vosk_detector(config_path: Optional[str]):
+    from vosk_wakeword import VoskWakeWordDetector
+    return VoskWakeWordDetector(config_path)
+
+
+def _worker_main(conn, events, config_path: Optional[str],
+                 detector_factory: Callable[[Optional[str]], Any] = _create_vosk_detector) -> None:
+    """Child process: run a detector and serve commands until shutdown."""
+    detector = detector_factory(config_path)
+
+    def state() -> Dict[str, Any]:
+        return {
+            'ready': detector.is_ready,
+            'loading': detector.model_loading,
+            'error': detector.model_error,
+            'load_time': detector.model_load_time,
+            'listening': detector.is_listening
+        }
+
+    def heartbeat():
+        while True:
+            events.put(('state', state()))
+            time.sleep(1)
+
+    threading.Thread(target=heartbeat, daemon=True).start()
+
+    send_lock = threading.Lock()
+    control = queue.Queue()
+
+    def run(request_id, command, args) -> None:
+        try:
+            if command == 'shutdown':
+                result = detector.stop_listener()
+            elif command == 'warm_up':
+                detector.warm_up()
+                result = {'success': True}
+            elif command == 'record_to_file':
+                # Recording takes seconds; run it beside the command loop and
+                # report the result on the event queue
+                token, *record_args = args
+
+                def record(token=token, record_args=record_args):
+                    try:
+                        recorded = detector.record_to_file(*record_args)
+                    except Exception as e:
+                        recorded = {'success': False, 'error': str(e)}
+                    events.put(('recording', (token, recorded)))
+
+                threading.Thread(target=record, daemon=True).start()
+                result = {'success': True, 'recording': token}
+            elif command == 'start_listener':
+                result = detector.start_listener(
+                    lambda detection: events.put(('detection', detection)), *args
+                )
+            elif command in _COMMANDS:
+                result = getattr(detector, command)(*args)
+            else:
+                result = {'success': False, 'error': f'Unknown command: {command}'}
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        with send_lock:
+            conn.send((request_id, result, state()))
+
+    def run_control():
+        while True:
+            request = control.get()
+            if request is None:
+                return
+            run(*request)
+            if request[1] == 'shutdown':
+                return
+
+    control_thread = threading.Thread(target=run_control, daemon=True)
+    control_thread.start()
+
+    while True:
+        try:
+            request_id, command, args = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            control.put(None)
+            break
+
+        if command in _CONTROL_COMMANDS:
+            control.put((request_id, command, args))
+            if command == 'shutdown':
+                break
+        else:
+            run(request_id, command, args)
+    control_thread.join()
+
+
+class DetectorProcess:
+    """Drop-in stand-in for VoskWakeWordDetector that runs it in a child process."""
+
+    def __init__(self, config_path: Optional[str] = None, command_timeout: float = 30.0,
+                 detector_factory: Callable[[Optional[str]], Any] = _create_vosk_detector):
+        """
+        Initialize proxy (the child process starts on first use).
+
+        Args:
+            config_path: Path to ovos_config.json, passed to the child
+            command_timeout: Seconds to wait for the child to answer a command
+            detector_factory: Module-level function building the detector in
+                the child from config_path (must be importable there)
+        """
+        self.config_path = config_path or os.path.join(
+            os.path.dirname(__file__), 'ovos_config.json'
+        )
+        self.config = self._load_config()
+        self.sample_rate = self.config.get('listener', {}).get('sample_rate', 16000)
+        self.command_timeout = command_timeout
+        self.detector_factory = detector_factory
+
+        # Callbacks run on a pool, never on the thread pumping child events
+        self.dispatcher = DetectionDispatcher.from_config(self.config)
+        self.detection_callback: Optional[Callable] = None
+        self.process = None
+        self.restarts = 0
+        self.ipc_stats = LatencyStats()
+
+        self._ctx = multiprocessing.get_context('spawn')
+        self._conn = None
+        self._events = None
+        # Held only to start the child and send; replies are matched to
+        # their request by id, so callers wait without blocking each other
+        self._lock = threading.Lock()
+        self._replies: Dict[int, Tuple[threading.Event, List[Any]]] = {}
+        self._request_ids = itertools.count()
+        self._state: Dict[str, Any] = {}
+        self._event_thread: Optional[threading.Thread] = None
+        # Recordings in progress in the child: token -> (done event, result)
+        self._recordings: Dict[int, Tuple[threading.Event, List[Dict[str, Any]]]] = {}
+
+    def _load_config(self) -> Dict:
+        """Load configuration from JSON file."""
+        try:
+            with open(self.config_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'hotwords': {'safe_word': {'key_phrase': 'hello'}}}
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def _ensure_started(self) -> None:
+        """Start (or restart after a crash) the child process. Caller holds the lock."""
+        if self.is_alive:
+            return
+        if self.process is not None:
+            self.restarts += 1
+            print(f"⚠️  Detector process exited (code {self.process.exitcode}), restarting")
+
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._events = self._ctx.Queue()
+        self.process = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._events, self.config_path, self.detector_factory),
+            name='vosk-detector',
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self._state = {}
+
+        self._event_thread = threading.Thread(
+            target=self._pump_events, args=(self._events,), daemon=True
+        )
+        self._event_thread.start()
+        threading.Thread(target=self._read_replies, args=(parent_conn,), daemon=True).start()
+        print(f"✓ Detector process started (pid {self.process.pid})")
+
+    def _pump_events(self, events) -> None:
+        """Deliver detections and cache state sent by the child."""
+        while True:
+            try:
+                kind, payload = events.get(timeout=1)
+            except queue.Empty:
+                if events is not self._events:
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+
+            if kind == 'state':
+                self._state = payload
+            elif kind == 'detection' and self.detection_callback:
+                self.dispatcher.dispatch(self.detection_callback, payload)
+            elif kind == 'recording':
+                token, result = payload
+                waiter = self._recordings.get(token)
+                if waiter:
+                    waiter[1].append(result)
+                    waiter[0].set()
+
+    def _read_replies(self, conn) -> None:
+        """Hand each reply from the child to the caller waiting for it."""
+        while True:
+            try:
+                request_id, result, state = conn.recv()
+            except (EOFError, OSError) as e:
+                # The child is gone: fail every call still waiting on it
+                for done, reply in list(self._replies.values()):
+                    reply.append({'success': False, 'error': f'Detector process unavailable: {e}'})
+                    done.set()
+                return
+            self._state = state
+            # Replies to commands that already timed out are discarded
+            waiter = self._replies.get(request_id)
+            if waiter:
+                waiter[1].append(result)
+                waiter[0].set()
+
+    def _call(self, command: str, *args, timeout: Optional[float] = None) -> Any:
+        """Send a command to the child and wait for its reply."""
+        timeout = self.command_timeout if timeout is None else timeout
+        request_id = next(self._request_ids)
+        done = threading.Event()
+        reply: List[Any] = []
+        self._replies[request_id] = (done, reply)
+        try:
+            with self._lock:
+                try:
+                    self._ensure_started()
+                    start = time.perf_counter()
+                    self._conn.send((request_id, command, args))
+                except (EOFError, OSError, BrokenPipeError) as e:
+                    return {'success': False, 'error': f'Detector process unavailable: {e}'}
+
+            if not done.wait(timeout):
+                return {'success': False,
+                        'error': f'Detector process did not answer "{command}" in {timeout}s'}
+            self.ipc_stats.add(time.perf_counter() - start)
+            return reply[0]
+        finally:
+            del self._replies[request_id]
+
+    @property
+    def is_ready(self) -> bool:
+        return self.is_alive and self._state.get('ready', False)
+
+    @property
+    def is_listening(self) -> bool:
+        return self.is_alive and self._state.get('listening', False)
+
+    @property
+    def model_loading(self) -> bool:
+        return self._state.get('loading', False)
+
+    @property
+    def model_error(self) -> Optional[str]:
+        return self._state.get('error')
+
+    @property
+    def model_load_time(self) -> Optional[float]:
+        return self._state.get('load_time')
+
+    def warm_up(self) -> None:
+        """Start the child process and have it load the model in the background."""
+        self._call('warm_up')
+
+    def start_listener(self, callback: Callable, hotword_name: Optional[str] = None,
+                       threshold: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Start listening in the child process.
+
+        The callback runs in the parent with a copy of each detection, so
+        fields the detector fills in afterwards (early-trigger confirmation,
+        debounce counts) are not reflected in it.
+        """
+        self.detection_callback = callback
+        self.dispatcher.reset()
+        # The first start may include loading the model; status and other
+        # commands are still answered meanwhile
+        return self._call('start_listener', hotword_name, threshold,
+                          timeout=max(self.command_timeout, 120.0))
+
+    def stop_listener(self) -> Dict[str, Any]:
+        """Stop listening in the child process."""
+        return self._call('stop_listener')
+
+    def update_config(self, hotword_name: str, key_phrase: str,
+                      sensitivity: Optional[float] = None,
+                      module: Optional[str] = None) -> Dict[str, Any]:
+        """Update the hotword configuration in the child and reload it here."""
+        result = self._call('update_config', hotword_name, key_phrase, sensitivity, module)
+        self.config = self._load_config()
+        return result
+
+    def record_to_file(self, duration: float, output_path: str,
+                       preroll_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Record from the child's live stream into a file.
+
+        The child records on a worker thread, so other commands (status,
+        stop, config updates) are served while this call waits.
+        """
+        token = next(self._request_ids)
+        done = threading.Event()
+        result: List[Dict[str, Any]] = []
+        self._recordings[token] = (done, result)
+        try:
+            started = self._call('record_to_file', token, duration, output_path, preroll_seconds)
+            if not started.get('success'):
+                return started
+            if not done.wait(duration + (preroll_seconds or 0) + self.command_timeout):
+                return {'success': False, 'error': 'Detector process did not finish the recording'}
+            return result[0]
+        finally:
+            del self._recordings[token]
+
+    def check_ovos_installed(self) -> Tuple[bool, str]:
+        """Check that the child can run the detector."""
+        result = self._call('check_ovos_installed')
+        if isinstance(result, dict):
+            return False, result.get('error', 'Detector process unavailable')
+        return tuple(result)
+
+    def get_status(self) -> Dict[str, Any]:
+        """Detector status from the child plus process and IPC figures."""
+        status = self._call('get_status')
+        if not isinstance(status, dict) or status.get('success') is False:
+            status = {'listening': False, 'error': status.get('error') if isinstance(status, dict) else None}
+        status['process'] = {
+            'pid': self.process.pid if self.process else None,
+            'alive': self.is_alive,
+            'restarts': self.restarts,
+            'ipc': self.ipc_stats.get_stats(),
+            'recordings_in_progress': len(self._recordings)
+        }
+        status['parent_dispatcher'] = self.dispatcher.get_stats()
+        return status
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the listener and end the child process."""
+        if not self.is_alive:
+            return
+        self._call('shutdown', timeout=timeout)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
@@ -0,0 +1,121 @@
+"""
+Bounded dispatch of detection callbacks.
+Detections are handed to a small fixed thread pool instead of a new thread
+each, and repeats of the same hotword inside a debounce window are folded
+into the event already delivered rather than triggering actions again.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any
+
+
+class DetectionDispatcher:
+    """Runs detection callbacks on a bounded pool with per-hotword debounce."""
+
+    def __init__(self, max_workers: int = 2, debounce_seconds: float = 3.0,
+                 max_pending: int = 8):
+        """
+        Initialize dispatcher.
+
+        Args:
+            max_workers: Threads available to detection callbacks
+            debounce_seconds: Repeats of a hotword within this many seconds
+                of its previous detection are coalesced into the delivered
+                event
+            max_pending: Callbacks queued or running before new events are
+                dropped
+        """
+        self.max_workers = max_workers
+        self.debounce_seconds = debounce_seconds
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='detection-dispatch')
+        self._lock = threading.Lock()
+        self._last_event: Dict[str, Dict[str, Any]] = {}
+        self._last_time: Dict[str, float] = {}
+        self._pending = 0
+
+        self.dispatched = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.max_in_flight = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'DetectionDispatcher':
+        """Build a dispatcher from the 'dispatcher' section of ovos_config.json."""
+        dispatcher_config = config.get('dispatcher', {})
+        return cls(
+            max_workers=dispatcher_config.get('max_workers', 2),
+            debounce_seconds=dispatcher_config.get('debounce_seconds', 3.0),
+            max_pending=dispatcher_config.get('max_pending', 8)
+        )
+
+    def dispatch(self, callback: Callable[[Dict[str, Any]], None],
+                 detection: Dict[str, Any]) -> bool:
+        """
+        Deliver a detection, or fold it into a recent event for the same hotword.
+
+        The first detection in a window is delivered immediately with
+        count=1; repeats only increment the delivered event's count (the
+        dict is updated in place, so holders of it see the total). Each
+        repeat extends the window, so a hotword detected continuously stays
+        one event until it has been quiet for debounce_seconds.
+
+        Returns:
+            True if the callback was scheduled
+        """
+        hotword = detection.get('hotword')
+        now = time.monotonic()
+
+        with self._lock:
+            last = self._last_event.get(hotword)
+            if last is not None and now - self._last_time[hotword] < self.debounce_seconds:
+                last['count'] += 1
+                self._last_time[hotword] = now
+                self.coalesced += 1
+                return False
+
+            if self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+
+            detection['count'] = 1
+            self._last_event[hotword] = detection
+            self._last_time[hotword] = now
+            self._pending += 1
+            self.dispatched += 1
+            self.max_in_flight = max(self.max_in_flight, self._pending)
+
+        self.executor.submit(self._run, callback, detection)
+        return True
+
+    def _run(self, callback: Callable[[Dict[str, Any]], None],
+             detection: Dict[str, Any]) -> None:
+        """Invoke the callback on a pool thread."""
+        try:
+            callback(detection)
+        except Exception as e:
+            print(f"Error in detection callback: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def reset(self) -> None:
+        """Forget debounce windows, e.g. when a listener restarts."""
+        with self._lock:
+            self._last_event.clear()
+            self._last_time.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Delivery, coalescing and back-pressure counters."""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'debounce_seconds': self.debounce_seconds,
+                'in_flight': self._pending,
+                'max_in_flight': self.max_in_flight,
+                'dispatched': self.dispatched,
+                'coalesced': self.coalesced,
+                'dropped': self.dropped
+            }
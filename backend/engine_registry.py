@@ -0,0 +1,83 @@
+"""
+Lazy registry of wake word detector engines.
+Engines are only imported and constructed the first time they are requested,
+so importing the Flask app never blocks on model loading.
+"""
+import threading
+from typing import Callable, Dict, Any, List
+
+
+def _create_vosk():
+    from vosk_wakeword import VoskWakeWordDetector
+    return VoskWakeWordDetector()
+
+
+def _create_vosk_process():
+    from detector_process import DetectorProcess
+    return DetectorProcess()
+
+
+def _create_ovos():
+    from ovos_runner import OVOSRunner
+    return OVOSRunner()
+
+
+def _create_ensemble():
+    from ensemble import EnsembleListener
+    return EnsembleListener.from_config(get_engine('vosk'))
+
+
+def _create_sessions():
+    from session_manager import SessionManager
+    if 'vosk-process' in _engines:
+        print("⚠️  Detection sessions decode in the API process: loading a second "
+              "Vosk model beside the detector process")
+    return SessionManager.from_config(get_engine('vosk'))
+
+
+_factories: Dict[str, Callable[[], Any]] = {
+    'vosk': _create_vosk,
+    'vosk-process': _create_vosk_process,
+    'ovos': _create_ovos,
+    'ensemble': _create_ensemble,
+    'sessions': _create_sessions
+}
+_engines: Dict[str, Any] = {}
+_lock = threading.RLock()
+
+
+def register_engine(name: str, factory: Callable[[], Any]) -> None:
+    """Register a factory for a detector engine."""
+    with _lock:
+        _factories[name] = factory
+        _engines.pop(name, None)
+
+
+def get_engine(name: str = 'vosk') -> Any:
+    """Return the engine for a name, creating it on first use."""
+    with _lock:
+        if name not in _engines:
+            if name not in _factories:
+                raise KeyError(f'Unknown detector engine: {name}')
+            _engines[name] = _factories[name]()
+        return _engines[name]
+
+
+def warm_up(name: str = 'vosk') -> None:
+    """Create an engine and start loading its model in the background."""
+    engine = get_engine(name)
+    if hasattr(engine, 'warm_up'):
+        engine.warm_up()
+
+
+def list_engines() -> List[Dict[str, Any]]:
+    """Registered engines and whether each has been created/loaded."""
+    with _lock:
+        return [
+            {
+                'name': name,
+                'created': name in _engines,
+                'ready': getattr(_engines.get(name), 'is_ready', name in _engines)
+            }
+            for name in _factories
+        ]
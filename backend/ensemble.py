@@ -0,0 +1,582 @@
+"""
+Run several wake word engines side by side on one capture.
+Vosk, an OVOS plugin and Precise each subscribe to the same CaptureBus;
+their detections are tagged with the engine name and fused by a vote
+(any, all or k-of-n within a short window of stream time).
+"""
+import copy
+import subprocess
+import threading
+import time
+from typing import Optional, Callable, Dict, Any, List
+
+import numpy as np
+
+from audio_source import AudioSource, create_source
+from capture_bus import CaptureBus, BusSubscription
+from dispatcher import DetectionDispatcher
+from keyword_spotter import PhraseMatcher
+from metrics import LatencyStats
+from ovos_engine_cache import engine_cache
+from audio_utils import write_wav
+
+
+class WakeWordEngine:
+    """One engine on the bus: takes int16 blocks, returns a detection or None."""
+
+    name = 'base'
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self.decode_stats = LatencyStats()
+        self.detections = 0
+
+    def open(self) -> None:
+        """Load models / start subprocesses. Raise on failure."""
+
+    def process(self, samples: np.ndarray) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release resources."""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'block_size': self.block_size,
+            'detections': self.detections,
+            'decode': self.decode_stats.get_stats()
+        }
+
+
+class VoskEngine(WakeWordEngine):
+    """Keyword spotter on the shared Vosk model."""
+
+    name = 'vosk'
+
+    def __init__(self, detector, hotword_name: Optional[str] = None,
+                 threshold: Optional[float] = None, block_size: Optional[int] = None):
+        super().__init__(block_size or detector.block_size)
+        self.detector = detector
+        self.hotword_name = hotword_name
+        self.threshold = threshold
+        self.spotter = None
+
+    def open(self) -> None:
+        hotwords, grammar_mode = self.detector.resolve_hotwords(self.hotword_name)
+        matcher = PhraseMatcher(hotwords)
+        self.spotter = self.detector.create_spotter(
+            matcher, grammar_mode,
+            min_confidence=self.detector.confidence_thresholds(hotwords, self.threshold)
+        )
+
+    def process(self, samples: np.ndarray) -> Optional[Dict[str, Any]]:
+        # The Vosk binding only accepts bytes
+        return self.spotter.accept(samples.tobytes())
+
+    def close(self) -> None:
+        self.spotter = None
+
+
+class OVOSEngine(WakeWordEngine):
+    """An OVOS wake word plugin, created from the hotword config."""
+
+    name = 'ovos'
+
+    def __init__(self, config: Dict[str, Any], hotword_name: Optional[str] = None,
+                 sensitivity: Optional[float] = None, block_size: int = 1024):
+        super().__init__(block_size)
+        self.config = config
+        self.hotword_name = hotword_name or 'safe_word'
+        self.sensitivity = sensitivity
+        self.plugin = None
+
+    def open(self) -> None:
+        if not self.config.get('hotwords', {}).get(self.hotword_name):
+            raise ValueError(f'Hotword "{self.hotword_name}" not found in config')
+        config = self.config
+        if self.sensitivity is not None:
+            # Override on a copy: the config is the detector's live (and saved) one
+            config = copy.deepcopy(self.config)
+            config['hotwords'][self.hotword_name]['sensitivity'] = self.sensitivity
+        self.plugin, _ = engine_cache.acquire(self.hotword_name, config)
+
+    def process(self, samples: np.ndarray) -> Optional[Dict[str, Any]]:
+        self.plugin.update(samples.tobytes())
+        if not self.plugin.found_wake_word():
+            return None
+        hotword_config = self.config['hotwords'][self.hotword_name]
+        return {
+            'hotword': self.hotword_name,
+            'hotwords': [self.hotword_name],
+            'key_phrase': hotword_config.get('key_phrase'),
+            'text': None,
+            'early': False,
+            'confidence': None
+        }
+
+    def close(self) -> None:
+        if self.plugin:
+            engine_cache.release(self.plugin)
+        self.plugin = None
+
+
+class PreciseEngine(WakeWordEngine):
+    """
+    A Precise model run through precise-engine's stdin protocol.
+
+    precise-engine reads chunk_size bytes of PCM from stdin and answers each
+    chunk with one probability line, so it listens to the bus rather than
+    opening its own device the way precise-listen does.
+    """
+
+    name = 'precise'
+
+    def __init__(self, model_path: str, hotword_name: str = 'safe_word',
+                 executable: str = 'precise-engine', chunk_size: int = 2048,
+                 sensitivity: float = 0.5, trigger_level: int = 3):
+        """
+        Initialize engine.
+
+        Args:
+            model_path: Trained model (.pb or .net)
+            hotword_name: Hotword the model was trained for
+            executable: precise-engine command
+            chunk_size: Bytes per chunk sent to the engine
+            sensitivity: 0-1; a chunk counts when probability > 1 - sensitivity
+            trigger_level: Chunks above threshold needed to fire
+        """
+        super().__init__(chunk_size // 2)
+        self.model_path = model_path
+        self.hotword_name = hotword_name
+        self.executable = executable
+        self.chunk_size = chunk_size
+        self.sensitivity = sensitivity
+        self.trigger_level = trigger_level
+        self.process_handle: Optional[subprocess.Popen] = None
+        self.probability = 0.0
+        self._activation = 0
+
+    def open(self) -> None:
+        self.process_handle = subprocess.Popen(
+            [self.executable, self.model_path, str(self.chunk_size)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+
+    def process(self, samples: np.ndarray) -> Optional[Dict[str, Any]]:
+        self.process_handle.stdin.write(samples.tobytes())
+        self.process_handle.stdin.flush()
+        line = self.process_handle.stdout.readline()
+        if not line:
+            raise RuntimeError(f'precise-engine exited (code {self.process_handle.poll()})')
+        self.probability = float(line)
+        return self._trigger(self.probability)
+
+    def _trigger(self, probability: float) -> Optional[Dict[str, Any]]:
+        """Same activation counter as precise-runner's TriggerDetector."""
+        if probability > 1.0 - self.sensitivity:
+            self._activation += 1
+            if self._activation > self.trigger_level:
+                # Cool down for about half a second of chunks
+                self._activation = -(8 * 2048) // self.chunk_size
+                return {
+                    'hotword': self.hotword_name,
+                    'hotwords': [self.hotword_name],
+                    'key_phrase': None,
+                    'text': None,
+                    'early': False,
+                    'confidence': round(probability, 3)
+                }
+        elif self._activation < 0:
+            self._activation += 1
+        elif self._activation > 0:
+            self._activation -= 1
+        return None
+
+    def close(self) -> None:
+        if self.process_handle:
+            self.process_handle.stdin.close()
+            self.process_handle.terminate()
+            self.process_handle.wait(timeout=2)
+            self.process_handle = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = super().get_stats()
+        stats['probability'] = round(self.probability, 3)
+        return stats
+
+
+class VoteFuser:
+    """Fuses tagged engine detections per hotword: any, all or k-of-n."""
+
+    def __init__(self, engines: List[str], vote: str = 'any', k: Optional[int] = None,
+                 window_seconds: float = 1.5):
+        """
+        Initialize fuser.
+
+        Args:
+            engines: Names of the participating engines
+            vote: 'any', 'all' or 'k-of-n'
+            k: Engines that must agree for 'k-of-n'
+            window_seconds: Stream time within which votes count together
+
+        Raises:
+            ValueError: For an unknown rule or a k outside 1..n
+        """
+        if vote == 'any':
+            required = 1
+        elif vote == 'all':
+            required = len(engines)
+        elif vote == 'k-of-n':
+            required = int(k or 0)
+        else:
+            raise ValueError(f'Unknown vote rule: {vote}')
+        if not 1 <= required <= len(engines):
+            raise ValueError(f'Vote needs {required} of {len(engines)} engines')
+
+        self.engines = list(engines)
+        self.vote = vote
+        self.required = required
+        self.window_seconds = window_seconds
+        self.fused = 0
+        self._votes: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, detection: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Count one engine's detection.
+
+        The detection must carry 'engine' and 'audio_time'.
+
+        Returns:
+            The fused detection once enough engines agree, else None
+        """
+        hotword = detection.get('hotword')
+        now = detection['audio_time']
+        with self._lock:
+            votes = self._votes.setdefault(hotword, {})
+            for engine in [e for e, d in votes.items() if now - d['audio_time'] > self.window_seconds]:
+                del votes[engine]
+            votes[detection['engine']] = detection
+            if len(votes) < self.required:
+                return None
+
+            agreeing = sorted(votes.values(), key=lambda d: d['audio_time'])
+            votes.clear()
+            self.fused += 1
+
+        fused = dict(agreeing[0])
+        fused.update({
+            'engine': 'ensemble',
+            'engines': [d['engine'] for d in agreeing],
+            'vote': f'{self.required}-of-{len(self.engines)}',
+            'votes': {d['engine']: d.get('confidence') for d in agreeing},
+            'audio_time': agreeing[-1]['audio_time']
+        })
+        return fused
+
+    def reset(self) -> None:
+        with self._lock:
+            self._votes.clear()
+
+
+class EnsembleListener:
+    """Several engines on one capture, with the detector's listener interface."""
+
+    def __init__(self, detector, ensemble_config: Optional[Dict[str, Any]] = None):
+        """
+        Initialize listener.
+
+        Args:
+            detector: VoskWakeWordDetector providing the config, the shared
+                model and the Vosk engine
+            ensemble_config: The 'ensemble' config section
+        """
+        ensemble_config = ensemble_config or {}
+        self.detector = detector
+        self.engine_names: List[str] = ensemble_config.get('engines', ['vosk'])
+        self.vote = ensemble_config.get('vote', 'any')
+        self.k = ensemble_config.get('k')
+        self.window_seconds = ensemble_config.get('window_seconds', 1.5)
+        self.precise_config = ensemble_config.get('precise', {})
+
+        listener_config = detector.config.get('listener', {})
+        self.sample_rate = detector.sample_rate
+        self.chunk_size = listener_config.get('chunk_size', 1024)
+        self.buffer_seconds = listener_config.get('buffer_seconds', 10)
+        self.preroll_seconds = listener_config.get('preroll_seconds', 5)
+
+        self.dispatcher = DetectionDispatcher.from_config(detector.config)
+        self.bus: Optional[CaptureBus] = None
+        self.engines: List[WakeWordEngine] = []
+        self.fuser: Optional[VoteFuser] = None
+        self.detection_callback: Optional[Callable] = None
+        self.is_listening = False
+        self.last_detection = None
+        self.last_engine_detections: Dict[str, Dict[str, Any]] = {}
+        self._threads: List[threading.Thread] = []
+
+    @classmethod
+    def from_config(cls, detector) -> 'EnsembleListener':
+        """Build from the detector config's 'ensemble' section."""
+        return cls(detector, detector.config.get('ensemble', {}))
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.detector.config
+
+    @property
+    def is_ready(self) -> bool:
+        return self.detector.is_ready
+
+    @property
+    def model_loading(self) -> bool:
+        return self.detector.model_loading
+
+    @property
+    def model_error(self) -> Optional[str]:
+        return self.detector.model_error
+
+    @property
+    def model_load_time(self) -> Optional[float]:
+        return self.detector.model_load_time
+
+    def warm_up(self) -> None:
+        if 'vosk' in self.engine_names:
+            self.detector.warm_up()
+
+    def check_ovos_installed(self) -> tuple[bool, str]:
+        return self.detector.check_ovos_installed()
+
+    def update_config(self, hotword_name: str, key_phrase: str,
+                      sensitivity: Optional[float] = None,
+                      module: Optional[str] = None) -> Dict[str, Any]:
+        """Update the hotword config; engines pick it up on the next start."""
+        return self.detector.update_config(hotword_name, key_phrase, sensitivity, module)
+
+    def create_engine(self, name: str, hotword_name: Optional[str] = None,
+                      threshold: Optional[float] = None) -> WakeWordEngine:
+        """
+        Build one engine by name.
+
+        Raises:
+            ValueError: For an unknown engine or missing Precise model
+        """
+        # threshold is a minimum confidence, as for the Vosk detector; the
+        # sensitivity-based engines get the matching sensitivity, 1 - threshold
+        # (the Vosk detector's default threshold is 1 - sensitivity)
+        sensitivity = None if threshold is None else 1.0 - float(threshold)
+        if name == 'vosk':
+            return VoskEngine(self.detector, hotword_name, threshold)
+        if name == 'ovos':
+            return OVOSEngine(self.detector.config, hotword_name, sensitivity, self.chunk_size)
+        if name == 'precise':
+            if not self.precise_config.get('model'):
+                raise ValueError('ensemble.precise.model is not configured')
+            hotword = hotword_name or 'safe_word'
+            hotword_config = self.detector.config.get('hotwords', {}).get(hotword, {})
+            return PreciseEngine(
+                self.precise_config['model'],
+                hotword_name=hotword,
+                executable=self.precise_config.get('executable', 'precise-engine'),
+                chunk_size=self.precise_config.get('chunk_size', 2048),
+                sensitivity=sensitivity if sensitivity is not None else
+                            hotword_config.get('sensitivity', 0.5),
+                trigger_level=hotword_config.get('trigger_level', 3)
+            )
+        raise ValueError(f'Unknown ensemble engine: {name}')
+
+    def start_listener(self, callback: Callable, hotword_name: Optional[str] = None,
+                       threshold: Optional[float] = None,
+                       source: Optional[AudioSource] = None) -> Dict[str, Any]:
+        """
+        Open one capture and start every configured engine on it.
+
+        Args:
+            callback: Called with each fused detection
+            hotword_name: Hotword to listen for (engines' defaults otherwise)
+            threshold: Minimum confidence (0-1) for every engine; OVOS and
+                Precise run at sensitivity 1 - threshold
+            source: Audio to listen to (default: the 'audio_source' config section)
+        """
+        if self.is_listening:
+            return {'success': False, 'error': 'Listener already running'}
+
+        try:
+            self.fuser = VoteFuser(self.engine_names, self.vote, self.k, self.window_seconds)
+            engines = [self.create_engine(name, hotword_name, threshold) for name in self.engine_names]
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+
+        opened: List[WakeWordEngine] = []
+        try:
+            for engine in engines:
+                engine.open()
+                opened.append(engine)
+        except Exception as e:
+            for engine in opened:
+                engine.close()
+            return {'success': False, 'error': f'Failed to start {engine.name} engine: {e}'}
+
+        self.engines = opened
+        self.detection_callback = callback
+        self.dispatcher.reset()
+        self.last_engine_detections = {}
+        self.bus = CaptureBus(self.sample_rate, self.buffer_seconds)
+        self.is_listening = True
+
+        self._threads = []
+        for engine in self.engines:
+            subscription = self.bus.subscribe(engine.name, engine.block_size)
+            thread = threading.Thread(target=self._run_engine, args=(engine, subscription),
+                                      name=f'ensemble-{engine.name}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        try:
+            self.bus.start(source or create_source(self.detector.source_config,
+                                                   self.sample_rate, self.chunk_size))
+        except Exception as e:
+            self.stop_listener()
+            return {'success': False, 'error': f'Failed to start: {e}'}
+
+        print(f"\n{'='*60}")
+        print(f"✓ Ensemble listener started")
+        print(f"  Engines: {', '.join(self.engine_names)}")
+        print(f"  Vote: {self.fuser.vote} ({self.fuser.required} of {len(self.engines)})")
+        print(f"  Source: {self.bus.source.type}")
+        print(f"{'='*60}\n")
+
+        return {
+            'success': True,
+            'engines': self.engine_names,
+            'vote': self.fuser.vote,
+            'required': self.fuser.required,
+            'sample_rate': self.sample_rate
+        }
+
+    def _run_engine(self, engine: WakeWordEngine, subscription: BusSubscription) -> None:
+        """Consumer thread: feed one engine from its bus subscription."""
+        while self.is_listening:
+            samples = subscription.read(engine.block_size, timeout=1)
+            if samples is None:
+                if self.bus.closed:
+                    break
+                continue
+
+            start = time.perf_counter()
+            try:
+                detection = engine.process(samples)
+            except Exception as e:
+                print(f"Error in {engine.name} engine: {e}")
+                detection = None
+            engine.decode_stats.add(time.perf_counter() - start)
+
+            if detection:
+                engine.detections += 1
+                detection['engine'] = engine.name
+                detection['audio_time'] = round(subscription.position / self.sample_rate, 3)
+                self._on_engine_detection(detection)
+        subscription.close()
+
+    def _on_engine_detection(self, detection: Dict[str, Any]) -> None:
+        """Record a tagged engine detection and dispatch it once the vote passes."""
+        self.last_engine_detections[detection['engine']] = detection
+        print(f"🔔 {detection['engine']}: {detection['hotword']} at {detection['audio_time']}s")
+
+        fused = self.fuser.add(detection)
+        if not fused:
+            return
+
+        self.last_detection = fused
+        print(f"\n{'='*60}")
+        print(f"🚨 WAKE WORD DETECTED by {', '.join(fused['engines'])} ({fused['vote']})")
+        print(f"  Hotword: {fused['hotword']}")
+        print(f"{'='*60}\n")
+
+        if self.detection_callback:
+            self.dispatcher.dispatch(self.detection_callback, fused)
+
+    def record_to_file(self, duration: float, output_path: str,
+                       preroll_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Record from the shared capture, starting preroll_seconds in the past.
+
+        Args:
+            duration: Seconds of live audio to record after the call
+            output_path: Path to save the WAV file
+            preroll_seconds: Seconds of history to include (default from config)
+        """
+        if not self.is_listening or not self.bus:
+            return {'success': False, 'error': 'Listener not running'}
+
+        if preroll_seconds is None:
+            preroll_seconds = self.preroll_seconds
+        subscription = self.bus.subscribe('recording', self.chunk_size, preroll_seconds)
+        preroll = subscription.lag
+        needed = preroll + int(duration * self.sample_rate)
+        blocks: List[bytes] = []
+        received = 0
+        deadline = time.monotonic() + duration + preroll_seconds + 5
+
+        print(f"Recording {duration}s from shared capture "
+              f"(+{preroll / self.sample_rate:.1f}s pre-roll) to {output_path}...")
+        try:
+            while received < needed and time.monotonic() < deadline:
+                samples = subscription.read(min(self.chunk_size, needed - received), timeout=1)
+                if samples is None:
+                    if self.bus.closed:
+                        break
+                    continue
+                blocks.append(samples.tobytes())
+                received += len(samples)
+        finally:
+            subscription.close()
+
+        result = write_wav(output_path, b''.join(blocks), self.sample_rate)
+        if result['success']:
+            result.update({
+                'duration': round((received - preroll) / self.sample_rate, 2),
+                'preroll': round(preroll / self.sample_rate, 2),
+                'source': 'shared-capture'
+            })
+        return result
+
+    def stop_listener(self) -> Dict[str, Any]:
+        """Stop the capture and every engine."""
+        if not self.is_listening:
+            return {'success': True, 'message': 'No listener running'}
+
+        self.is_listening = False
+        if self.bus:
+            self.bus.stop()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        for engine in self.engines:
+            try:
+                engine.close()
+            except Exception as e:
+                print(f"Error closing {engine.name} engine: {e}")
+        if self.fuser:
+            self.fuser.reset()
+
+        print("✓ Ensemble listener stopped")
+        return {'success': True, 'message': 'Listener stopped'}
+
+    def get_status(self) -> Dict[str, Any]:
+        """Listener state, per-engine stats and the shared capture."""
+        return {
+            'listening': self.is_listening,
+            'module': 'ensemble',
+            'engines': self.engine_names,
+            'vote': self.vote,
+            'required': self.fuser.required if self.fuser else None,
+            'window_seconds': self.window_seconds,
+            'fused_detections': self.fuser.fused if self.fuser else 0,
+            'engine_stats': {engine.name: engine.get_stats() for engine in self.engines},
+            'last_detection': self.last_detection,
+            'last_engine_detections': self.last_engine_detections,
+            'dispatcher': self.dispatcher.get_stats(),
+            'capture': self.bus.get_stats() if self.bus else None,
+            'sample_rate': self.sample_rate,
+            'model_loaded': self.is_ready
+        }
@@ -0,0 +1,517 @@
+"""
+Keyword spotting on top of a Vosk recognizer.
+Shared by the live detector and the offline batch tools so both apply
+exactly the same matching logic to recognized text.
+"""
+import json
+import math
+import re
+from typing import Optional, Callable, Dict, Any, Iterable, List, Tuple, Union
+
+
+def active_hotwords(hotwords: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Collect the key phrases of every hotword with listen enabled.
+
+    Args:
+        hotwords: The 'hotwords' section of ovos_config.json
+
+    Returns:
+        Dict mapping hotword name to key phrase
+    """
+    return {
+        name: hotword_config['key_phrase']
+        for name, hotword_config in hotwords.items()
+        if hotword_config.get('listen', True) and hotword_config.get('key_phrase')
+    }
+
+
+def build_grammar(phrases: Iterable[str]) -> str:
+    """
+    Build a Vosk grammar from hotword phrases.
+
+    Returns:
+        JSON grammar string for KaldiRecognizer, with an [unk] filler so
+        out-of-grammar speech is absorbed instead of forced onto a phrase
+    """
+    grammar = []
+    for phrase in phrases:
+        phrase = phrase.lower().strip()
+        if phrase and phrase not in grammar:
+            grammar.append(phrase)
+    return json.dumps(grammar + ['[unk]'])
+
+
+class PhraseMatcher:
+    """Matches any number of hotword phrases against text in a single pass."""
+
+    def __init__(self, hotwords: Union[str, Dict[str, str]]):
+        """
+        Compile the hotword phrases into one regular expression.
+
+        Args:
+            hotwords: A single key phrase, or a dict of hotword name to key
+                phrase (a single phrase is registered under its own text)
+        """
+        if isinstance(hotwords, str):
+            hotwords = {hotwords.lower().strip(): hotwords}
+
+        self.hotwords = {
+            name: phrase.lower().strip()
+            for name, phrase in hotwords.items() if phrase.strip()
+        }
+        self._names_by_phrase: Dict[str, List[str]] = {}
+        for name, phrase in self.hotwords.items():
+            self._names_by_phrase.setdefault(phrase, []).append(name)
+
+        # Words of all phrases, for cheap screening of N-best alternatives
+        self._vocabulary = frozenset(
+            token for phrase in self._names_by_phrase for token in phrase.split()
+        )
+
+        # Whole words only ("monsters" does not fire "monster"). Zero-width
+        # lookahead so overlapping phrases are all found; longest alternative
+        # first so it wins at a shared start position
+        phrases = sorted(self._names_by_phrase, key=len, reverse=True)
+        self._pattern = None
+        if phrases:
+            self._pattern = re.compile(
+                r'(?=\b(' + '|'.join(re.escape(phrase) for phrase in phrases) + r')\b)'
+            )
+
+    @property
+    def phrases(self) -> List[str]:
+        """Distinct key phrases, in configuration order."""
+        return list(self._names_by_phrase)
+
+    def match(self, text: str) -> List[str]:
+        """Return the names of all hotwords whose phrase occurs as whole words in the text."""
+        if self._pattern is None:
+            return []
+
+        fired = []
+        for m in self._pattern.finditer(text.lower()):
+            for name in self._names_by_phrase[m.group(1)]:
+                if name not in fired:
+                    fired.append(name)
+        return fired
+
+    def match_alternatives(self, alternatives: List[Dict[str, Any]]) -> Tuple[List[str], int]:
+        """
+        Match hotwords against an N-best list, best hypothesis first.
+
+        Each alternative is matched with the same whole-word rule as
+        match(); alternatives sharing no word with any phrase are skipped
+        with one set check, the usual case.
+
+        Args:
+            alternatives: The 'alternatives' list of a Vosk result
+
+        Returns:
+            (names of the hotwords that fired, rank of the matching
+            alternative; -1 if none matched)
+        """
+        for rank, alternative in enumerate(alternatives):
+            text = alternative.get('text', '').lower()
+            if self._vocabulary.isdisjoint(text.split()):
+                continue
+            fired = self.match(text)
+            if fired:
+                return fired, rank
+        return [], -1
+
+    def alternatives_confidence(self, name: str, alternatives: List[Dict[str, Any]],
+                                temperature: float = 1.0) -> Optional[float]:
+        """
+        Score a hotword over an N-best list.
+
+        Vosk gives each alternative an unnormalized lattice score (higher is
+        better, typically in the hundreds, with gaps that grow with the
+        utterance); a softmax over the list at the given temperature turns
+        those into weights summing to 1, and the hotword scores the total
+        weight of the alternatives containing its phrase.
+
+        Args:
+            name: Hotword that matched
+            alternatives: The 'alternatives' list of a Vosk result
+            temperature: Score difference that counts as a factor of e
+                between two alternatives; higher flattens the weights
+
+        Returns:
+            Share in 0-1, or None if the alternatives carry no scores
+        """
+        scores = [alternative.get('confidence') for alternative in alternatives]
+        if not scores or any(score is None for score in scores):
+            return None
+        top = max(scores)
+        weights = [math.exp((score - top) / temperature) for score in scores]
+        hit = sum(weight for alternative, weight in zip(alternatives, weights)
+                  if name in self.match(alternative.get('text', '')))
+        return hit / sum(weights)
+
+    def confidence(self, name: str, words: List[Dict[str, Any]]) -> Optional[float]:
+        """
+        Score a hotword from the recognizer's word-level output.
+
+        Args:
+            name: Hotword that matched
+            words: The 'result' list of a Vosk result with SetWords enabled
+
+        Returns:
+            Mean confidence of the words covering the best occurrence of the
+            phrase, or None if word output is unavailable (N-best results
+            carry word timings but no per-word confidence; see
+            alternatives_confidence)
+        """
+        if not words or 'conf' not in words[0]:
+            return None
+
+        # Character span of each word in the space-joined transcript
+        spans = []
+        offset = 0
+        for word in words:
+            token = word.get('word', '').lower()
+            spans.append((offset, offset + len(token), word.get('conf', 1.0)))
+            offset += len(token) + 1
+        text = ' '.join(word.get('word', '').lower() for word in words)
+
+        phrase = self.hotwords[name]
+        best = None
+        for m in re.finditer(r'(?=\b' + re.escape(phrase) + r'\b)', text):
+            start, end = m.start(), m.start() + len(phrase)
+            confs = [conf for w_start, w_end, conf in spans if w_start < end and w_end > start]
+            if confs:
+                score = sum(confs) / len(confs)
+                best = score if best is None else max(best, score)
+        return best
+
+
+class KeywordSpotter:
+    """Feeds PCM chunks to a recognizer and reports hotword matches."""
+
+    def __init__(self, recognizer, matcher: PhraseMatcher, sample_rate: int = 16000,
+                 on_text: Optional[Callable[[str], None]] = None,
+                 on_partial: Optional[Callable[[str], None]] = None,
+                 early_trigger: bool = False, partial_stability: int = 2,
+                 partial_interval: float = 0.0,
+                 min_confidence: Optional[Dict[str, float]] = None,
+                 max_alternatives: int = 0, reset_after: float = 0.0,
+                 recognizer_factory: Optional[Callable[[], Any]] = None,
+                 alternatives_temperature: float = 10.0,
+                 min_alternatives_share: float = 0.1):
+        """
+        Initialize spotter.
+
+        Args:
+            recognizer: A vosk KaldiRecognizer (or anything with the same API)
+            matcher: Hotword matcher applied to every final result
+            sample_rate: Sample rate of the int16 PCM fed to accept()
+            on_text: Called with every non-empty final transcript
+            on_partial: Initial partial subscriber (see subscribe_partials)
+            early_trigger: Also fire on partial hypotheses, before the
+                utterance is finalized
+            partial_stability: Consecutive partials that must contain the
+                phrase before an early trigger fires
+            partial_interval: Minimum seconds of audio between partial
+                updates delivered to subscribers
+            min_confidence: Per-hotword minimum word confidence (0-1) a
+                final match needs to count as a detection
+            max_alternatives: Match the top-K recognizer hypotheses instead
+                of only the best one (0 disables N-best output)
+            reset_after: Seconds of audio after which the recognizer is reset
+                at the next utterance boundary, bounding decoder memory on
+                long-running streams (0 never resets)
+            recognizer_factory: When given, resets replace the recognizer
+                with a fresh one from this factory instead of calling Reset()
+            alternatives_temperature: Softmax temperature applied to the
+                N-best scores (see PhraseMatcher.alternatives_confidence)
+            min_alternatives_share: Minimum share of the N-best weight a
+                match needs; N-best matches are gated on this instead of
+                min_confidence, which is a word confidence
+        """
+        self.recognizer = recognizer
+        self.matcher = matcher
+        self.sample_rate = sample_rate
+        self.on_text = on_text
+        self.partial_subscribers: List[Callable[[str], None]] = [on_partial] if on_partial else []
+        self.partial_interval = partial_interval
+        # Set while the caller is shedding load; partials are not requested
+        self.skip_partials = False
+        self._next_partial = 0
+        self._last_partial = ''
+        self.early_trigger = early_trigger
+        self.partial_stability = max(1, partial_stability)
+        self.min_confidence = dict(min_confidence or {})
+        self.max_alternatives = max_alternatives
+        self.alternatives_temperature = alternatives_temperature
+        self.min_alternatives_share = min_alternatives_share
+        self.rejected = 0
+        self.recovered = 0
+        self.samples_seen = 0
+        self._configure(recognizer)
+
+        # Recognizer lifecycle
+        self.reset_after = reset_after
+        self.recognizer_factory = recognizer_factory
+        self.resets = 0
+        self._samples_since_reset = 0
+
+        # Early trigger state for the current utterance
+        self._partial_hits = 0
+        self._partial_hotword: Optional[str] = None
+        self._early_detection: Optional[Dict[str, Any]] = None
+        self.early_stats = {'fired': 0, 'confirmed': 0, 'unconfirmed': 0}
+
+    def _configure(self, recognizer) -> None:
+        """Apply output options to a new recognizer."""
+        # Word-level output carries the per-word confidences we score with
+        if hasattr(recognizer, 'SetWords'):
+            recognizer.SetWords(True)
+        if self.max_alternatives > 0:
+            recognizer.SetMaxAlternatives(self.max_alternatives)
+
+    @property
+    def audio_time(self) -> float:
+        """Seconds of audio fed so far."""
+        return self.samples_seen / self.sample_rate
+
+    def accept(self, data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Feed one chunk of int16 PCM.
+
+        Returns:
+            Detection dict if the wake phrase was recognized, else None
+        """
+        self.samples_seen += len(data) // 2
+        self._samples_since_reset += len(data) // 2
+
+        if self.recognizer.AcceptWaveform(data):
+            detection = self._check_final(json.loads(self.recognizer.Result()))
+            self._reset_if_due()
+            return detection
+
+        # Continuous speech with no endpoint: finalize and reset anyway once
+        # well past the limit so memory stays bounded
+        if self.reset_after and self._samples_since_reset >= 2 * self.reset_after * self.sample_rate:
+            detection = self._check_final(json.loads(self.recognizer.FinalResult()))
+            self.reset_recognizer()
+            return detection
+
+        if self.skip_partials:
+            return None
+
+        # Partial hypotheses are only requested when someone needs them:
+        # every chunk for early trigger, rate-limited for subscribers
+        deliver = bool(self.partial_subscribers) and self.samples_seen >= self._next_partial
+        if deliver or self.early_trigger:
+            partial_text = json.loads(self.recognizer.PartialResult()).get('partial', '')
+            if deliver:
+                self._deliver_partial(partial_text)
+            if self.early_trigger:
+                return self._check_partial(partial_text)
+        return None
+
+    def subscribe_partials(self, callback: Callable[[str], None]) -> None:
+        """Receive partial transcripts as they change (rate-limited)."""
+        if callback not in self.partial_subscribers:
+            self.partial_subscribers = self.partial_subscribers + [callback]
+
+    def unsubscribe_partials(self, callback: Callable[[str], None]) -> None:
+        """Stop receiving partial transcripts."""
+        self.partial_subscribers = [cb for cb in self.partial_subscribers if cb != callback]
+
+    def _deliver_partial(self, text: str) -> None:
+        """Send a changed, non-empty partial to every subscriber."""
+        self._next_partial = self.samples_seen + int(self.partial_interval * self.sample_rate)
+        if not text or text == self._last_partial:
+            return
+        self._last_partial = text
+        for callback in self.partial_subscribers:
+            try:
+                callback(text)
+            except Exception as e:
+                print(f"Error in partial subscriber: {e}")
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Finalize the current utterance (e.g. at end of file)."""
+        detection = self._check_final(json.loads(self.recognizer.FinalResult()))
+        self._reset_if_due()
+        return detection
+
+    def _reset_if_due(self) -> None:
+        """Reset at an utterance boundary once reset_after seconds have passed."""
+        if self.reset_after and self._samples_since_reset >= self.reset_after * self.sample_rate:
+            self.reset_recognizer()
+
+    def reset_recognizer(self) -> None:
+        """
+        Drop the decoder state accumulated since the last reset.
+
+        Call only between utterances (after a final result), so no audio
+        that is still being decoded is lost.
+        """
+        if self.recognizer_factory:
+            self.recognizer = self.recognizer_factory()
+            self._configure(self.recognizer)
+        else:
+            self.recognizer.Reset()
+        self.resets += 1
+        self._samples_since_reset = 0
+
+    def reconfigure(self, matcher: PhraseMatcher,
+                    min_confidence: Optional[Dict[str, float]] = None,
+                    recognizer=None,
+                    recognizer_factory: Optional[Callable[[], Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Swap in new hotwords between two accept() calls.
+
+        Args:
+            matcher: Matcher for the new hotword phrases
+            min_confidence: New per-hotword minimum confidence
+            recognizer: Replacement recognizer (e.g. built with a new
+                grammar); the old one is finalized first so the utterance
+                in progress is still matched
+            recognizer_factory: Replacement factory for recycling
+
+        Returns:
+            Detection from finalizing the old recognizer, if any
+        """
+        detection = None
+        if recognizer is not None:
+            detection = self.flush()
+            self.recognizer = recognizer
+            self._configure(recognizer)
+            self._samples_since_reset = 0
+            if self.recognizer_factory is not None and recognizer_factory is not None:
+                self.recognizer_factory = recognizer_factory
+
+        self.matcher = matcher
+        if min_confidence is not None:
+            self.min_confidence = dict(min_confidence)
+        self._partial_hits = 0
+        self._partial_hotword = None
+        self._last_partial = ''
+        return detection
+
+    def get_lifecycle_stats(self) -> Dict[str, Any]:
+        """Reset policy and how often it has run."""
+        return {
+            'reset_after': self.reset_after,
+            'mode': 'recycle' if self.recognizer_factory else 'reset',
+            'resets': self.resets,
+            'seconds_since_reset': round(self._samples_since_reset / self.sample_rate, 1)
+        }
+
+    def _check_partial(self, text: str) -> Optional[Dict[str, Any]]:
+        """Fire once per utterance when the phrase is stable in partials."""
+        if self._early_detection:
+            return None
+
+        fired = self.matcher.match(text) if text else []
+        if fired and fired[0] == self._partial_hotword:
+            self._partial_hits += 1
+        else:
+            self._partial_hotword = fired[0] if fired else None
+            self._partial_hits = 1 if fired else 0
+
+        if self._partial_hits < self.partial_stability:
+            return None
+
+        self._early_detection = self._detection(fired, text.lower(), early=True)
+        self._early_detection.update({
+            'confirmed': None,
+            'latency_saved_ms': None
+        })
+        self.early_stats['fired'] += 1
+        return self._early_detection
+
+    def _detection(self, fired: List[str], text: str, early: bool,
+                   confidence: Optional[float] = None, alternative: int = 0) -> Dict[str, Any]:
+        """Build a detection event for the hotwords that fired."""
+        return {
+            'hotword': fired[0],
+            'hotwords': fired,
+            'key_phrase': self.matcher.hotwords[fired[0]],
+            'text': text,
+            'audio_time': round(self.audio_time, 3),
+            'early': early,
+            'confidence': None if confidence is None else round(confidence, 3),
+            'alternative': alternative
+        }
+
+    def _settle_early(self, fired: List[str],
+                      confidences: Dict[str, Optional[float]]) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a pending early trigger against the final result.
+
+        The early detection dict is updated in place, so whoever received it
+        sees the confirmation and the latency saved versus waiting for the final.
+        """
+        early = self._early_detection
+        self._early_detection = None
+        self._partial_hits = 0
+        self._partial_hotword = None
+        if not early:
+            return None
+
+        matched = early['hotword'] in fired
+        early['confirmed'] = matched
+        if matched:
+            saved = self.audio_time - early['audio_time']
+            early['latency_saved_ms'] = round(saved * 1000)
+            if confidences.get(early['hotword']) is not None:
+                early['confidence'] = round(confidences[early['hotword']], 3)
+            self.early_stats['confirmed'] += 1
+        else:
+            self.early_stats['unconfirmed'] += 1
+        return early
+
+    def _check_final(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Match a final result against the hotword phrases."""
+        rank = 0
+        alternatives = result.get('alternatives')
+        if alternatives is not None:
+            # N-best output: report the best hypothesis, match any of the top K
+            result = alternatives[0] if alternatives else {}
+            text = result.get('text', '').lower()
+            fired, rank = self.matcher.match_alternatives(alternatives)
+            if rank > 0:
+                result = alternatives[rank]
+                text = result.get('text', '').lower()
+        else:
+            text = result.get('text', '').lower()
+            fired = self.matcher.match(text) if text else []
+
+        self._last_partial = ''
+        if text and self.on_text:
+            self.on_text(text)
+
+        # Gate each match on its word confidence, or its N-best share
+        confidences = {}
+        thresholds = {}
+        for name in fired:
+            if alternatives is not None:
+                confidences[name] = self.matcher.alternatives_confidence(
+                    name, alternatives, self.alternatives_temperature)
+                thresholds[name] = self.min_alternatives_share
+            else:
+                confidences[name] = self.matcher.confidence(name, result.get('result', []))
+                thresholds[name] = self.min_confidence.get(name, 0.0)
+        accepted = [
+            name for name in fired
+            if confidences[name] is None or confidences[name] >= thresholds[name]
+        ]
+        self.rejected += len(fired) - len(accepted)
+        fired = accepted
+
+        # Hotwords that already fired on the partial are not reported twice
+        early = self._settle_early(fired, confidences)
+        if early:
+            fired = [name for name in fired if name not in early['hotwords']]
+
+        if fired:
+            if rank > 0:
+                self.recovered += 1
+            return self._detection(fired, text, early=False,
+                                   confidence=confidences[fired[0]], alternative=max(rank, 0))
+        return None
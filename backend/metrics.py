@@ -0,0 +1,71 @@
+"""
+Lightweight runtime metrics for long-running listeners.
+"""
+import collections
+import os
+import threading
+from typing import Dict, Optional
+import psutil
+
+
+class LatencyStats:
+    """Rolling window of durations with summary percentiles."""
+
+    def __init__(self, window: int = 1000):
+        """
+        Initialize stats.
+
+        Args:
+            window: Number of most recent samples the summary covers
+        """
+        self._samples: collections.deque = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.max_seconds = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Record one duration."""
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def reset(self) -> None:
+        """Clear all samples."""
+        with self._lock:
+            self._samples.clear()
+            self.count = 0
+            self.max_seconds = 0.0
+
+    def get_stats(self) -> Dict[str, Optional[float]]:
+        """Mean, p50, p95 and max over the window, in milliseconds."""
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+            max_seconds = self.max_seconds
+
+        if not samples:
+            return {'count': count, 'mean_ms': None, 'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+
+        def percentile(p: float) -> float:
+            return round(1000 * samples[min(len(samples) - 1, int(p * len(samples)))], 3)
+
+        return {
+            'count': count,
+            'mean_ms': round(1000 * sum(samples) / len(samples), 3),
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(1000 * max_seconds, 3)
+        }
+
+
+_process = psutil.Process(os.getpid())
+
+
+def process_memory() -> Dict[str, float]:
+    """Resident and virtual memory of this process, in megabytes."""
+    info = _process.memory_info()
+    return {
+        'rss_mb': round(info.rss / 1024 ** 2, 1),
+        'vms_mb': round(info.vms / 1024 ** 2, 1)
+    }
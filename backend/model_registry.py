@@ -0,0 +1,179 @@
+"""
+Process-wide registry of loaded Vosk models.
+The direct detector, detection sessions and the ovos-ww-plugin-vosk engine
+all get the same Model object for the same directory, reference counted;
+a model is dropped when its last user releases it.
+"""
+import contextlib
+import gc
+import os
+import threading
+import time
+from typing import Optional, Callable, Dict, Any, Iterator, List
+
+from metrics import process_memory
+
+
+def _load_vosk_model(path: str):
+    from vosk import Model
+    return Model(path)
+
+
+def _directory_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return round(total / 1024 ** 2, 1)
+
+
+class _ModelEntry:
+    def __init__(self, path: str):
+        self.path = path
+        self.model = None
+        self.refs = 0
+        self.error: Optional[str] = None
+        self.load_time: Optional[float] = None
+        self.rss_delta_mb: Optional[float] = None
+        self.disk_mb: Optional[float] = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Reference-counted Vosk models keyed by their resolved directory."""
+
+    def __init__(self, loader: Optional[Callable[[str], Any]] = None):
+        """
+        Initialize registry.
+
+        Args:
+            loader: Loads a model from a directory (default: vosk.Model)
+        """
+        self.loader = loader or _load_vosk_model
+        self.loads = 0
+        self.evictions = 0
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._lock = threading.Lock()
+        self._patch_lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.realpath(os.path.expanduser(path))
+
+    def acquire(self, path: str):
+        """
+        Get the model for a directory, loading it on first use.
+
+        Concurrent callers for the same path wait for a single load.
+        Each successful acquire must be paired with a release().
+
+        Raises:
+            Whatever the loader raises; the failed entry is not kept
+        """
+        key = self.key(path)
+        with self._lock:
+            entry = self._entries.setdefault(key, _ModelEntry(key))
+            entry.refs += 1
+
+        with entry.lock:
+            if entry.model is None:
+                rss_before = process_memory()['rss_mb']
+                start = time.perf_counter()
+                try:
+                    entry.model = self.loader(key)
+                except Exception as e:
+                    entry.error = str(e)
+                    self.release(key)
+                    raise
+                entry.load_time = round(time.perf_counter() - start, 2)
+                # Approximate: other threads allocating during the load count too
+                entry.rss_delta_mb = round(process_memory()['rss_mb'] - rss_before, 1)
+                entry.disk_mb = _directory_size_mb(key)
+                entry.error = None
+                self.loads += 1
+                print(f"✓ Vosk model loaded: {key} ({entry.load_time}s, +{entry.rss_delta_mb} MB)")
+        return entry.model
+
+    def release(self, path: str) -> None:
+        """Drop one reference; the model is evicted when none remain."""
+        key = self.key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.refs -= 1
+            if entry.refs > 0:
+                return
+            del self._entries[key]
+            had_model = entry.model is not None
+            entry.model = None
+            if had_model:
+                self.evictions += 1
+        if had_model:
+            # Kaldi frees the model when the last Python reference goes away
+            gc.collect()
+            print(f"✓ Vosk model evicted: {key}")
+
+    @contextlib.contextmanager
+    def plugin_models(self) -> Iterator[List[str]]:
+        """
+        Route ovos-ww-plugin-vosk's model loading through the registry.
+
+        The plugin imports vosk's Model as KaldiModel and calls it from
+        ModelContainer.get_model. While active, that name returns the
+        shared model for its path; the yielded list collects the paths it
+        acquired, which the caller must release when the engine is discarded.
+        """
+        acquired: List[str] = []
+        try:
+            import ovos_ww_plugin_vosk as plugin
+        except ImportError:
+            yield acquired
+            return
+        if not hasattr(plugin, 'KaldiModel'):
+            print("⚠️  ovos_ww_plugin_vosk has no KaldiModel; "
+                  "the plugin will load its own copy of the Vosk model")
+            yield acquired
+            return
+
+        def shared_model(path, *args, **kwargs):
+            model = self.acquire(path)
+            acquired.append(path)
+            return model
+
+        with self._patch_lock:
+            original = plugin.KaldiModel
+            plugin.KaldiModel = shared_model
+            try:
+                yield acquired
+            finally:
+                plugin.KaldiModel = original
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Loaded models with their users and memory cost."""
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'models': [
+                {
+                    'path': e.path,
+                    'refs': e.refs,
+                    'loaded': e.model is not None,
+                    'load_time': e.load_time,
+                    'rss_delta_mb': e.rss_delta_mb,
+                    'disk_mb': e.disk_mb,
+                    'error': e.error
+                }
+                for e in entries
+            ],
+            'process': process_memory()
+        }
+
+
+# One registry per process
+model_registry = ModelRegistry()
@@ -0,0 +1,213 @@
+"""
+Cache of warm OVOS wake word engines.
+Creating a plugin engine loads its model, which dominates listener start
+time. Engines are kept after stop, keyed by a hash of their hotword config,
+and handed back with only their detection state reset; a config change
+evicts the old engine.
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Optional, Callable, Dict, Any, List, Tuple
+
+from model_registry import model_registry
+
+
+def config_key(hotword_name: str, config: Dict[str, Any]) -> str:
+    """Hash of everything that goes into building an engine for a hotword."""
+    relevant = {
+        'hotword': hotword_name,
+        'hotword_config': config.get('hotwords', {}).get(hotword_name, {}),
+        'sample_rate': config.get('listener', {}).get('sample_rate', 16000)
+    }
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True).encode()).hexdigest()
+
+
+def _create_hotword(hotword_name: str, config: Dict[str, Any]):
+    from ovos_plugin_manager.wakewords import OVOSWakeWordFactory
+    return OVOSWakeWordFactory.create_hotword(hotword_name, config)
+
+
+class _CacheEntry:
+    def __init__(self, key: str, hotword_name: str, engine, init_ms: float):
+        self.key = key
+        self.hotword_name = hotword_name
+        self.engine = engine
+        self.init_ms = init_ms
+        self.in_use = False
+        self.uses = 0
+        self.last_used = time.monotonic()
+
+
+class OVOSEngineCache:
+    """Warm OVOS engines keyed by hotword config hash."""
+
+    def __init__(self, max_entries: int = 4,
+                 factory: Optional[Callable[[str, Dict[str, Any]], Any]] = None):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Idle engines kept beyond this are shut down, least
+                recently used first
+            factory: Builds an engine from (hotword_name, config); defaults to
+                OVOSWakeWordFactory.create_hotword
+        """
+        self.max_entries = max_entries
+        self.factory = factory or _create_hotword
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.resets = 0
+        self._entries: Dict[str, _CacheEntry] = {}
+        # Shared Vosk models each engine holds, released when it is shut down
+        self._models: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, hotword_name: str, config: Dict[str, Any]) -> Tuple[Any, bool]:
+        """
+        Get an engine for a hotword, warm if one with the same config is idle.
+
+        Returns:
+            (engine, whether it came from the cache)
+
+        Raises:
+            Whatever the factory raises when a new engine cannot be built
+        """
+        key = config_key(hotword_name, config)
+        with self._lock:
+            # The hotword's config changed: its old engines will never match again
+            for stale in [e for e in self._entries.values()
+                          if e.hotword_name == hotword_name and e.key != key and not e.in_use]:
+                self._evict(stale)
+
+            entry = self._entries.get(key)
+            if entry and not entry.in_use:
+                entry.in_use = True
+                entry.uses += 1
+                self.hits += 1
+                cached = entry.engine
+            else:
+                cached = None
+                self.misses += 1
+
+        if cached is not None:
+            self._reset(cached)
+            return cached, True
+
+        start = time.perf_counter()
+        # The vosk plugin gets the detector's loaded model instead of its own copy
+        with model_registry.plugin_models() as models:
+            try:
+                engine = self.factory(hotword_name, config)
+                if not engine:
+                    raise RuntimeError('Failed to create wake word engine. Check plugin installation.')
+            except Exception:
+                for path in models:
+                    model_registry.release(path)
+                raise
+        init_ms = 1000 * (time.perf_counter() - start)
+
+        with self._lock:
+            self._models[id(engine)] = models
+            # Only cache it if no other caller holds an engine for this key
+            if key not in self._entries:
+                entry = _CacheEntry(key, hotword_name, engine, init_ms)
+                entry.in_use = True
+                entry.uses = 1
+                self._entries[key] = entry
+        return engine, False
+
+    def release(self, engine) -> None:
+        """Return an engine after stop; it stays warm for the next start."""
+        with self._lock:
+            entry = next((e for e in self._entries.values() if e.engine is engine), None)
+            if entry is None:
+                # An uncached duplicate: nothing will reuse it
+                self._shutdown(engine)
+                return
+            entry.in_use = False
+            entry.last_used = time.monotonic()
+
+            idle = sorted((e for e in self._entries.values() if not e.in_use),
+                          key=lambda e: e.last_used)
+            for old in idle[:max(0, len(self._entries) - self.max_entries)]:
+                self._evict(old)
+
+    def evict(self, hotword_name: Optional[str] = None) -> int:
+        """
+        Shut down idle engines (for one hotword, or all).
+
+        Returns:
+            Number of engines evicted
+        """
+        with self._lock:
+            stale = [e for e in self._entries.values()
+                     if not e.in_use and hotword_name in (None, e.hotword_name)]
+            for entry in stale:
+                self._evict(entry)
+            return len(stale)
+
+    def _evict(self, entry: _CacheEntry) -> None:
+        """Drop an entry. Caller holds the lock."""
+        del self._entries[entry.key]
+        self.evictions += 1
+        self._shutdown(entry.engine)
+
+    def _reset(self, engine) -> None:
+        """
+        Clear detection state left over from the previous run.
+
+        OPM's HotWordEngine.reset() is an empty hook that ovos-ww-plugin-vosk
+        does not override; that plugin keeps up to 3 s of audio in .buffer,
+        its recognizer in .model.engine and a check counter in ._counter,
+        so those are cleared directly.
+        """
+        buffer = getattr(engine, 'buffer', None)
+        if buffer is not None and hasattr(buffer, 'clear'):
+            buffer.clear()
+        recognizer = getattr(getattr(engine, 'model', None), 'engine', None)
+        if recognizer is not None and hasattr(recognizer, 'Reset'):
+            recognizer.Reset()
+        if hasattr(engine, '_counter'):
+            engine._counter = 0
+        if hasattr(engine, 'reset'):
+            engine.reset()
+        self.resets += 1
+
+    def _shutdown(self, engine) -> None:
+        """Shut an engine down and release its shared models. Caller holds the lock."""
+        try:
+            if hasattr(engine, 'shutdown'):
+                engine.shutdown()
+        except Exception as e:
+            print(f"Error shutting down wake word engine: {e}")
+        for path in self._models.pop(id(engine), []):
+            model_registry.release(path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and the cached engines."""
+        with self._lock:
+            entries: List[Dict[str, Any]] = [
+                {
+                    'hotword': e.hotword_name,
+                    'key': e.key[:12],
+                    'in_use': e.in_use,
+                    'uses': e.uses,
+                    'init_ms': round(e.init_ms, 1)
+                }
+                for e in self._entries.values()
+            ]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'resets': self.resets,
+            'max_entries': self.max_entries,
+            'entries': entries
+        }
+
+
+# Shared by the OVOS runner and the ensemble's OVOS engine
+engine_cache = OVOSEngineCache()
@@ -5,8 +5,15 @@ Replaces Mycroft Precise with modern OVOS plugin framework.
 import json
 import os
 import threading
+import time
 from typing import Optional, Callable, Dict, Any
 import numpy as np
+from dispatcher import DetectionDispatcher
+from audio_source import AudioSource, create_source
+from ring_buffer import AudioRingBuffer
+from metrics import LatencyStats
+from ovos_engine_cache import OVOSEngineCache, engine_cache
+from model_registry import model_registry
 
 
 class OVOSRunner:
@@ -25,16 +32,50 @@ class OVOSRunner:
         self.config = self._load_config()
         
         self.engine = None
-        self.stream = None
+        self.source: Optional[AudioSource] = None
         self.detection_callback: Optional[Callable] = None
         self.is_listening = False
         self.listener_thread: Optional[threading.Thread] = None
+        self.dispatcher = DetectionDispatcher.from_config(self.config)
         
         # Audio settings from config
         listener_config = self.config.get('listener', {})
         self.sample_rate = listener_config.get('sample_rate', 16000)
         self.channels = listener_config.get('channels', 1)
         self.chunk_size = listener_config.get('chunk_size', 1024)
+        self.source_config = self.config.get('audio_source', {})
+        
+        # The audio callback only copies into this ring; a consumer thread
+        # feeds the engine, so a slow decode never stalls capture
+        self.audio_buffer = AudioRingBuffer(
+            int(listener_config.get('buffer_seconds', 10) * self.sample_rate),
+            self.chunk_size
+        )
+        self.callback_stats = LatencyStats()
+        self.decode_stats = LatencyStats()
+        
+        # 'bytes' copies each chunk once out of the ring (required by the
+        # vosk plugin's cffi binding); 'view' hands plugins that accept the
+        # buffer protocol a memoryview with no copy at all
+        self.plugin_buffer = listener_config.get('plugin_buffer', 'bytes')
+        
+        # Optional level meter, computed on every Nth chunk from a strided
+        # subset of samples so it stays off the per-chunk cost
+        meter_config = listener_config.get('level_meter', {})
+        self.meter_enabled = meter_config.get('enabled', False)
+        self.meter_every = max(1, meter_config.get('every_n_chunks', 10))
+        self.meter_stride = max(1, meter_config.get('stride', 4))
+        self.level_db: Optional[float] = None
+        
+        # Warm engines survive stop/start; disabling the cache keeps none
+        cache_config = listener_config.get('engine_cache', {})
+        if cache_config.get('enabled', True):
+            self.engine_cache = engine_cache
+            self.engine_cache.max_entries = cache_config.get('max_entries', engine_cache.max_entries)
+        else:
+            self.engine_cache = OVOSEngineCache(max_entries=0)
+        self.start_stats = LatencyStats()
+        self.last_start: Optional[Dict[str, Any]] = None
         
     def _load_config(self) -> Dict:
         """Load configuration from JSON file."""
@@ -74,15 +115,19 @@ class OVOSRunner:
         except ImportError as e:
             return False, f"OVOS wake-word plugins not found. Install with: pip install ovos-plugin-manager ovos-ww-plugin-vosk sounddevice. Error: {str(e)}"
     
-    def start_listener(self, callback: Callable, hotword_name: str = 'safe_word', 
-                      threshold: Optional[float] = None) -> Dict[str, Any]:
+    def start_listener(self, callback: Callable, hotword_name: Optional[str] = None, 
+                      threshold: Optional[float] = None,
+                      source: Optional[AudioSource] = None) -> Dict[str, Any]:
         """
         Start listening for wake word using OVOS plugins.
         
         Args:
             callback: Function to call when wake word detected
-            hotword_name: Name of hotword config to use (default 'safe_word')
+            hotword_name: Name of hotword config to use (default 'safe_word');
+                OVOS plugins run one engine per hotword
             threshold: Override sensitivity threshold (0-1)
+            source: Audio to listen to (default: the 'audio_source' config
+                section, which defaults to the microphone)
             
         Returns:
             Dict with success status and process info
@@ -90,10 +135,10 @@ class OVOSRunner:
         if self.is_listening:
             return {'success': False, 'error': 'Listener already running'}
         
+        hotword_name = hotword_name or 'safe_word'
+        started_at = time.perf_counter()
+        
         try:
-            from ovos_plugin_manager.wakewords import OVOSWakeWordFactory
-            import sounddevice as sd
-            
             # Get hotword configuration
             hotword_config = self.config.get('hotwords', {}).get(hotword_name, {})
             
@@ -109,8 +154,9 @@ class OVOSRunner:
             
             # Store callback
             self.detection_callback = callback
+            self.dispatcher.reset()
             
-            # Create OVOS wake word engine
+            # Create OVOS wake word engine, or reuse a warm one
             print(f"Initializing OVOS wake word engine...")
             print(f"Module: {hotword_config.get('module')}")
             print(f"Key phrase: {hotword_config.get('key_phrase')}")
@@ -118,89 +164,54 @@ class OVOSRunner:
             
             try:
                 # Pass the full config, not just the hotword config
-                self.engine = OVOSWakeWordFactory.create_hotword(
-                    hotword_name,
-                    self.config
-                )
+                self.engine, engine_cached = self.engine_cache.acquire(hotword_name, self.config)
                 
                 print(f"\n{'='*60}")
-                print(f"✓ Wake word engine initialized")
+                print(f"✓ Wake word engine {'reused (warm)' if engine_cached else 'initialized'}")
                 print(f"  Looking for: '{hotword_config.get('key_phrase')}'")
                 print(f"  When you speak, watch for detection messages!")
                 print(f"{'='*60}\n")
                 
+            except ImportError:
+                raise
             except Exception as e:
                 return {
                     'success': False,
                     'error': f'Failed to create wake word engine: {str(e)}'
                 }
             
-            if not self.engine:
-                return {
-                    'success': False,
-                    'error': 'Failed to create wake word engine. Check plugin installation.'
-                }
-            
             # Start audio stream
             self.is_listening = True
             
-            def audio_callback(indata, frames, time_info, status):
-                """Process audio chunks for wake word detection."""
-                if status:
-                    print(f"Audio status: {status}")
-                
-                if not self.is_listening:
-                    return
-                
-                try:
-                    # Convert to the format expected by OVOS
-                    # sounddevice provides float32 by default, convert to int16
-                    audio_data = (indata * 32767).astype(np.int16)
-                    
-                    # Calculate audio level for debugging
-                    volume_norm = np.linalg.norm(indata) * 10
-                    if volume_norm > 5:  # Only log when there's significant audio
-                        print(f"🎤 Audio level: {volume_norm:.1f}", end='\r')
-                    
-                    # Feed audio to wake word engine
-                    self.engine.update(audio_data.tobytes())
-                    
-                    # Check for detection (no argument needed!)
-                    detected = self.engine.found_wake_word()
-                    
-                    if detected:
-                        print(f"\n{'='*60}")
-                        print("🚨 WAKE WORD DETECTED by OVOS!")
-                        print(f"  Target phrase: '{hotword_config.get('key_phrase')}'")
-                        print(f"{'='*60}\n")
-                        
-                        if self.detection_callback:
-                            try:
-                                # Run callback in separate thread to avoid blocking audio
-                                threading.Thread(
-                                    target=self.detection_callback,
-                                    daemon=True
-                                ).start()
-                            except Exception as e:
-                                print(f"Error in detection callback: {e}")
-                
-                except Exception as e:
-                    print(f"Error processing audio: {e}")
+            # Open audio source
+            self.source = source or create_source(self.source_config, self.sample_rate,
+                                                  self.chunk_size)
+            blocking = not self.source.realtime
+            self.callback_stats.reset()
+            self.decode_stats.reset()
+            
+            def on_audio(samples: np.ndarray) -> None:
+                """Copy audio into the ring; decoding happens on the consumer thread."""
+                start = time.perf_counter()
+                if self.is_listening:
+                    self.audio_buffer.write(samples, block=blocking)
+                self.callback_stats.add(time.perf_counter() - start)
             
-            # Open audio stream
-            self.stream = sd.InputStream(
-                callback=audio_callback,
-                channels=self.channels,
-                samplerate=self.sample_rate,
-                blocksize=self.chunk_size,
-                dtype='float32'
+            self.listener_thread = threading.Thread(
+                target=self._process_audio,
+                args=(hotword_name, hotword_config),
+                daemon=True
             )
+            self.listener_thread.start()
+            self.source.start(on_audio)
             
-            self.stream.start()
+            start_seconds = time.perf_counter() - started_at
+            self.start_stats.add(start_seconds)
+            self.last_start = {'ms': round(1000 * start_seconds, 1), 'engine_cached': engine_cached}
             
-            print(f"✓ OVOS listener started successfully")
+            print(f"✓ OVOS listener started successfully in {self.last_start['ms']} ms")
             print(f"  Sample rate: {self.sample_rate} Hz")
-            print(f"  Channels: {self.channels}")
+            print(f"  Source: {self.source.type}")
             print(f"  Listening for: '{hotword_config.get('key_phrase')}'")
             
             return {
@@ -208,19 +219,82 @@ class OVOSRunner:
                 'module': hotword_config.get('module'),
                 'key_phrase': hotword_config.get('key_phrase'),
                 'sensitivity': hotword_config.get('sensitivity', 0.5),
-                'sample_rate': self.sample_rate
+                'sample_rate': self.sample_rate,
+                'start_ms': self.last_start['ms'],
+                'engine_cached': engine_cached
             }
             
         except ImportError as e:
             self.is_listening = False
+            self._release_engine()
             return {
                 'success': False,
                 'error': f'Missing dependencies: {str(e)}. Install with: pip install ovos-plugin-manager ovos-ww-plugin-vosk sounddevice'
             }
         except Exception as e:
             self.is_listening = False
+            self._release_engine()
             return {'success': False, 'error': f'Failed to start listener: {str(e)}'}
     
+    def _release_engine(self) -> None:
+        """Hand the engine back to the cache, keeping it warm for the next start."""
+        if self.engine:
+            self.engine_cache.release(self.engine)
+            self.engine = None
+    
+    def _process_audio(self, hotword_name: str, hotword_config: Dict[str, Any]) -> None:
+        """Consumer thread: feed buffered audio to the engine and check for detections."""
+        use_view = self.plugin_buffer == 'view'
+        chunks = 0
+        while self.is_listening:
+            if use_view:
+                chunk = self.audio_buffer.read(self.chunk_size, timeout=1)
+            else:
+                chunk = self.audio_buffer.read_bytes(self.chunk_size, timeout=1)
+            if chunk is None:
+                continue
+            
+            start = time.perf_counter()
+            try:
+                chunks += 1
+                if self.meter_enabled and chunks % self.meter_every == 0:
+                    self._meter(chunk)
+                
+                # Feed audio to wake word engine
+                self.engine.update(chunk)
+                
+                # Check for detection (no argument needed!)
+                detected = self.engine.found_wake_word()
+                
+                if detected:
+                    print(f"\n{'='*60}")
+                    print("🚨 WAKE WORD DETECTED by OVOS!")
+                    print(f"  Target phrase: '{hotword_config.get('key_phrase')}'")
+                    print(f"{'='*60}\n")
+                    
+                    if self.detection_callback:
+                        # Hand off to the dispatcher pool to keep decoding
+                        self.dispatcher.dispatch(self.detection_callback, {
+                            'hotword': hotword_name,
+                            'hotwords': [hotword_name],
+                            'key_phrase': hotword_config.get('key_phrase'),
+                            'text': None,
+                            'early': False,
+                            'confidence': None
+                        })
+            
+            except Exception as e:
+                print(f"Error processing audio: {e}")
+            self.decode_stats.add(time.perf_counter() - start)
+    
+    def _meter(self, chunk) -> None:
+        """Update the input level (dBFS) from a decimated view of one chunk."""
+        x = np.frombuffer(chunk, dtype=np.int16)[::self.meter_stride].astype(np.float32)
+        rms = float(np.sqrt(np.mean(x * x))) if len(x) else 0.0
+        self.level_db = round(20.0 * np.log10(rms / 32768.0 + 1e-9), 1)
+        if self.level_db > -40:  # Only log when there's significant audio
+            print(f"🎤 Audio level: {self.level_db:.1f} dBFS", end='\r')
+    
     def stop_listener(self) -> Dict[str, Any]:
         """Stop the listening process."""
         if not self.is_listening:
@@ -229,15 +303,18 @@ class OVOSRunner:
         try:
             self.is_listening = False
             
-            # Stop and close audio stream
-            if self.stream:
-                self.stream.stop()
-                self.stream.close()
-                self.stream = None
+            # Close first so a source blocked on a full ring is released
+            self.audio_buffer.close()
+            if self.source:
+                self.source.stop()
+                self.source = None
+            
+            if self.listener_thread:
+                self.listener_thread.join(timeout=2)
+                self.listener_thread = None
+            self.audio_buffer.reset()
             
-            # Clean up engine
-            if self.engine:
-                self.engine = None
+            self._release_engine()
             
             print("✓ OVOS listener stopped")
             
@@ -279,10 +356,14 @@ class OVOSRunner:
             with open(self.config_path, 'w') as f:
                 json.dump(self.config, f, indent=2)
             
+            # Warm engines built from the old config can never be reused
+            evicted = self.engine_cache.evict(hotword_name)
+            
             return {
                 'success': True,
                 'message': f'Configuration updated for {hotword_name}',
-                'config': hotword_config
+                'config': hotword_config,
+                'evicted_engines': evicted
             }
             
         except Exception as e:
@@ -298,9 +379,23 @@ class OVOSRunner:
             'key_phrase': hotword_config.get('key_phrase'),
             'sensitivity': hotword_config.get('sensitivity', 0.5),
             'sample_rate': self.sample_rate,
+            'audio_source': self.source.get_stats() if self.source else
+                            {'type': self.source_config.get('type', 'microphone')},
+            'capture': {
+                'callback': self.callback_stats.get_stats(),
+                'decode': self.decode_stats.get_stats(),
+                'xruns': self.source.overflows if self.source else 0,
+                'plugin_buffer': self.plugin_buffer,
+                'level_db': self.level_db if self.meter_enabled else None,
+                'buffer': self.audio_buffer.get_stats()
+            },
+            'dispatcher': self.dispatcher.get_stats(),
+            'start': {
+                'last': self.last_start,
+                'latency': self.start_stats.get_stats()
+            },
+            'engine_cache': self.engine_cache.get_stats(),
+            'models': model_registry.get_stats()['models'],
             'engine_loaded': self.engine is not None
         }
 
-
-# Global runner instance
-ovos_runner = OVOSRunner()
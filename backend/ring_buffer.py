@@ -0,0 +1,222 @@
+"""
+Preallocated ring buffers for captured PCM audio.
+"""
+import threading
+from typing import Optional, Dict
+import numpy as np
+
+
+class PCMRingBuffer:
+    """Fixed-size history of the most recent int16 samples."""
+
+    def __init__(self, capacity: int):
+        """
+        Initialize buffer.
+
+        Args:
+            capacity: Number of samples kept (e.g. seconds * sample_rate)
+        """
+        self.capacity = max(1, capacity)
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._write_pos = 0
+        self._filled = 0
+        self._lock = threading.Lock()
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append samples, overwriting the oldest once full."""
+        n = len(samples)
+        if n == 0:
+            return
+        if n >= self.capacity:
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        with self._lock:
+            end = self._write_pos + n
+            if end <= self.capacity:
+                self._buffer[self._write_pos:end] = samples
+            else:
+                first = self.capacity - self._write_pos
+                self._buffer[self._write_pos:] = samples[:first]
+                self._buffer[:n - first] = samples[first:]
+            self._write_pos = end % self.capacity
+            self._filled = min(self.capacity, self._filled + n)
+
+    def snapshot(self, n: int) -> np.ndarray:
+        """Return a copy of the most recent n samples, oldest first."""
+        with self._lock:
+            n = min(n, self._filled)
+            start = self._write_pos - n
+            if start >= 0:
+                return self._buffer[start:self._write_pos].copy()
+            return np.concatenate((self._buffer[start:], self._buffer[:self._write_pos]))
+
+    def __len__(self) -> int:
+        return self._filled
+
+
+class AudioRingBuffer:
+    """Preallocated single-producer / single-consumer FIFO for int16 PCM."""
+
+    POLICIES = ('drop-oldest', 'drop-newest')
+
+    def __init__(self, capacity: int, max_read: int, policy: str = 'drop-oldest'):
+        """
+        Initialize buffer.
+
+        Args:
+            capacity: Samples the FIFO can hold before overrunning
+            max_read: Largest read the consumer will request
+            policy: What an overrun discards: 'drop-oldest' keeps the
+                freshest audio, 'drop-newest' keeps what is already queued
+
+        Raises:
+            ValueError: For an unknown policy
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f'Unknown overflow policy: {policy}')
+        self.policy = policy
+        self.capacity = max(1, capacity)
+        self._buffer = np.zeros(self.capacity, dtype=np.int16)
+        self._scratch = np.zeros(max(1, max_read), dtype=np.int16)
+
+        # Absolute sample counters; depth is their difference
+        self._read_pos = 0
+        self._write_pos = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.high_water = 0
+        self.overruns = 0
+        self.dropped_samples = 0
+
+    @property
+    def depth(self) -> int:
+        """Samples waiting to be read."""
+        return self._write_pos - self._read_pos
+
+    def write(self, samples: np.ndarray, block: bool = False) -> None:
+        """
+        Copy samples in (called from the audio callback).
+
+        When the consumer falls behind, samples are dropped according to
+        the policy and counted as an overrun. With block=True (for sources
+        faster than real time) the writer waits for space instead.
+        """
+        n = len(samples)
+        if n == 0:
+            return
+        oversize = max(0, n - self.capacity)
+        if oversize:
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        with self._cond:
+            if block:
+                self._cond.wait_for(lambda: self.capacity - self.depth >= n or self._closed)
+                if self._closed:
+                    return
+            self.dropped_samples += oversize
+            free = self.capacity - self.depth
+            if n > free:
+                self.overruns += 1
+                self.dropped_samples += n - free
+                if self.policy == 'drop-newest':
+                    samples = samples[:free]
+                    n = free
+                    if n == 0:
+                        return
+                else:
+                    self._read_pos += n - free
+
+            start = self._write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._buffer[start:start + first] = samples[:first]
+            if first < n:
+                self._buffer[:n - first] = samples[first:]
+            self._write_pos += n
+
+            self.high_water = max(self.high_water, self.depth)
+            self._cond.notify()
+
+    def _wait_readable(self, n: int, timeout: Optional[float]) -> int:
+        """Wait for n samples (caller holds the condition); return how many to read."""
+        if not self._cond.wait_for(lambda: self.depth >= n or self._closed, timeout):
+            return 0
+        return min(n, self.depth)
+
+    def read(self, n: int, timeout: Optional[float] = None) -> Optional[memoryview]:
+        """
+        Wait for n samples and return them as a byte view.
+
+        The view points into a reused scratch array and is only valid until
+        the next read, so no memory is allocated per block.
+
+        Returns:
+            memoryview of int16 bytes, or None on timeout / when closed and empty
+        """
+        n = min(n, len(self._scratch))
+        with self._cond:
+            n = self._wait_readable(n, timeout)
+            if n == 0:
+                return None
+
+            start = self._read_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._scratch[:first] = self._buffer[start:start + first]
+            if first < n:
+                self._scratch[first:n] = self._buffer[:n - first]
+            self._read_pos += n
+            # Wake a writer waiting for space
+            self._cond.notify_all()
+
+        return memoryview(self._scratch[:n]).cast('B')
+
+    def read_bytes(self, n: int, timeout: Optional[float] = None) -> Optional[bytes]:
+        """
+        Wait for n samples and return them as bytes, copied straight out of
+        the ring (for consumers such as the vosk binding that need bytes).
+
+        Returns:
+            int16 bytes, or None on timeout / when closed and empty
+        """
+        n = min(n, self.capacity)
+        with self._cond:
+            n = self._wait_readable(n, timeout)
+            if n == 0:
+                return None
+
+            start = self._read_pos % self.capacity
+            first = min(n, self.capacity - start)
+            if first == n:
+                data = self._buffer[start:start + n].tobytes()
+            else:
+                data = self._buffer[start:].tobytes() + self._buffer[:n - first].tobytes()
+            self._read_pos += n
+            self._cond.notify_all()
+
+        return data
+
+    def close(self) -> None:
+        """Wake a waiting consumer; remaining samples can still be read."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def reset(self) -> None:
+        """Discard buffered audio and counters for a new listening session."""
+        with self._cond:
+            self._read_pos = self._write_pos = 0
+            self._closed = False
+            self.high_water = self.overruns = self.dropped_samples = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Fill level and overrun counters."""
+        return {
+            'policy': self.policy,
+            'capacity': self.capacity,
+            'depth': self.depth,
+            'high_water': self.high_water,
+            'overruns': self.overruns,
+            'dropped_samples': self.dropped_samples
+        }
@@ -0,0 +1,403 @@
+"""
+Multi-session detection service sharing one Vosk Model.
+Each session (a room, a browser client, ...) gets its own KaldiRecognizer on
+top of the detector's model, and decoding runs on a bounded worker pool so
+any number of sessions share a fixed number of threads.
+Sessions always run in the API process, also when the live listener runs in
+a detector process (which then holds its own copy of the model).
+"""
+import collections
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, Any, List
+
+from keyword_spotter import KeywordSpotter, PhraseMatcher
+
+
+class DetectionSession:
+    """One audio source with its own recognizer and pending audio."""
+
+    def __init__(self, session_id: str, spotter: KeywordSpotter,
+                 callback: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.id = session_id
+        self.spotter = spotter
+        self.callback = callback
+        self.created = time.time()
+        # Last feed/poll/finish from the client, for reaping abandoned sessions
+        self.last_activity = time.monotonic()
+
+        self.pending: collections.deque = collections.deque()
+        self.lock = threading.Lock()
+        # Signalled when a worker takes a chunk, for feeders waiting on a full queue
+        self.space = threading.Condition(self.lock)
+        self.scheduled = False
+        self.closed = False
+
+        # Detections not yet handed to the client
+        self.detections: collections.deque = collections.deque(maxlen=50)
+        self.detection_count = 0
+        self.chunks_processed = 0
+        self.decode_time = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-session throughput figures."""
+        audio_seconds = self.spotter.audio_time
+        return {
+            'id': self.id,
+            'hotwords': self.spotter.matcher.hotwords,
+            'created': self.created,
+            'idle_seconds': round(time.monotonic() - self.last_activity, 1),
+            'chunks': self.chunks_processed,
+            'pending_chunks': len(self.pending),
+            'audio_seconds': round(audio_seconds, 2),
+            'decode_seconds': round(self.decode_time, 3),
+            'rtf': round(self.decode_time / audio_seconds, 4) if audio_seconds else None,
+            'speed': round(audio_seconds / self.decode_time, 1) if self.decode_time else None,
+            'detections': self.detection_count
+        }
+
+
+class SessionManager:
+    """Runs many detection sessions on one shared model and a bounded pool."""
+
+    def __init__(self, detector, max_workers: int = 4, max_sessions: int = 32,
+                 chunks_per_turn: int = 8, max_pending_chunks: int = 64,
+                 idle_timeout: Optional[float] = 300.0):
+        """
+        Initialize session manager.
+
+        Args:
+            detector: VoskWakeWordDetector providing the shared model,
+                hotword resolution and spotter construction
+            max_workers: Decoding threads shared by all sessions
+            max_sessions: Maximum number of concurrent sessions
+            chunks_per_turn: Chunks a session decodes before yielding its
+                worker to other sessions
+            max_pending_chunks: Chunks a session may queue before feed()
+                waits or refuses, so a client sending faster than real time
+                cannot grow memory without bound
+            idle_timeout: Seconds without client activity after which a
+                session with no queued audio is destroyed (None keeps
+                sessions until they are destroyed explicitly)
+        """
+        self.detector = detector
+        self.max_workers = max_workers
+        self.max_sessions = max_sessions
+        self.chunks_per_turn = chunks_per_turn
+        self.max_pending_chunks = max_pending_chunks
+        self.idle_timeout = idle_timeout
+        self.reaped = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='detection-session')
+        self.sessions: Dict[str, DetectionSession] = {}
+        # Slots claimed by create_session calls still building their spotter
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, detector) -> 'SessionManager':
+        """Build a manager from the 'sessions' section of the detector config."""
+        sessions_config = detector.config.get('sessions', {})
+        return cls(
+            detector,
+            max_workers=sessions_config.get('max_workers', 4),
+            max_sessions=sessions_config.get('max_sessions', 32),
+            max_pending_chunks=sessions_config.get('max_pending_chunks', 64),
+            idle_timeout=sessions_config.get('idle_timeout_seconds', 300.0)
+        )
+
+    def create_session(self, hotword_name: Optional[str] = None,
+                       callback: Optional[Callable[[str, Dict[str, Any]], None]] = None
+                       ) -> Dict[str, Any]:
+        """
+        Create a session with its own recognizer.
+
+        Args:
+            hotword_name: Hotword to listen for (default: all listening hotwords)
+            callback: Called with (session_id, detection) on each detection
+
+        Returns:
+            Dict with success status and the new session id
+        """
+        # Abandoned sessions should not hold slots against new clients
+        self.reap_idle()
+
+        # Check and claim a slot in one step, so concurrent creates cannot
+        # exceed the limit; the spotter (possibly loading the model) is built
+        # outside the lock
+        with self._lock:
+            if len(self.sessions) + self._reserved >= self.max_sessions:
+                return {'success': False, 'error': f'Session limit reached ({self.max_sessions})'}
+            self._reserved += 1
+
+        try:
+            hotwords, grammar_mode = self.detector.resolve_hotwords(hotword_name)
+            spotter = self.detector.create_spotter(PhraseMatcher(hotwords), grammar_mode)
+        except ValueError as e:
+            with self._lock:
+                self._reserved -= 1
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            with self._lock:
+                self._reserved -= 1
+            return {'success': False, 'error': f'Failed to create session: {str(e)}'}
+
+        session = DetectionSession(uuid.uuid4().hex[:12], spotter, callback)
+        with self._lock:
+            self._reserved -= 1
+            self.sessions[session.id] = session
+
+        return {
+            'success': True,
+            'session_id': session.id,
+            'hotwords': hotwords,
+            'grammar': grammar_mode,
+            'sample_rate': self.detector.sample_rate
+        }
+
+    def destroy_session(self, session_id: str) -> Dict[str, Any]:
+        """Close a session and return its final stats."""
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if not session:
+            return {'success': False, 'error': f'Session "{session_id}" not found'}
+
+        with session.lock:
+            session.closed = True
+            session.pending.clear()
+            session.space.notify_all()
+
+        return {'success': True, 'session': session.get_stats()}
+
+    def reap_idle(self) -> List[str]:
+        """
+        Destroy sessions whose client has gone quiet for idle_timeout.
+
+        Sessions still decoding queued audio are kept.
+
+        Returns:
+            Ids of the sessions destroyed
+        """
+        if not self.idle_timeout:
+            return []
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            sessions = list(self.sessions.values())
+        stale = [s.id for s in sessions
+                 if s.last_activity < cutoff and not s.scheduled and not s.pending]
+        for session_id in stale:
+            if self.destroy_session(session_id)['success']:
+                self.reaped += 1
+                print(f"🧹 Reaped idle session {session_id}")
+        return stale
+
+    def list_sessions(self) -> Dict[str, Any]:
+        """List sessions with per-session throughput."""
+        self.reap_idle()
+        with self._lock:
+            sessions = list(self.sessions.values())
+        return {
+            'success': True,
+            'max_workers': self.max_workers,
+            'max_sessions': self.max_sessions,
+            'idle_timeout': self.idle_timeout,
+            'reaped': self.reaped,
+            'sessions': [session.get_stats() for session in sessions]
+        }
+
+    def feed(self, session_id: str, pcm: bytes, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Queue int16 PCM for a session and schedule it on the worker pool.
+
+        Args:
+            session_id: Session to feed
+            pcm: 16-bit mono PCM
+            timeout: Seconds to wait for room when the session's queue is
+                full (None refuses at once)
+
+        Returns:
+            Dict with queue depth and any detections not yet delivered;
+            'busy' is set when the queue stayed full
+        """
+        session = self.sessions.get(session_id)
+        if not session:
+            return {'success': False, 'error': f'Session "{session_id}" not found'}
+        if len(pcm) % 2:
+            return {'success': False, 'error': 'Audio must be 16-bit PCM'}
+        session.last_activity = time.monotonic()
+
+        with session.lock:
+            if pcm and len(session.pending) >= self.max_pending_chunks:
+                has_room = timeout is not None and session.space.wait_for(
+                    lambda: session.closed or len(session.pending) < self.max_pending_chunks,
+                    timeout)
+                if not has_room:
+                    return {'success': False, 'busy': True,
+                            'error': f'Session queue full ({self.max_pending_chunks} chunks)'}
+                if session.closed:
+                    return {'success': False, 'error': f'Session "{session_id}" closed'}
+            if pcm:
+                session.pending.append(pcm)
+            if not session.scheduled and session.pending:
+                session.scheduled = True
+                self.executor.submit(self._drain, session)
+            pending = len(session.pending)
+
+        return {
+            'success': True,
+            'pending_chunks': pending,
+            'detections': self.poll_detections(session_id)
+        }
+
+    def poll_detections(self, session_id: str) -> List[Dict[str, Any]]:
+        """Return and clear detections not yet delivered to the client."""
+        session = self.sessions.get(session_id)
+        if not session:
+            return []
+        session.last_activity = time.monotonic()
+
+        detections = []
+        while session.detections:
+            detections.append(session.detections.popleft())
+        return detections
+
+    def finish(self, session_id: str, timeout: float = 5.0) -> Dict[str, Any]:
+        """
+        Wait for a session's queued audio to be decoded, then finalize the
+        last utterance (for streams that have ended).
+
+        Returns:
+            Dict with success status and detections not yet delivered
+        """
+        session = self.sessions.get(session_id)
+        if not session:
+            return {'success': False, 'error': f'Session "{session_id}" not found'}
+        session.last_activity = time.monotonic()
+
+        deadline = time.monotonic() + timeout
+        while True:
+            with session.lock:
+                idle = not session.scheduled and not session.pending
+                if idle:
+                    # Keep workers off the spotter while it is flushed
+                    session.scheduled = True
+            if idle:
+                break
+            if time.monotonic() > deadline:
+                return {'success': False, 'error': 'Timed out waiting for queued audio'}
+            time.sleep(0.01)
+
+        try:
+            self._deliver(session, session.spotter.flush())
+        finally:
+            with session.lock:
+                session.scheduled = bool(session.pending) and not session.closed
+                resume = session.scheduled
+            if resume:
+                self.executor.submit(self._drain, session)
+        return {'success': True, 'detections': self.poll_detections(session_id)}
+
+    def _deliver(self, session: DetectionSession, detection: Optional[Dict[str, Any]]) -> None:
+        """Store a detection for polling and pass it to the session callback."""
+        if not detection:
+            return
+        detection['session_id'] = session.id
+        session.detection_count += 1
+        session.detections.append(detection)
+        if session.callback:
+            try:
+                session.callback(session.id, detection)
+            except Exception as e:
+                print(f"Error in session callback: {e}")
+
+    def _drain(self, session: DetectionSession) -> None:
+        """Decode a session's pending audio on a pool thread."""
+        for _ in range(self.chunks_per_turn):
+            with session.lock:
+                if session.closed or not session.pending:
+                    session.scheduled = False
+                    return
+                data = session.pending.popleft()
+                session.space.notify()
+
+            start = time.perf_counter()
+            try:
+                detection = session.spotter.accept(data)
+            except Exception as e:
+                print(f"Error processing session {session.id}: {e}")
+                detection = None
+            session.decode_time += time.perf_counter() - start
+            session.chunks_processed += 1
+            self._deliver(session, detection)
+
+        # Yield the worker so other sessions get a turn
+        with session.lock:
+            if session.closed or not session.pending:
+                session.scheduled = False
+                return
+        self.executor.submit(self._drain, session)
+
+
+class SessionStream:
+    """
+    A streaming connection (WebSocket or chunked HTTP) bound to one session.
+
+    Audio arrives in arbitrary pieces; detections are collected as soon as a
+    worker produces them so the connection can push them straight back.
+    """
+
+    def __init__(self, manager: SessionManager, hotword_name: Optional[str] = None,
+                 callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 write_timeout: float = 5.0):
+        """
+        Open a session for the stream.
+
+        Args:
+            manager: Session manager that owns the recognizers
+            hotword_name: Hotword to listen for (default: all listening hotwords)
+            callback: Also called with (session_id, detection) on each detection
+            write_timeout: Seconds write() waits for a full session queue;
+                waiting stops reading the connection, which slows the sender
+        """
+        self.manager = manager
+        self.callback = callback
+        self.write_timeout = write_timeout
+        self._events: queue.Queue = queue.Queue()
+        self._carry = b''
+        self.opened = manager.create_session(hotword_name, self._on_detection)
+        self.session_id: Optional[str] = self.opened.get('session_id')
+
+    def _on_detection(self, session_id: str, detection: Dict[str, Any]) -> None:
+        self._events.put(detection)
+        if self.callback:
+            self.callback(session_id, detection)
+
+    def write(self, data: bytes) -> Dict[str, Any]:
+        """Queue a piece of int16 PCM; an odd trailing byte waits for the next piece."""
+        data = self._carry + data
+        usable = len(data) - len(data) % 2
+        self._carry = data[usable:]
+        result = self.manager.feed(self.session_id, data[:usable], self.write_timeout)
+        result.pop('detections', None)
+        return result
+
+    def detections(self) -> List[Dict[str, Any]]:
+        """Detections produced since the last call."""
+        detections = []
+        while True:
+            try:
+                detections.append(self._events.get_nowait())
+            except queue.Empty:
+                return detections
+
+    def finish(self, timeout: float = 5.0) -> List[Dict[str, Any]]:
+        """Decode the remaining audio and return the last detections."""
+        self.manager.finish(self.session_id, timeout)
+        return self.detections()
+
+    def close(self) -> Dict[str, Any]:
+        """Close the session and return its stats."""
+        return self.manager.destroy_session(self.session_id)
@@ -2,6 +2,11 @@
 Basic tests for SafeWord backend.
 Run with: pytest test_basic.py
 """
+import json
+import threading
+import time
+import types
+import numpy as np
 import pytest
 import os
 import sys
@@ -11,6 +16,59 @@ sys.path.insert(0, os.path.dirname(__file__))
 
 from audio_utils import save_sample
 from precise_runner import PreciseRunner
+from keyword_spotter import KeywordSpotter, PhraseMatcher, build_grammar
+from vad import EnergyVAD
+from session_manager import SessionManager, SessionStream
+from dispatcher import DetectionDispatcher
+from audio_source import SocketSource, SyntheticSource, WavFileSource, create_source
+from audio_utils import start_recording_to_file
+from actions import ActionManager
+from ring_buffer import AudioRingBuffer, PCMRingBuffer
+from capture_bus import CaptureBus
+from ensemble import EnsembleListener, VoteFuser
+from ovos_engine_cache import OVOSEngineCache
+from ovos_runner import OVOSRunner
+from model_registry import ModelRegistry
+from detector_process import DetectorProcess
+
+
+class FakeRecognizer:
+    """Stand-in for KaldiRecognizer that replays scripted results."""
+    
+    def __init__(self, steps, conf=1.0):
+        # Each step is (is_final, text) for one AcceptWaveform call
+        self.steps = list(steps)
+        self.conf = conf
+        self.current = (False, '')
+    
+    def AcceptWaveform(self, data):
+        self.current = self.steps.pop(0) if self.steps else (False, '')
+        return self.current[0]
+    
+    def Reset(self):
+        self.resets = getattr(self, 'resets', 0) + 1
+    
+    def SetMaxAlternatives(self, k):
+        self.max_alternatives = k
+    
+    def Result(self):
+        if getattr(self, 'max_alternatives', 0):
+            # N-best steps script their hypotheses as 'best|second|...'
+            # and may add a score to each as 'text@score'
+            alternatives = []
+            for hypothesis in self.current[1].split('|')[:self.max_alternatives]:
+                text, _, score = hypothesis.partition('@')
+                alternatives.append({'text': text, 'confidence': float(score)} if score else {'text': text})
+            return json.dumps({'alternatives': alternatives})
+        words = [{'word': word, 'conf': self.conf} for word in self.current[1].split()]
+        return json.dumps({'text': self.current[1], 'result': words})
+    
+    def PartialResult(self):
+        self.partial_calls = getattr(self, 'partial_calls', 0) + 1
+        return json.dumps({'partial': self.current[1]})
+    
+    def FinalResult(self):
+        return json.dumps({'text': ''})
 
 
 def test_save_sample_valid_label():
@@ -60,5 +118,948 @@ def test_precise_runner_status():
     assert status['listening'] == False
 
 
+def test_keyword_spotter_detects_phrase():
+    """Test that the spotter reports the wake phrase with its audio offset."""
+    recognizer = FakeRecognizer([(True, 'hello there'), (True, 'a Monster here')])
+    spotter = KeywordSpotter(recognizer, PhraseMatcher('Monster'))
+    assert spotter.accept(b'\x00' * 16000) is None
+    detection = spotter.accept(b'\x00' * 16000)
+    assert detection['key_phrase'] == 'monster'
+    assert detection['hotword'] == 'monster'
+    assert detection['text'] == 'a monster here'
+    assert detection['audio_time'] == 1.0
+
+
+
+def test_phrase_matcher_multiple_hotwords():
+    """Test that all hotwords are matched in one pass, including overlaps."""
+    matcher = PhraseMatcher({'safe_word': 'Monster', 'help': 'help me', 'me': 'me'})
+    assert matcher.match('please help me monster') == ['help', 'me', 'safe_word']
+    assert matcher.match('nothing here') == []
+    assert PhraseMatcher({}).match('monster') == []
+
+
+def test_keyword_spotter_confidence_gate():
+    """Test that matches below the hotword's minimum confidence are rejected."""
+    matcher = PhraseMatcher({'safe_word': 'monster'})
+    words = [{'word': 'the', 'conf': 1.0}, {'word': 'monster', 'conf': 0.4}]
+    assert matcher.confidence('safe_word', words) == 0.4
+    
+    strict = KeywordSpotter(FakeRecognizer([(True, 'the monster')], conf=0.4), matcher,
+                            min_confidence={'safe_word': 0.5})
+    assert strict.accept(b'\x00' * 320) is None
+    assert strict.rejected == 1
+    
+    lenient = KeywordSpotter(FakeRecognizer([(True, 'the monster')], conf=0.6), matcher,
+                             min_confidence={'safe_word': 0.5})
+    assert lenient.accept(b'\x00' * 320)['confidence'] == 0.6
+
+
+def test_keyword_spotter_nbest_recovers_lower_alternative():
+    """Test that a phrase found only in a lower-ranked hypothesis still fires."""
+    matcher = PhraseMatcher({'safe_word': 'monster'})
+    steps = [(True, 'the mon stir|the monsters|the monster')]
+    
+    top_only = KeywordSpotter(FakeRecognizer(steps), matcher, max_alternatives=1)
+    assert top_only.accept(b'\x00' * 320) is None
+    
+    spotter = KeywordSpotter(FakeRecognizer(steps), matcher, max_alternatives=3)
+    detection = spotter.accept(b'\x00' * 320)
+    assert detection['hotword'] == 'safe_word'
+    assert detection['alternative'] == 2
+    assert detection['confidence'] is None
+    assert spotter.recovered == 1
+
+
+def test_phrase_matcher_whole_words_with_and_without_nbest():
+    """Test that plain and N-best matching apply the same whole-word rule."""
+    matcher = PhraseMatcher({'safe_word': 'monster'})
+    assert matcher.match('the monsters') == []
+    assert matcher.match('a monster truck') == ['safe_word']
+    assert matcher.match_alternatives([{'text': 'the monsters'}]) == ([], -1)
+    
+    plain = KeywordSpotter(FakeRecognizer([(True, 'the monsters')]), matcher)
+    assert plain.accept(b'\x00' * 320) is None
+    nbest = KeywordSpotter(FakeRecognizer([(True, 'the monsters|the mon stir')]), matcher,
+                           max_alternatives=2)
+    assert nbest.accept(b'\x00' * 320) is None
+
+
+def test_keyword_spotter_nbest_gates_on_alternative_scores():
+    """Test that N-best hits are gated by their share of the list's score, not word confidence."""
+    matcher = PhraseMatcher({'safe_word': 'monster'})
+    # Scores 2, 1, 0 at temperature 1 -> softmax weights ~0.67, 0.24, 0.09
+    steps = [(True, 'the mon stir@2|the monster@1|the monster truck@0')]
+    
+    strict = KeywordSpotter(FakeRecognizer(steps), matcher, max_alternatives=3,
+                            alternatives_temperature=1.0, min_alternatives_share=0.5)
+    assert strict.accept(b'\x00' * 320) is None
+    assert strict.rejected == 1
+    
+    lenient = KeywordSpotter(FakeRecognizer(steps), matcher, max_alternatives=3,
+                             alternatives_temperature=1.0, min_alternatives_share=0.3)
+    detection = lenient.accept(b'\x00' * 320)
+    assert detection['alternative'] == 1
+    assert detection['confidence'] == 0.335
+    
+    # Lattice scores the size Vosk reports: the near miss is recovered with
+    # the defaults, even with a strict word-confidence gate
+    steps = [(True, 'hey master@232.5|hey monster@229.1|hey mister@221.0')]
+    recovering = KeywordSpotter(FakeRecognizer(steps), matcher, max_alternatives=3,
+                                min_confidence={'safe_word': 0.5})
+    detection = recovering.accept(b'\x00' * 320)
+    assert detection['alternative'] == 1
+    assert 0.3 < detection['confidence'] < 0.4
+    assert recovering.recovered == 1
+    
+    # A hypothesis far behind the best one is still rejected
+    steps = [(True, 'hey master@232.5|hey monster@190.0')]
+    distant = KeywordSpotter(FakeRecognizer(steps), matcher, max_alternatives=2)
+    assert distant.accept(b'\x00' * 320) is None
+    assert distant.rejected == 1
+
+
+def test_keyword_spotter_resets_at_utterance_boundary():
+    """Test that the recognizer is only reset after a final result once due."""
+    recognizer = FakeRecognizer([(False, 'the'), (False, 'the mon'), (True, 'the monster')])
+    spotter = KeywordSpotter(recognizer, PhraseMatcher('monster'), reset_after=0.02)
+    
+    assert spotter.accept(b'\x00' * 320) is None
+    assert spotter.accept(b'\x00' * 320) is None
+    assert spotter.resets == 0
+    assert spotter.accept(b'\x00' * 320)['hotword'] == 'monster'
+    assert spotter.resets == 1
+    assert recognizer.resets == 1
+    assert spotter.get_lifecycle_stats()['seconds_since_reset'] == 0
+    
+    recycled = []
+    spotter = KeywordSpotter(FakeRecognizer([(True, 'hello')]), PhraseMatcher('monster'),
+                             reset_after=0.01,
+                             recognizer_factory=lambda: recycled.append(1) or FakeRecognizer([]))
+    spotter.accept(b'\x00' * 320)
+    assert recycled == [1]
+    assert spotter.get_lifecycle_stats()['mode'] == 'recycle'
+
+
+def test_keyword_spotter_partials_are_opt_in_and_rate_limited():
+    """Test that partials are only requested for subscribers, at most once per interval."""
+    recognizer = FakeRecognizer([(False, 'the')] * 4 + [(False, 'the mon')] * 4)
+    spotter = KeywordSpotter(recognizer, PhraseMatcher('monster'), partial_interval=0.02)
+    
+    spotter.accept(b'\x00' * 320)
+    assert getattr(recognizer, 'partial_calls', 0) == 0
+    
+    received = []
+    spotter.subscribe_partials(received.append)
+    for _ in range(7):
+        spotter.accept(b'\x00' * 320)  # 10 ms each, so every other chunk
+    assert recognizer.partial_calls == 4
+    assert received == ['the', 'the mon']
+    
+    spotter.unsubscribe_partials(received.append)
+    assert spotter.partial_subscribers == []
+
+
+def test_keyword_spotter_reconfigure_between_chunks():
+    """Test hot-swapping the phrase, thresholds and recognizer of a running spotter."""
+    spotter = KeywordSpotter(FakeRecognizer([(True, 'pineapple')] * 2), PhraseMatcher('monster'))
+    assert spotter.accept(b'\x00' * 320) is None
+    
+    assert spotter.reconfigure(PhraseMatcher({'safe_word': 'pineapple'}),
+                               min_confidence={'safe_word': 0.5}) is None
+    assert spotter.accept(b'\x00' * 320)['hotword'] == 'safe_word'
+    
+    replacement = FakeRecognizer([(True, 'grape')])
+    spotter.reconfigure(PhraseMatcher({'safe_word': 'grape'}), recognizer=replacement)
+    assert spotter.recognizer is replacement
+    assert spotter.accept(b'\x00' * 320)['key_phrase'] == 'grape'
+
+
+def test_keyword_spotter_early_trigger_suppresses_final():
+    """Test that a stable partial fires once and the final only confirms it."""
+    recognizer = FakeRecognizer([
+        (False, 'mon'), (False, 'monster'), (False, 'monster'),
+        (False, 'monster now'), (True, 'monster now')
+    ])
+    spotter = KeywordSpotter(recognizer, PhraseMatcher('monster'),
+                             early_trigger=True, partial_stability=2)
+    chunk = b'\x00' * 8000  # 0.25 s
+    results = [spotter.accept(chunk) for _ in range(5)]
+    
+    assert results[:2] == [None, None]
+    early = results[2]
+    assert early['early'] is True
+    assert results[3:] == [None, None]
+    assert early['confirmed'] is True
+    assert early['latency_saved_ms'] == 500
+    assert spotter.early_stats == {'fired': 1, 'confirmed': 1, 'unconfirmed': 0}
+
+
+
+def test_vad_gate_skips_silence_and_replays_pre_speech():
+    """Test that silence is withheld and the pre-speech buffer is replayed."""
+    vad = EnergyVAD(sample_rate=16000, hangover_ms=100, pre_speech_ms=100)
+    silence = np.zeros(1600, dtype=np.int16).tobytes()  # 100 ms
+    t = np.arange(1600) / 16000.0
+    speech = (8000 * np.sin(2 * np.pi * 300 * t)).astype(np.int16).tobytes()
+    
+    assert vad.process(silence) == ([], False)
+    assert vad.process(silence) == ([], False)
+    assert vad.process(speech) == ([silence, speech], False)
+    assert vad.process(silence) == ([], True)
+    
+    stats = vad.get_stats()
+    assert stats['frames_processed'] == 2
+    assert stats['frames_skipped'] == 2
+
+
+
+def test_pcm_ring_buffer_keeps_latest_samples():
+    """Test that the pre-roll buffer wraps and returns samples oldest first."""
+    ring = PCMRingBuffer(5)
+    ring.write(np.array([1, 2, 3], dtype=np.int16))
+    assert ring.snapshot(10).tolist() == [1, 2, 3]
+    
+    ring.write(np.array([4, 5, 6, 7], dtype=np.int16))
+    assert len(ring) == 5
+    assert ring.snapshot(5).tolist() == [3, 4, 5, 6, 7]
+    assert ring.snapshot(2).tolist() == [6, 7]
+    
+    ring.write(np.arange(10, 20, dtype=np.int16))
+    assert ring.snapshot(5).tolist() == [15, 16, 17, 18, 19]
+
+
+def test_audio_ring_buffer_fifo_and_overrun():
+    """Test FIFO reads across the wrap point and drop-oldest overrun counting."""
+    fifo = AudioRingBuffer(capacity=6, max_read=4)
+    fifo.write(np.array([1, 2, 3, 4], dtype=np.int16))
+    assert np.frombuffer(fifo.read(3, timeout=0), dtype=np.int16).tolist() == [1, 2, 3]
+    
+    fifo.write(np.array([5, 6, 7, 8, 9, 10], dtype=np.int16))
+    stats = fifo.get_stats()
+    assert stats['overruns'] == 1
+    assert stats['dropped_samples'] == 1
+    assert stats['high_water'] == 6
+    
+    assert np.frombuffer(fifo.read(4, timeout=0), dtype=np.int16).tolist() == [5, 6, 7, 8]
+    assert fifo.read(4, timeout=0) is None
+    fifo.close()
+    assert np.frombuffer(fifo.read(4), dtype=np.int16).tolist() == [9, 10]
+
+
+def test_audio_ring_buffer_read_bytes_wraps():
+    """Test that read_bytes returns int16 bytes straight from the ring across the wrap."""
+    fifo = AudioRingBuffer(capacity=4, max_read=4)
+    fifo.write(np.array([1, 2, 3], dtype=np.int16))
+    assert fifo.read_bytes(2, timeout=0) == np.array([1, 2], dtype=np.int16).tobytes()
+    fifo.write(np.array([4, 5, 6], dtype=np.int16))
+    assert fifo.read_bytes(4, timeout=0) == np.array([3, 4, 5, 6], dtype=np.int16).tobytes()
+    assert fifo.read_bytes(1, timeout=0) is None
+
+
+def test_audio_ring_buffer_drop_newest_policy():
+    """Test that drop-newest keeps queued audio and discards what does not fit."""
+    fifo = AudioRingBuffer(capacity=6, max_read=6, policy='drop-newest')
+    fifo.write(np.array([1, 2, 3, 4], dtype=np.int16))
+    fifo.write(np.array([5, 6, 7, 8], dtype=np.int16))
+    assert fifo.get_stats()['dropped_samples'] == 2
+    assert np.frombuffer(fifo.read(6, timeout=0), dtype=np.int16).tolist() == [1, 2, 3, 4, 5, 6]
+    
+    with pytest.raises(ValueError):
+        AudioRingBuffer(capacity=6, max_read=6, policy='drop-random')
+
+
+class FakeDetector:
+    """Provides the hooks SessionManager needs without loading a model."""
+    
+    config = {}
+    sample_rate = 16000
+    
+    def resolve_hotwords(self, hotword_name=None):
+        return {'safe_word': 'monster'}, False
+    
+    def create_spotter(self, matcher, grammar_mode=False):
+        return KeywordSpotter(FakeRecognizer([(True, 'monster')]), matcher)
+
+
+def test_session_manager_lifecycle():
+    """Test creating, feeding, listing and destroying a session."""
+    manager = SessionManager(FakeDetector(), max_workers=2)
+    created = manager.create_session()
+    assert created['success']
+    session_id = created['session_id']
+    
+    assert manager.feed(session_id, b'\x00' * 3200)['success']
+    manager.executor.shutdown(wait=True)
+    
+    detections = manager.poll_detections(session_id)
+    assert [d['hotword'] for d in detections] == ['safe_word']
+    assert detections[0]['session_id'] == session_id
+    
+    stats = manager.list_sessions()['sessions'][0]
+    assert stats['chunks'] == 1
+    assert stats['audio_seconds'] == 0.1
+    
+    assert manager.destroy_session(session_id)['success']
+    assert manager.list_sessions()['sessions'] == []
+    assert manager.feed(session_id, b'')['success'] is False
+
+
+def test_dispatcher_coalesces_repeats_within_window():
+    """Test that repeat detections of a hotword are folded into one event."""
+    dispatcher = DetectionDispatcher(max_workers=1, debounce_seconds=60)
+    delivered = []
+    done = threading.Event()
+    
+    def callback(detection):
+        delivered.append(detection)
+        done.set()
+    
+    assert dispatcher.dispatch(callback, {'hotword': 'safe_word'})
+    assert not dispatcher.dispatch(callback, {'hotword': 'safe_word'})
+    assert not dispatcher.dispatch(callback, {'hotword': 'safe_word'})
+    assert dispatcher.dispatch(callback, {'hotword': 'other'})
+    assert done.wait(2)
+    dispatcher.executor.shutdown(wait=True)
+    
+    assert len(delivered) == 2
+    assert delivered[0]['count'] == 3
+    stats = dispatcher.get_stats()
+    assert stats['dispatched'] == 2
+    assert stats['coalesced'] == 2
+    assert stats['in_flight'] == 0
+
+
+def test_dispatcher_debounce_window_slides_with_repeats(monkeypatch):
+    """Test that each repeat extends the debounce window until the hotword goes quiet."""
+    import dispatcher as dispatcher_module
+    clock = [100.0]
+    monkeypatch.setattr(dispatcher_module.time, 'monotonic', lambda: clock[0])
+    dispatcher = DetectionDispatcher(max_workers=1, debounce_seconds=1.0)
+    
+    assert dispatcher.dispatch(lambda d: None, {'hotword': 'safe_word'})
+    for _ in range(3):
+        clock[0] += 0.8  # past the first delivery's window, within the last repeat's
+        assert not dispatcher.dispatch(lambda d: None, {'hotword': 'safe_word'})
+    clock[0] += 1.5
+    assert dispatcher.dispatch(lambda d: None, {'hotword': 'safe_word'})
+    dispatcher.executor.shutdown(wait=True)
+    assert dispatcher.get_stats()['coalesced'] == 3
+
+
+def test_audio_sources_replay_file_and_record(tmp_path):
+    """Test headless sources: fast WAV replay and recording from a synthetic signal."""
+    recording = str(tmp_path / 'tone.wav')
+    source = SyntheticSource('tone', block_size=1600, realtime=False)
+    result = start_recording_to_file(1, recording, source=source)
+    assert result['success']
+    assert result['duration'] == 1.0
+    assert result['source'] == 'synthetic'
+    
+    received = []
+    replay = WavFileSource(recording, block_size=4000, realtime=False)
+    replay.start(received.append)
+    for _ in range(50):
+        if replay.finished:
+            break
+        threading.Event().wait(0.02)
+    replay.stop()
+    assert [len(block) for block in received] == [4000] * 4
+    assert replay.get_stats()['seconds_produced'] == 1.0
+    
+    with pytest.raises(ValueError, match='paths'):
+        create_source({'type': 'file'})
+    
+    # A non-realtime source that never delivers still ends at the deadline
+    idle = SocketSource(port=0)
+    started = time.monotonic()
+    result = start_recording_to_file(1, str(tmp_path / 'idle.wav'), source=idle, timeout=0.3)
+    assert time.monotonic() - started < 3
+    assert result['success'] and result['duration'] == 0
+
+
+def test_action_manager_records_without_live_recorder(tmp_path):
+    """Test that an attached listener without record_to_file falls back to the configured source."""
+    manager = ActionManager({
+        'recordings_dir': str(tmp_path),
+        'record_duration': 1,
+        'audio_source': {'type': 'synthetic', 'kind': 'tone', 'realtime': False}
+    })
+    manager.attach_live_audio(types.SimpleNamespace(is_listening=True))  # e.g. OVOSRunner
+    result = manager._record_audio()
+    assert result['success']
+    assert result['source'] == 'synthetic'
+
+
+def test_socket_source_reassembles_blocks():
+    """Test that raw PCM written to the socket arrives as fixed-size blocks."""
+    import socket
+    received = []
+    source = SocketSource(port=0, block_size=100)
+    source.start(received.append)
+    try:
+        with socket.create_connection(('127.0.0.1', source.port)) as conn:
+            conn.sendall(np.arange(250, dtype=np.int16).tobytes())
+        for _ in range(100):
+            if sum(len(block) for block in received) == 250:
+                break
+            threading.Event().wait(0.02)
+    finally:
+        source.stop()
+    assert [len(block) for block in received] == [100, 100, 50]
+    assert np.concatenate(received).tolist() == list(range(250))
+
+
+def test_session_stream_pushes_detections_and_finishes():
+    """Test a streaming connection: odd-sized pieces in, detections out, final flush."""
+    manager = SessionManager(FakeDetector(), max_workers=1)
+    stream = SessionStream(manager)
+    assert stream.opened['success']
+    
+    assert stream.write(b'\x00' * 3201)['success']  # odd byte carried over
+    assert stream.write(b'\x00')['success']
+    detections = stream.finish()
+    assert [d['hotword'] for d in detections] == ['safe_word']
+    
+    closed = stream.close()
+    assert closed['session']['chunks'] == 2
+    assert manager.list_sessions()['sessions'] == []
+
+
+def test_session_queue_cap_and_concurrent_create_limit():
+    """Test that a full session queue refuses or waits, and creates respect max_sessions."""
+    manager = SessionManager(FakeDetector(), max_workers=1, max_pending_chunks=2)
+    session_id = manager.create_session()['session_id']
+    gate = threading.Event()
+    manager.executor.submit(gate.wait)  # occupy the only worker
+    
+    assert manager.feed(session_id, b'\x00' * 320)['success']
+    assert manager.feed(session_id, b'\x00' * 320)['success']
+    full = manager.feed(session_id, b'\x00' * 320)
+    assert full['busy'] and not full['success']
+    assert manager.feed(session_id, b'\x00' * 320, timeout=0.05)['busy']
+    
+    threading.Timer(0.05, gate.set).start()
+    assert manager.feed(session_id, b'\x00' * 320, timeout=5)['success']
+    manager.executor.shutdown(wait=True)
+    
+    class SlowDetector(FakeDetector):
+        def create_spotter(self, matcher, grammar_mode=False):
+            time.sleep(0.05)
+            return super().create_spotter(matcher, grammar_mode)
+    
+    manager = SessionManager(SlowDetector(), max_workers=1, max_sessions=2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(manager.create_session()))
+               for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(r['success'] for r in results) == 2
+    assert len(manager.list_sessions()['sessions']) == 2
+    assert manager.create_session()['success'] is False
+
+
+def test_session_manager_reaps_idle_sessions():
+    """Test that sessions left without client activity are destroyed."""
+    manager = SessionManager(FakeDetector(), max_workers=1, max_sessions=2, idle_timeout=60)
+    stale = manager.create_session()['session_id']
+    active = manager.create_session()['session_id']
+    manager.sessions[stale].last_activity -= 120
+    
+    created = manager.create_session()
+    assert created['success']  # the stale session's slot was freed
+    listed = manager.list_sessions()
+    assert stale not in [s['id'] for s in listed['sessions']]
+    assert active in [s['id'] for s in listed['sessions']]
+    assert listed['reaped'] == 1
+    assert manager.feed(stale, b'')['success'] is False
+
+
+def import_vosk_wakeword(monkeypatch):
+    """Import vosk_wakeword against a stand-in vosk module whose recognizers are FakeRecognizers."""
+    import importlib
+    vosk = types.ModuleType('vosk')
+    
+    class Model:
+        def __init__(self, path):
+            self.path = path
+    
+    class KaldiRecognizer(FakeRecognizer):
+        def __init__(self, model, sample_rate, grammar=None):
+            super().__init__([(True, 'hey monster')])
+            self.model = model
+            self.grammar = grammar
+    
+    vosk.Model = Model
+    vosk.KaldiRecognizer = KaldiRecognizer
+    monkeypatch.setitem(sys.modules, 'vosk', vosk)
+    # Register first so teardown drops the module bound to the stand-in
+    monkeypatch.setitem(sys.modules, 'vosk_wakeword', types.ModuleType('vosk_wakeword'))
+    monkeypatch.delitem(sys.modules, 'vosk_wakeword')
+    return importlib.import_module('vosk_wakeword')
+
+
+def test_vosk_detector_adapts_block_size_to_speech(tmp_path, monkeypatch):
+    """Test that blocks drop to the minimum on speech and double back up in silence."""
+    vosk_wakeword = import_vosk_wakeword(monkeypatch)
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({'listener': {
+        'block_size': 8000, 'adaptive_block': {'enabled': True, 'min_block': 1600}
+    }}))
+    detector = vosk_wakeword.VoskWakeWordDetector(str(config_path))
+    assert (detector.min_block_size, detector.max_block_size) == (1600, 8000)
+    detector._activity = EnergyVAD(hangover_ms=0)
+    
+    silence = np.zeros(1600, dtype=np.int16).tobytes()
+    tone = (0.3 * 32767 * np.sin(2 * np.pi * 440 * np.arange(1600) / 16000)).astype(np.int16).tobytes()
+    sizes = []
+    for block in [silence, tone, silence, silence, silence, silence]:
+        detector._adapt_block_size(block)
+        sizes.append(detector.current_block_size)
+    assert sizes == [8000, 1600, 3200, 6400, 8000, 8000]
+    
+    # With the VAD gate on, its state decides instead of re-analysing the block
+    detector.vad = types.SimpleNamespace(active=True)
+    detector._adapt_block_size(silence)
+    assert detector.current_block_size == 1600
+
+
+def test_vosk_detector_grammar_resolution(tmp_path, monkeypatch):
+    """Test grammar building and when resolve_hotwords switches grammar mode on."""
+    assert build_grammar(['Hey Monster', ' hey monster', 'safe word', '']) == \
+        '["hey monster", "safe word", "[unk]"]'
+    
+    vosk_wakeword = import_vosk_wakeword(monkeypatch)
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({'hotwords': {
+        'monster': {'key_phrase': 'hey monster', 'grammar': True},
+        'safe_word': {'key_phrase': 'safe word', 'grammar': True},
+        'open': {'key_phrase': 'open sesame'},
+        'muted': {'key_phrase': 'not now', 'listen': False}
+    }}))
+    detector = vosk_wakeword.VoskWakeWordDetector(str(config_path))
+    detector.model_path = str(tmp_path)
+    
+    hotwords, grammar_mode = detector.resolve_hotwords()
+    assert sorted(hotwords) == ['monster', 'open', 'safe_word']
+    assert grammar_mode is False  # one open-vocabulary hotword disables the grammar
+    assert detector.resolve_hotwords('monster') == ({'monster': 'hey monster'}, True)
+    assert detector.resolve_hotwords('open')[1] is False
+    with pytest.raises(ValueError):
+        detector.resolve_hotwords('missing')
+    assert detector.get_status()['grammar'] is False
+    
+    # A listener started on one grammar hotword reports the mode it runs in
+    detector.hotwords, detector.grammar_mode = detector.resolve_hotwords('monster')
+    detector.is_listening = True
+    assert detector.get_status()['grammar'] is True
+    detector.is_listening = False
+    
+    matcher = PhraseMatcher({'monster': 'hey monster', 'safe_word': 'safe word'})
+    spotter = detector.create_spotter(matcher, grammar_mode=True)
+    assert spotter.recognizer.grammar == build_grammar(matcher.phrases)
+    assert detector.create_spotter(matcher).recognizer.grammar is None
+    assert spotter.accept(b'\x00' * 3200)['hotword'] == 'monster'
+    assert detector.unload_model()['success']
+
+
+def test_ovos_runner_consumer_feeds_engine_and_dispatches(tmp_path):
+    """Test the OVOS consumer thread: ring chunks in, one dispatched detection out."""
+    class FakeEngine:
+        def __init__(self):
+            self.chunks = []
+        
+        def update(self, chunk):
+            self.chunks.append(chunk)
+        
+        def found_wake_word(self):
+            return len(self.chunks) == 3
+    
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({
+        'hotwords': {'safe_word': {'module': 'fake', 'key_phrase': 'monster'}},
+        'listener': {'chunk_size': 1600, 'engine_cache': {'enabled': False}}
+    }))
+    runner = OVOSRunner(str(config_path))
+    engine = FakeEngine()
+    runner.engine_cache = OVOSEngineCache(max_entries=0, factory=lambda name, config: engine)
+    detected = []
+    done = threading.Event()
+    
+    def callback(detection):
+        detected.append(detection)
+        done.set()
+    
+    source = SyntheticSource('tone', block_size=1600, realtime=False, duration=0.5)
+    assert runner.start_listener(callback, 'safe_word', source=source)['success']
+    assert done.wait(5)
+    for _ in range(100):
+        if len(engine.chunks) == 5:
+            break
+        time.sleep(0.02)
+    assert runner.stop_listener()['success']
+    
+    assert len(engine.chunks) == 5
+    assert all(isinstance(chunk, bytes) and len(chunk) == 3200 for chunk in engine.chunks)
+    assert [d['hotword'] for d in detected] == ['safe_word']
+    assert detected[0]['key_phrase'] == 'monster'
+    assert runner.engine is None  # handed back to the cache
+
+
+class StubEngine:
+    """Engine with the readiness interface of VoskWakeWordDetector, no model."""
+    
+    is_ready = False
+    model_loading = False
+    model_error = None
+    model_load_time = None
+    
+    def warm_up(self):
+        self.is_ready = True
+        self.model_load_time = 0.1
+
+
+def test_engine_registry_creates_lazily_once(monkeypatch):
+    """Test that engines are built on first use only, and warm_up marks them ready."""
+    import engine_registry
+    monkeypatch.setattr(engine_registry, '_factories', {})
+    monkeypatch.setattr(engine_registry, '_engines', {})
+    built = []
+    engine_registry.register_engine('stub', lambda: built.append(StubEngine()) or built[-1])
+    
+    assert engine_registry.list_engines() == [{'name': 'stub', 'created': False, 'ready': False}]
+    assert built == []
+    
+    engine = engine_registry.get_engine('stub')
+    assert engine_registry.get_engine('stub') is engine
+    assert len(built) == 1
+    assert engine_registry.list_engines() == [{'name': 'stub', 'created': True, 'ready': False}]
+    
+    engine_registry.warm_up('stub')
+    assert len(built) == 1
+    assert engine_registry.list_engines()[0]['ready'] is True
+    with pytest.raises(KeyError):
+        engine_registry.get_engine('missing')
+
+
+def test_health_answers_before_warm_up(monkeypatch):
+    """Test that /health responds at once, reporting the model as not ready."""
+    import importlib
+    import actions
+    import engine_registry
+    monkeypatch.setattr(engine_registry, '_factories', {'vosk': StubEngine})
+    monkeypatch.setattr(engine_registry, '_engines', {})
+    monkeypatch.setattr(actions.action_manager, 'live_audio', None)
+    monkeypatch.delenv('DETECTOR_ENGINE', raising=False)
+    monkeypatch.delenv('DETECTOR_PROCESS', raising=False)
+    # Import the app against the stub registry; teardown drops this copy
+    monkeypatch.setitem(sys.modules, 'app', types.ModuleType('app'))
+    monkeypatch.delitem(sys.modules, 'app')
+    app = importlib.import_module('app')
+    client = app.app.test_client()
+    
+    start = time.perf_counter()
+    response = client.get('/health')
+    assert time.perf_counter() - start < 1
+    assert response.status_code == 200
+    health = response.get_json()
+    assert health['ready'] is False
+    assert health['model'] == {'loaded': False, 'loading': False, 'error': None, 'load_time': None}
+    
+    engine_registry.warm_up('vosk')
+    health = client.get('/health').get_json()
+    assert health['ready'] is True
+    assert {'name': 'vosk', 'created': True, 'ready': True} in health['engines']
+
+
+def test_capture_bus_fans_out_views_to_each_subscriber():
+    """Test that every subscriber reads the same audio at its own pace."""
+    bus = CaptureBus(sample_rate=10, capacity_seconds=1)  # 10-sample ring
+    fast = bus.subscribe('fast', max_read=4)
+    slow = bus.subscribe('slow', max_read=4)
+    
+    bus.write(np.arange(6, dtype=np.int16))
+    block = fast.read(4, timeout=0)
+    assert block.tolist() == [0, 1, 2, 3]
+    assert block.base is not None and not block.flags.writeable  # view into the ring
+    assert slow.read(2, timeout=0).tolist() == [0, 1]
+    assert slow.lag == 4
+    
+    bus.write(np.arange(6, 12, dtype=np.int16))
+    assert fast.read(4, timeout=0).tolist() == [4, 5, 6, 7]
+    assert fast.read(4, timeout=0).tolist() == [8, 9, 10, 11]  # wraps
+    # The slow reader was lapped and skips to the oldest buffered sample
+    assert slow.read(4, timeout=0).tolist() == [2, 3, 4, 5]
+    assert fast.read(4, timeout=0) is None
+    
+    late = bus.subscribe('recording', max_read=4, history_seconds=0.3)
+    assert late.read(3, timeout=0).tolist() == [9, 10, 11]
+    
+    # A block larger than the ring keeps only its newest samples
+    bus.write(np.arange(12, 27, dtype=np.int16))
+    assert bus.write_pos == 27
+    assert fast.read(4, timeout=0).tolist() == [17, 18, 19, 20]
+    assert fast.dropped_samples == 5
+    assert fast.read(4, timeout=0).tolist() == [21, 22, 23, 24]
+    bus.stop()
+    assert fast.read(4, timeout=1) is None  # closed bus wakes readers
+    assert [s['name'] for s in bus.get_stats()['subscribers']] == ['fast', 'slow', 'recording']
+
+
+def test_ensemble_stop_when_idle_matches_other_listeners():
+    """Test that stopping an idle ensemble is a no-op like the other listeners."""
+    listener = EnsembleListener(FakeDetector())
+    assert listener.stop_listener() == {'success': True, 'message': 'No listener running'}
+
+
+def test_ensemble_threshold_overrides_copy_config_and_share_meaning(monkeypatch):
+    """Test that a start threshold never leaks into the config and means the same to every engine."""
+    import ensemble
+    built = []
+    monkeypatch.setattr(ensemble, 'engine_cache', OVOSEngineCache(
+        factory=lambda name, config: built.append(config) or types.SimpleNamespace()))
+    
+    class ConfiguredDetector(FakeDetector):
+        config = {'hotwords': {'safe_word': {'key_phrase': 'monster', 'sensitivity': 0.5}}}
+        block_size = 8000
+    
+    listener = EnsembleListener(ConfiguredDetector(), {'precise': {'model': 'safe.pb'}})
+    ovos = listener.create_engine('ovos', threshold=0.8)
+    ovos.open()
+    assert built[0]['hotwords']['safe_word']['sensitivity'] == pytest.approx(0.2)
+    assert ConfiguredDetector.config['hotwords']['safe_word']['sensitivity'] == 0.5
+    ovos.close()
+    
+    assert listener.create_engine('precise', threshold=0.8).sensitivity == pytest.approx(0.2)
+    assert listener.create_engine('vosk', threshold=0.8).threshold == 0.8
+
+
+def test_vote_fuser_rules():
+    """Test any / all / k-of-n fusion of tagged engine detections."""
+    def vote(engine, t):
+        return {'hotword': 'safe_word', 'engine': engine, 'audio_time': t, 'confidence': 0.9}
+    
+    any_vote = VoteFuser(['vosk', 'ovos'], 'any')
+    assert any_vote.add(vote('ovos', 1.0))['engines'] == ['ovos']
+    
+    two_of_three = VoteFuser(['vosk', 'ovos', 'precise'], 'k-of-n', k=2, window_seconds=1.0)
+    assert two_of_three.add(vote('vosk', 1.0)) is None
+    assert two_of_three.add(vote('vosk', 1.2)) is None  # same engine twice is one vote
+    fused = two_of_three.add(vote('precise', 1.5))
+    assert fused['engines'] == ['vosk', 'precise']
+    assert fused['vote'] == '2-of-3'
+    assert fused['engine'] == 'ensemble'
+    
+    all_vote = VoteFuser(['vosk', 'ovos'], 'all', window_seconds=1.0)
+    assert all_vote.add(vote('vosk', 1.0)) is None
+    assert all_vote.add(vote('ovos', 3.0)) is None  # outside the window
+    assert all_vote.add(vote('vosk', 3.5))['audio_time'] == 3.5
+    
+    with pytest.raises(ValueError):
+        VoteFuser(['vosk'], 'k-of-n', k=2)
+
+
+def test_ovos_engine_cache_reuses_and_evicts_on_config_change():
+    """Test that a restart reuses a warm engine and a config change replaces it."""
+    class FakePlugin:
+        def __init__(self):
+            self.resets = 0
+            self.shut_down = False
+        
+        def reset(self):
+            self.resets += 1
+        
+        def shutdown(self):
+            self.shut_down = True
+    
+    cache = OVOSEngineCache(max_entries=2, factory=lambda name, config: FakePlugin())
+    config = {'hotwords': {'safe_word': {'key_phrase': 'monster', 'sensitivity': 0.5}}}
+    
+    first, cached = cache.acquire('safe_word', config)
+    assert not cached
+    # Still in use, so a second caller gets its own engine
+    second, cached = cache.acquire('safe_word', config)
+    assert second is not first and not cached
+    cache.release(second)
+    assert second.shut_down
+    
+    cache.release(first)
+    again, cached = cache.acquire('safe_word', config)
+    assert again is first and cached
+    assert first.resets == 1
+    cache.release(again)
+    
+    config['hotwords']['safe_word']['key_phrase'] = 'pineapple'
+    changed, cached = cache.acquire('safe_word', config)
+    assert not cached
+    assert first.shut_down
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 3, 1)
+    assert len(stats['entries']) == 1
+
+
+def test_model_registry_shares_and_evicts(tmp_path, monkeypatch):
+    """Test that one model is shared by reference and dropped with its last user."""
+    loads = []
+    registry = ModelRegistry(loader=lambda path: loads.append(path) or object())
+    
+    model = registry.acquire(str(tmp_path))
+    assert registry.acquire(str(tmp_path / '.')) is model
+    assert len(loads) == 1
+    assert registry.get_stats()['models'][0]['refs'] == 2
+    
+    # The vosk plugin's KaldiModel() is routed to the registry while creating
+    # an engine; shaped like ovos-ww-plugin-vosk, which builds its recognizer
+    # in ModelContainer.get_model
+    plugin = types.ModuleType('ovos_ww_plugin_vosk')
+    plugin.KaldiModel = lambda path: pytest.fail('plugin loaded its own model')
+    
+    class ModelContainer:
+        def get_model(self, model_path):
+            return FakeRecognizer([]), plugin.KaldiModel(model_path)
+    
+    plugin.ModelContainer = ModelContainer
+    monkeypatch.setitem(sys.modules, 'ovos_ww_plugin_vosk', plugin)
+    original = plugin.KaldiModel
+    with registry.plugin_models() as acquired:
+        _, plugin_model = ModelContainer().get_model(str(tmp_path))
+    assert plugin_model is model
+    assert acquired == [str(tmp_path)]
+    assert plugin.KaldiModel is original
+    assert registry.get_stats()['models'][0]['refs'] == 3
+    
+    # A plugin version without the hook point loads its own model (with a warning)
+    del plugin.KaldiModel
+    with registry.plugin_models() as acquired:
+        pass
+    assert acquired == []
+    
+    for _ in range(3):
+        registry.release(str(tmp_path))
+    stats = registry.get_stats()
+    assert stats['models'] == []
+    assert stats['evictions'] == 1
+
+
+def test_ovos_engine_cache_reset_clears_vosk_plugin_state():
+    """Test that a reused vosk plugin engine starts without stale audio or decoder state."""
+    class FakeStream:
+        def __init__(self):
+            self.data = b''
+        
+        def write(self, chunk):
+            self.data += chunk
+        
+        def clear(self):
+            self.data = b''
+    
+    class FakeVoskPlugin:
+        """Attributes as in ovos-ww-plugin-vosk's VoskWakeWordPlugin."""
+        def __init__(self):
+            self.buffer = FakeStream()
+            self.model = type('ModelContainer', (), {})()
+            self.model.engine = FakeRecognizer([])
+            self._counter = 0
+        
+        def update(self, chunk):
+            self.buffer.write(chunk)
+        
+        def reset(self):
+            pass  # OPM's base HotWordEngine.reset() does nothing
+    
+    cache = OVOSEngineCache(factory=lambda name, config: FakeVoskPlugin())
+    config = {'hotwords': {'safe_word': {'key_phrase': 'monster'}}}
+    engine, _ = cache.acquire('safe_word', config)
+    engine.update(b'\x01\x00' * 1600)
+    engine._counter = 0.8
+    cache.release(engine)
+    
+    again, cached = cache.acquire('safe_word', config)
+    assert cached and again is engine
+    assert engine.buffer.data == b''
+    assert engine.model.engine.resets == 1
+    assert engine._counter == 0
+
+
+class ProcessFakeDetector:
+    """Detector run inside the spawned child by the DetectorProcess smoke test."""
+    
+    is_ready = True
+    model_loading = False
+    model_error = None
+    model_load_time = 0.0
+    
+    def __init__(self, config_path=None):
+        self.is_listening = False
+    
+    def warm_up(self):
+        pass
+    
+    def start_listener(self, callback, hotword_name=None, threshold=None):
+        if hotword_name == 'slow':
+            time.sleep(1.5)  # like a first start that loads the model
+        self.is_listening = True
+        threading.Timer(0.1, callback, args=({'hotword': 'safe_word', 'text': 'monster'},)).start()
+        return {'success': True}
+    
+    def stop_listener(self):
+        self.is_listening = False
+        return {'success': True, 'message': 'Listener stopped'}
+    
+    def get_status(self):
+        return {'listening': self.is_listening}
+    
+    def record_to_file(self, duration, output_path, preroll_seconds=None):
+        time.sleep(duration)
+        return {'success': True, 'path': output_path}
+
+
+def create_process_fake_detector(config_path):
+    return ProcessFakeDetector(config_path)
+
+
+def test_detector_process_spawn_smoke(tmp_path):
+    """Test the spawned child: detections reach the callback and a recording
+    does not block other commands."""
+    proc = DetectorProcess(str(tmp_path / 'missing.json'),
+                           detector_factory=create_process_fake_detector)
+    try:
+        detected = threading.Event()
+        assert proc.start_listener(lambda detection: detected.set())['success']
+        assert detected.wait(10)
+        assert proc.dispatcher.get_stats()['dispatched'] == 1
+        
+        recorded = {}
+        recorder = threading.Thread(
+            target=lambda: recorded.update(proc.record_to_file(1.0, str(tmp_path / 'alert.wav'))))
+        recorder.start()
+        time.sleep(0.3)
+        start = time.perf_counter()
+        status = proc.get_status()
+        assert time.perf_counter() - start < 0.5
+        assert status['listening']
+        assert status['process']['recordings_in_progress'] == 1
+        
+        recorder.join(10)
+        assert recorded['success']
+        assert proc.stop_listener()['success']
+        
+        # A slow start does not hold up status queries
+        starter = threading.Thread(target=proc.start_listener, args=(lambda d: None, 'slow'))
+        starter.start()
+        time.sleep(0.3)
+        start = time.perf_counter()
+        assert proc.get_status()['listening'] is False
+        assert time.perf_counter() - start < 0.5
+        starter.join(10)
+        assert proc.get_status()['listening']
+        assert proc.stop_listener()['success']
+    finally:
+        proc.shutdown()
+    assert not proc.is_alive
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
@@ -0,0 +1,128 @@
+"""
+Energy / zero-crossing voice activity gate for the capture path.
+Sits between the audio stream and the recognizer so silence never reaches
+KaldiRecognizer.AcceptWaveform.
+"""
+import collections
+from typing import Dict, List, Tuple
+import numpy as np
+
+
+class EnergyVAD:
+    """Vectorized energy + zero-crossing-rate speech gate with hangover."""
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20,
+                 threshold_db: float = -45.0, zcr_threshold: float = 0.25,
+                 hangover_ms: int = 400, pre_speech_ms: int = 300):
+        """
+        Initialize the gate.
+
+        Args:
+            sample_rate: Sample rate of the int16 PCM blocks
+            frame_ms: Analysis frame length inside each block
+            threshold_db: Frame energy (dBFS) above which a frame is voiced
+            zcr_threshold: Zero-crossing rate above which a quieter frame
+                (down to threshold_db - 10) counts as unvoiced speech
+            hangover_ms: Audio kept flowing after the last speech frame
+            pre_speech_ms: Audio buffered while closed and replayed on opening
+        """
+        self.sample_rate = sample_rate
+        self.frame_len = max(1, sample_rate * frame_ms // 1000)
+        self.threshold_db = threshold_db
+        self.zcr_threshold = zcr_threshold
+        self.hangover_samples = sample_rate * hangover_ms // 1000
+        self.pre_speech_samples = sample_rate * pre_speech_ms // 1000
+
+        self.active = False
+        self._hang_remaining = 0
+        self._pre_buffer: collections.deque = collections.deque()
+        self._pre_buffered = 0
+
+        self.frames_processed = 0
+        self.frames_skipped = 0
+
+    @classmethod
+    def from_config(cls, vad_config: Dict, sample_rate: int = 16000) -> 'EnergyVAD':
+        """Build a gate from the listener 'vad' config section."""
+        return cls(
+            sample_rate=sample_rate,
+            frame_ms=vad_config.get('frame_ms', 20),
+            threshold_db=vad_config.get('threshold_db', -45.0),
+            zcr_threshold=vad_config.get('zcr_threshold', 0.25),
+            hangover_ms=vad_config.get('hangover_ms', 400),
+            pre_speech_ms=vad_config.get('pre_speech_ms', 300)
+        )
+
+    def is_speech(self, samples: np.ndarray) -> bool:
+        """Return True if any analysis frame in the block looks like speech."""
+        n_frames = len(samples) // self.frame_len
+        if n_frames == 0:
+            frames = samples.reshape(1, -1)
+        else:
+            frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+
+        x = frames.astype(np.float32)
+        energy = np.mean(x * x, axis=1)
+        energy_db = 10.0 * np.log10(energy / (32768.0 ** 2) + 1e-12)
+
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        voiced = energy_db > self.threshold_db
+        unvoiced = (energy_db > self.threshold_db - 10.0) & (zcr > self.zcr_threshold)
+        return bool(np.any(voiced | unvoiced))
+
+    def process(self, data: bytes) -> Tuple[List[bytes], bool]:
+        """
+        Gate one block of int16 PCM.
+
+        Returns:
+            (blocks to feed to the recognizer, True if speech just ended)
+        """
+        samples = np.frombuffer(data, dtype=np.int16)
+
+        if self.is_speech(samples):
+            self._hang_remaining = self.hangover_samples
+            if self.active:
+                self.frames_processed += 1
+                return [data], False
+
+            # Gate opens: replay the pre-speech buffer first
+            self.active = True
+            blocks = list(self._pre_buffer) + [data]
+            self.frames_processed += len(blocks)
+            self.frames_skipped -= len(self._pre_buffer)
+            self._pre_buffer.clear()
+            self._pre_buffered = 0
+            return blocks, False
+
+        if self.active:
+            self._hang_remaining -= len(samples)
+            if self._hang_remaining > 0:
+                self.frames_processed += 1
+                return [data], False
+            self.active = False
+            self._buffer(data)
+            return [], True
+
+        self._buffer(data)
+        return [], False
+
+    def _buffer(self, data: bytes) -> None:
+        """Keep the most recent pre_speech_ms of skipped audio."""
+        self.frames_skipped += 1
+        self._pre_buffer.append(data)
+        self._pre_buffered += len(data) // 2
+        while self._pre_buffer and \
+                self._pre_buffered - len(self._pre_buffer[0]) // 2 >= self.pre_speech_samples:
+            self._pre_buffered -= len(self._pre_buffer.popleft()) // 2
+
+    def get_stats(self) -> Dict[str, object]:
+        """Counters for frames passed to vs. withheld from the recognizer."""
+        total = self.frames_processed + self.frames_skipped
+        return {
+            'active': self.active,
+            'frames_processed': self.frames_processed,
+            'frames_skipped': self.frames_skipped,
+            'skip_ratio': round(self.frames_skipped / total, 3) if total else 0.0
+        }
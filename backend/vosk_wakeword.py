@@ -3,11 +3,19 @@ Direct Vosk-based wake word detection (bypassing OVOS plugin).
 This works by using Vosk's speech recognition and comparing transcriptions.
 """
 import json
-import queue
 import threading
-from typing import Optional, Callable, Dict, Any
-import sounddevice as sd
+import time
+from typing import Optional, Callable, Dict, Any, List, Tuple
+import numpy as np
 from vosk import Model, KaldiRecognizer
+from keyword_spotter import KeywordSpotter, PhraseMatcher, active_hotwords, build_grammar
+from vad import EnergyVAD
+from ring_buffer import AudioRingBuffer, PCMRingBuffer
+from audio_utils import write_wav
+from metrics import LatencyStats, process_memory
+from dispatcher import DetectionDispatcher
+from audio_source import AudioSource, create_source
+from model_registry import model_registry
 
 
 class VoskWakeWordDetector:
@@ -21,22 +29,158 @@ class VoskWakeWordDetector:
         )
         self.config = self._load_config()
         
-        # Vosk model
-        model_path = os.path.expanduser("~/.local/share/vosk/vosk-model-small-en-us-0.15")
-        self.model = Model(model_path)
-        self.recognizer = None
+        # Vosk model (loaded lazily on first use or by warm_up)
+        self.model_path = os.path.expanduser("~/.local/share/vosk/vosk-model-small-en-us-0.15")
+        self._model: Optional[Model] = None
+        self._model_lock = threading.Lock()
+        self.model_loading = False
+        self.model_error: Optional[str] = None
+        self.model_load_time: Optional[float] = None
+        self.grammar_mode = False
+        self.grammar: Optional[str] = None
+        self.listen_hotword: Optional[str] = None
+        self.hotwords: Dict[str, str] = {}
+        self.matcher: Optional[PhraseMatcher] = None
+        self.spotter: Optional[KeywordSpotter] = None
         
         # Detection state
         self.is_listening = False
-        self.stream = None
-        self.audio_queue = queue.Queue()
+        self.source: Optional[AudioSource] = None
         self.detection_callback: Optional[Callable] = None
         self.listener_thread: Optional[threading.Thread] = None
+        self.dispatcher = DetectionDispatcher.from_config(self.config)
+        
+        # Config change waiting to be applied by the decode thread
+        self._pending_reconfig: Optional[Dict[str, Any]] = None
+        self._reconfig_lock = threading.Lock()
+        self.last_reconfigure: Optional[Dict[str, Any]] = None
         
         # Audio settings
         listener_config = self.config.get('listener', {})
         self.sample_rate = listener_config.get('sample_rate', 16000)
+        self.source_config = self.config.get('audio_source', {})
+        
+        # Samples per recognizer call: larger blocks cost less CPU per second
+        # of audio, smaller blocks cut buffering latency
+        self.block_size = listener_config.get('block_size', 8000)
+        adaptive_config = listener_config.get('adaptive_block', {})
+        self.adaptive_block = adaptive_config.get('enabled', False)
+        self.min_block_size = adaptive_config.get('min_block', 1600)
+        self.max_block_size = adaptive_config.get('max_block', self.block_size)
+        self.current_block_size = self.block_size
+        self._activity: Optional[EnergyVAD] = None
+        
+        # Overflow handling when decoding falls behind real time:
+        # drop-oldest, drop-newest, or degrade (shed partials and silence
+        # once lag passes degrade_lag_ms, drop-oldest if still full)
+        overflow_config = listener_config.get('overflow', {})
+        self.overflow_policy = overflow_config.get('policy', 'drop-oldest')
+        if self.overflow_policy not in ('drop-oldest', 'drop-newest', 'degrade'):
+            print(f"⚠️  Unknown overflow policy '{self.overflow_policy}', using drop-oldest")
+            self.overflow_policy = 'drop-oldest'
+        self.degrade_lag_ms = overflow_config.get('degrade_lag_ms', 1000)
+        self.recover_lag_ms = overflow_config.get('recover_lag_ms', 250)
+        self.degraded = False
+        self.degrade_stats = {'entered': 0, 'skipped_blocks': 0}
+        self._degrade_vad: Optional[EnergyVAD] = None
+        self.max_lag_ms = 0.0
+        
+        # Preallocated capture FIFO between the audio callback and decoder
+        self.audio_buffer = AudioRingBuffer(
+            int(listener_config.get('buffer_seconds', 10) * self.sample_rate),
+            max(self.block_size, self.max_block_size),
+            'drop-newest' if self.overflow_policy == 'drop-newest' else 'drop-oldest'
+        )
+        self.early_trigger = listener_config.get('early_trigger', False)
+        self.partial_stability = listener_config.get('partial_stability', 2)
+        
+        # Partial transcripts are opt-in: nothing is requested from the
+        # recognizer unless a subscriber (or early trigger) needs them
+        self.partial_interval = listener_config.get('partial_interval_ms', 250) / 1000
+        self.print_partials = listener_config.get('print_partials', False)
+        self._partial_subscribers: List[Callable[[str], None]] = []
+        # Top-K hypotheses matched per utterance (0 = best hypothesis only)
+        self.max_alternatives = listener_config.get('max_alternatives', 0)
+        # N-best matches are gated on their share of the list's score
+        self.alternatives_temperature = listener_config.get('alternatives_temperature', 10.0)
+        self.min_alternatives_share = listener_config.get('min_alternatives_share', 0.1)
+        
+        # Recognizer lifecycle for 24/7 listening: reset (or recreate) the
+        # recognizer at an utterance boundary every reset_after seconds
+        reset_config = listener_config.get('recognizer_reset', {})
+        self.reset_after = reset_config.get('after_seconds', 0)
+        self.recycle_recognizer = reset_config.get('recycle', False)
+        self.decode_stats = LatencyStats()
+        self.last_detection: Optional[Dict[str, Any]] = None
+        self.threshold: Optional[float] = None
+        self.vad_config = listener_config.get('vad', {})
+        self.vad: Optional[EnergyVAD] = None
+        
+        # Pre-roll history and live taps for alert recordings
+        self.preroll_seconds = listener_config.get('preroll_seconds', 5)
+        self.preroll = PCMRingBuffer(int(self.preroll_seconds * self.sample_rate))
+        self._taps: List[Callable[[bytes], None]] = []
+        self._tap_lock = threading.Lock()
+        
+    @property
+    def model(self) -> Model:
+        """The Vosk model, loaded on first access (shared process-wide)."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self.model_loading = True
+                    start = time.perf_counter()
+                    try:
+                        self._model = model_registry.acquire(self.model_path)
+                        self.model_error = None
+                        self.model_load_time = round(time.perf_counter() - start, 2)
+                    except Exception as e:
+                        self.model_error = str(e)
+                        raise
+                    finally:
+                        self.model_loading = False
+        return self._model
+    
+    def unload_model(self) -> Dict[str, Any]:
+        """
+        Release this detector's reference to the model.
+        
+        The model is freed once no other user (e.g. the OVOS vosk plugin)
+        holds it; the next start loads it again.
+        """
+        if self.is_listening:
+            return {'success': False, 'error': 'Listener running'}
+        with self._model_lock:
+            if self._model is None:
+                return {'success': True, 'message': 'Model not loaded'}
+            self._model = None
+            self.spotter = None
+            model_registry.release(self.model_path)
+        return {'success': True, 'message': 'Model released'}
+    
+    @property
+    def recognizer(self) -> Optional[KaldiRecognizer]:
+        """The listener's current recognizer (replaced when recycled)."""
+        return self.spotter.recognizer if self.spotter else None
+    
+    @property
+    def is_ready(self) -> bool:
+        """True once the model is loaded and detection can start instantly."""
+        return self._model is not None
+    
+    def warm_up(self) -> threading.Thread:
+        """Load the model in a background thread."""
+        def load():
+            try:
+                self.model
+                print(f"✓ Vosk model loaded in {self.model_load_time}s")
+            except Exception as e:
+                print(f"✗ Failed to load Vosk model: {e}")
         
+        thread = threading.Thread(target=load, daemon=True)
+        thread.start()
+        return thread
+    
     def _load_config(self) -> Dict:
         """Load configuration from JSON file."""
         try:
@@ -45,49 +189,101 @@ class VoskWakeWordDetector:
         except FileNotFoundError:
             return {'hotwords': {'safe_word': {'key_phrase': 'hello'}}}
     
-    def start_listener(self, callback: Callable, hotword_name: str = 'safe_word',
-                      threshold: Optional[float] = None) -> Dict[str, Any]:
-        """Start listening for wake word."""
+    def start_listener(self, callback: Callable, hotword_name: Optional[str] = None,
+                      threshold: Optional[float] = None,
+                      source: Optional[AudioSource] = None) -> Dict[str, Any]:
+        """
+        Start listening for wake words.
+        
+        Args:
+            callback: Called with the detection dict when a hotword fires
+            hotword_name: Listen for this hotword only (default: every
+                hotword with listen enabled, matched in one decoding pass)
+            threshold: Minimum word confidence (0-1) for a detection;
+                overrides the per-hotword sensitivity when given
+            source: Audio to listen to (default: the 'audio_source' config
+                section, which defaults to the microphone)
+        """
         if self.is_listening:
             return {'success': False, 'error': 'Listener already running'}
         
         try:
             # Get wake word configuration
-            hotword_config = self.config.get('hotwords', {}).get(hotword_name, {})
-            if not hotword_config:
-                return {'success': False, 'error': f'Hotword "{hotword_name}" not found'}
+            try:
+                self.hotwords, self.grammar_mode = self.resolve_hotwords(hotword_name)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}
             
-            self.wake_phrase = hotword_config.get('key_phrase', '').lower()
+            self.listen_hotword = hotword_name
+            self.matcher = PhraseMatcher(self.hotwords)
+            self.grammar = build_grammar(self.matcher.phrases) if self.grammar_mode else None
+            self.wake_phrase = ', '.join(self.matcher.phrases)
             self.detection_callback = callback
+            self.threshold = threshold
+            self.decode_stats.reset()
+            self.dispatcher.reset()
             
             print(f"\n{'='*60}")
             print(f"✓ Vosk Wake Word Detector Starting")
-            print(f"  Target phrase: '{self.wake_phrase}'")
+            print(f"  Target phrases: '{self.wake_phrase}'")
             print(f"  Sample rate: {self.sample_rate} Hz")
+            if self.adaptive_block:
+                print(f"  Block size: adaptive {self.min_block_size}-{self.max_block_size}")
+            else:
+                print(f"  Block size: {self.block_size}")
+            print(f"  Vocabulary: {'grammar' if self.grammar_mode else 'open'}")
+            print(f"  Early trigger: {'on' if self.early_trigger else 'off'}")
+            print(f"  N-best: {self.max_alternatives or 'off'}")
+            if self.reset_after:
+                mode = 'recycle' if self.recycle_recognizer else 'reset'
+                print(f"  Recognizer {mode}: every {self.reset_after}s")
+            print(f"  VAD gate: {'on' if self.vad_config.get('enabled', False) else 'off'}")
             print(f"{'='*60}\n")
             
             # Create recognizer
-            self.recognizer = KaldiRecognizer(self.model, self.sample_rate)
+            self.spotter = self.create_spotter(
+                self.matcher,
+                self.grammar_mode,
+                min_confidence=self.confidence_thresholds(self.hotwords, threshold),
+                on_text=lambda text: print(f"📝 Recognized: \"{text}\""),
+                on_partial=self._print_partial if self.print_partials else None
+            )
+            for subscriber in self._partial_subscribers:
+                self.spotter.subscribe_partials(subscriber)
+            self.vad = None
+            if self.vad_config.get('enabled', False):
+                self.vad = EnergyVAD.from_config(self.vad_config, self.sample_rate)
+            
+            self.degraded = False
+            self.degrade_stats = {'entered': 0, 'skipped_blocks': 0}
+            self.max_lag_ms = 0.0
+            self._degrade_vad = None
+            if self.overflow_policy == 'degrade':
+                self._degrade_vad = self.vad or EnergyVAD.from_config(self.vad_config, self.sample_rate)
             
-            # Start audio stream
+            # Adaptive blocks: small while speech is active, growing in silence.
+            # Capture at the smallest size and let the decoder read larger blocks.
+            if self.adaptive_block:
+                self._activity = self.vad or EnergyVAD.from_config(self.vad_config, self.sample_rate)
+                self.current_block_size = self.max_block_size
+                capture_block_size = self.min_block_size
+            else:
+                self.current_block_size = capture_block_size = self.block_size
+            
+            # Start audio source
+            self.source = source or create_source(self.source_config, self.sample_rate,
+                                                  capture_block_size)
+            # Sources faster than real time wait for the decoder instead of
+            # overrunning the ring
+            blocking = not self.source.realtime
             self.is_listening = True
             
-            def audio_callback(indata, frames, time, status):
-                """Queue audio for processing."""
-                if status:
-                    print(f"Audio status: {status}")
+            def on_audio(samples: np.ndarray) -> None:
+                """Queue audio for processing (copied once into the ring)."""
                 if self.is_listening:
-                    self.audio_queue.put(bytes(indata))
-            
-            self.stream = sd.RawInputStream(
-                samplerate=self.sample_rate,
-                blocksize=8000,
-                dtype='int16',
-                channels=1,
-                callback=audio_callback
-            )
+                    self.audio_buffer.write(samples, block=blocking)
             
-            self.stream.start()
+            self.source.start(on_audio)
             
             # Start processing thread
             self.listener_thread = threading.Thread(target=self._process_audio, daemon=True)
@@ -98,56 +294,359 @@ class VoskWakeWordDetector:
             return {
                 'success': True,
                 'key_phrase': self.wake_phrase,
-                'sample_rate': self.sample_rate
+                'hotwords': self.matcher.hotwords,
+                'min_confidence': self.spotter.min_confidence,
+                'sample_rate': self.sample_rate,
+                'grammar': self.grammar_mode
             }
             
         except Exception as e:
             self.is_listening = False
             return {'success': False, 'error': f'Failed to start: {str(e)}'}
     
+    def resolve_hotwords(self, hotword_name: Optional[str] = None) -> Tuple[Dict[str, str], bool]:
+        """
+        Work out which hotwords to listen for.
+        
+        Args:
+            hotword_name: A single hotword, or None for every hotword with
+                listen enabled
+            
+        Returns:
+            (hotword name to key phrase, whether to use grammar mode)
+            
+        Raises:
+            ValueError: If the hotword is unknown or no phrase is configured
+        """
+        hotwords_config = self.config.get('hotwords', {})
+        if hotword_name is not None:
+            if hotword_name not in hotwords_config:
+                raise ValueError(f'Hotword "{hotword_name}" not found')
+            hotwords_config = {hotword_name: hotwords_config[hotword_name]}
+            hotwords = {hotword_name: hotwords_config[hotword_name].get('key_phrase', '')}
+        else:
+            hotwords = active_hotwords(hotwords_config)
+        
+        if not any(phrase.strip() for phrase in hotwords.values()):
+            raise ValueError('No hotwords with a key phrase to listen for')
+        
+        # The grammar constrains every phrase, so all hotwords must opt in
+        grammar_mode = all(hotwords_config[name].get('grammar', False) for name in hotwords)
+        return hotwords, grammar_mode
+    
+    def _default_grammar_mode(self) -> bool:
+        """Whether a start without a hotword name would use grammar mode."""
+        try:
+            return self.resolve_hotwords()[1]
+        except ValueError:
+            return False
+    
+    def confidence_thresholds(self, hotwords: Dict[str, str],
+                              threshold: Optional[float] = None) -> Dict[str, float]:
+        """
+        Minimum word confidence per hotword.
+        
+        An explicit threshold applies to every hotword; otherwise each uses
+        1 - sensitivity, so a more sensitive hotword accepts lower scores.
+        """
+        if threshold is not None:
+            return {name: float(threshold) for name in hotwords}
+        
+        hotwords_config = self.config.get('hotwords', {})
+        return {
+            name: 1.0 - float(hotwords_config.get(name, {}).get('sensitivity', 0.5))
+            for name in hotwords
+        }
+    
+    def create_spotter(self, matcher: PhraseMatcher, grammar_mode: bool = False,
+                       **kwargs) -> KeywordSpotter:
+        """
+        Create a keyword spotter with its own recognizer on the shared model.
+        
+        In grammar mode the decoder only searches the hotword phrases plus an
+        [unk] filler, which is far cheaper per second of audio than the
+        open-vocabulary graph.
+        """
+        make_recognizer = self._recognizer_factory(
+            build_grammar(matcher.phrases) if grammar_mode else None
+        )
+        
+        kwargs.setdefault('min_confidence', self.confidence_thresholds(matcher.hotwords))
+        kwargs.setdefault('early_trigger', self.early_trigger)
+        kwargs.setdefault('partial_stability', self.partial_stability)
+        kwargs.setdefault('partial_interval', self.partial_interval)
+        kwargs.setdefault('max_alternatives', self.max_alternatives)
+        kwargs.setdefault('alternatives_temperature', self.alternatives_temperature)
+        kwargs.setdefault('min_alternatives_share', self.min_alternatives_share)
+        kwargs.setdefault('reset_after', self.reset_after)
+        if self.recycle_recognizer:
+            kwargs.setdefault('recognizer_factory', make_recognizer)
+        return KeywordSpotter(make_recognizer(), matcher, self.sample_rate, **kwargs)
+    
+    def _recognizer_factory(self, grammar: Optional[str] = None) -> Callable[[], KaldiRecognizer]:
+        """Return a function creating recognizers on the shared model."""
+        def make_recognizer() -> KaldiRecognizer:
+            if grammar:
+                return KaldiRecognizer(self.model, self.sample_rate, grammar)
+            return KaldiRecognizer(self.model, self.sample_rate)
+        return make_recognizer
+    
+    def reconfigure(self, timeout: float = 2.0) -> Dict[str, Any]:
+        """
+        Apply the current hotword config to the running listener.
+        
+        The new matcher (and, in grammar mode, a recognizer for the new
+        grammar) is built on the calling thread; the decode thread swaps it
+        in between two chunks, so the audio stream is never interrupted.
+        
+        Returns:
+            Dict with success status, the new hotwords, the time the swap
+            took on the decode thread and the total time until it applied
+        """
+        start = time.perf_counter()
+        try:
+            hotwords, grammar_mode = self.resolve_hotwords(self.listen_hotword)
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+        
+        matcher = PhraseMatcher(hotwords)
+        grammar = build_grammar(matcher.phrases) if grammar_mode else None
+        change: Dict[str, Any] = {
+            'hotwords': hotwords,
+            'grammar_mode': grammar_mode,
+            'grammar': grammar,
+            'matcher': matcher,
+            'min_confidence': self.confidence_thresholds(hotwords, self.threshold),
+            'applied': threading.Event()
+        }
+        # Open vocabulary keeps its recognizer; a grammar change needs a new one
+        if grammar != self.grammar:
+            change['recognizer_factory'] = self._recognizer_factory(grammar)
+            change['recognizer'] = change['recognizer_factory']()
+        
+        with self._reconfig_lock:
+            self._pending_reconfig = change
+        if not change['applied'].wait(timeout):
+            with self._reconfig_lock:
+                if self._pending_reconfig is change:
+                    self._pending_reconfig = None
+            return {'success': False, 'error': 'Listener did not apply the change in time'}
+        
+        self.last_reconfigure = {
+            'hotwords': hotwords,
+            'grammar': grammar_mode,
+            'recognizer_rebuilt': 'recognizer' in change,
+            'swap_ms': change['swap_ms'],
+            'reconfigure_ms': round(1000 * (time.perf_counter() - start), 2)
+        }
+        return dict(self.last_reconfigure, success=True)
+    
+    def _apply_reconfig(self) -> None:
+        """Swap in a pending config change (decode thread, between chunks)."""
+        with self._reconfig_lock:
+            change, self._pending_reconfig = self._pending_reconfig, None
+        if change is None:
+            return
+        
+        start = time.perf_counter()
+        detection = self.spotter.reconfigure(
+            change['matcher'],
+            change['min_confidence'],
+            change.get('recognizer'),
+            change.get('recognizer_factory')
+        )
+        self.hotwords = change['hotwords']
+        self.grammar_mode = change['grammar_mode']
+        self.grammar = change['grammar']
+        self.matcher = change['matcher']
+        self.wake_phrase = ', '.join(self.matcher.phrases)
+        change['swap_ms'] = round(1000 * (time.perf_counter() - start), 3)
+        change['applied'].set()
+        
+        print(f"\n🔁 Now listening for: '{self.wake_phrase}' ({change['swap_ms']} ms swap)")
+        self._handle_detection(detection)
+    
     def _process_audio(self):
         """Process audio and detect wake word."""
         print("🎧 Audio processing thread started\n")
         
         while self.is_listening:
             try:
-                data = self.audio_queue.get(timeout=1)
+                # The vosk binding only accepts bytes, so copy once here,
+                # straight out of the ring and off the audio callback
+                data = self.audio_buffer.read_bytes(self.current_block_size, timeout=1)
+                if self._pending_reconfig is not None:
+                    self._apply_reconfig()
+                if data is None:
+                    continue
+                self._publish(data)
                 
-                if self.recognizer.AcceptWaveform(data):
-                    # Final result
-                    result = json.loads(self.recognizer.Result())
-                    text = result.get('text', '').lower()
-                    
-                    if text:
-                        print(f"📝 Recognized: \"{text}\"")
-                        
-                        # Check if wake phrase is in the text
-                        if self.wake_phrase in text:
-                            print(f"\n{'='*60}")
-                            print(f"🚨 WAKE WORD DETECTED!")
-                            print(f"  Target: '{self.wake_phrase}'")
-                            print(f"  Heard: '{text}'")
-                            print(f"{'='*60}\n")
-                            
-                            if self.detection_callback:
-                                threading.Thread(
-                                    target=self.detection_callback,
-                                    daemon=True
-                                ).start()
+                lag_ms = self.lag_ms
+                self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+                if self.overflow_policy == 'degrade':
+                    self._update_degraded(lag_ms)
+                
+                gate = self.vad or (self._degrade_vad if self.degraded else None)
+                if gate is None:
+                    self._decode(data)
                 else:
-                    # Partial result
-                    partial = json.loads(self.recognizer.PartialResult())
-                    partial_text = partial.get('partial', '')
-                    if partial_text:
-                        print(f"🔄 Hearing: {partial_text}", end='\r')
+                    # Only audio that may contain speech reaches the recognizer
+                    blocks, speech_ended = gate.process(data)
+                    if self.degraded and not blocks:
+                        self.degrade_stats['skipped_blocks'] += 1
+                    for block in blocks:
+                        self._decode(block)
+                    if speech_ended:
+                        # The recognizer never sees the trailing silence, so
+                        # finalize the utterance when the gate closes
+                        self._decode(None)
+                
+                if self.adaptive_block:
+                    self._adapt_block_size(data)
                         
-            except queue.Empty:
-                continue
             except Exception as e:
                 print(f"Error processing audio: {e}")
         
         print("\n🎧 Audio processing thread stopped")
     
+    @property
+    def lag_ms(self) -> float:
+        """How far decoding trails capture: audio queued in the ring, in ms."""
+        return 1000.0 * self.audio_buffer.depth / self.sample_rate
+    
+    def _update_degraded(self, lag_ms: float) -> None:
+        """Enter or leave degrade mode, with hysteresis between the two lags."""
+        if not self.degraded and lag_ms >= self.degrade_lag_ms:
+            self.degraded = True
+            self.degrade_stats['entered'] += 1
+            self.spotter.skip_partials = True
+            print(f"\n⚠️  Decoder {lag_ms:.0f} ms behind, degrading (no partials, silence skipped)")
+        elif self.degraded and lag_ms <= self.recover_lag_ms:
+            self.degraded = False
+            self.spotter.skip_partials = False
+            print(f"\n✓ Decoder caught up ({lag_ms:.0f} ms behind)")
+    
+    def subscribe_partials(self, callback: Callable[[str], None]) -> None:
+        """
+        Receive partial transcripts from the live listener.
+        
+        Updates are rate-limited to listener.partial_interval_ms and only
+        sent when the text changes. Subscriptions survive listener restarts.
+        """
+        if callback not in self._partial_subscribers:
+            self._partial_subscribers.append(callback)
+        if self.spotter:
+            self.spotter.subscribe_partials(callback)
+    
+    def unsubscribe_partials(self, callback: Callable[[str], None]) -> None:
+        """Stop receiving partial transcripts."""
+        if callback in self._partial_subscribers:
+            self._partial_subscribers.remove(callback)
+        if self.spotter:
+            self.spotter.unsubscribe_partials(callback)
+    
+    @staticmethod
+    def _print_partial(text: str) -> None:
+        print(f"🔄 Hearing: {text}", end='\r')
+    
+    def _decode(self, data: Optional[bytes]) -> None:
+        """Feed one block to the spotter (None finalizes) and time the call."""
+        start = time.perf_counter()
+        detection = self.spotter.accept(data) if data is not None else self.spotter.flush()
+        self.decode_stats.add(time.perf_counter() - start)
+        self._handle_detection(detection)
+    
+    def _adapt_block_size(self, data: bytes) -> None:
+        """Drop to the smallest block on speech, double back up during silence."""
+        if self.vad is not None:
+            speech = self.vad.active
+        else:
+            speech = self._activity.is_speech(np.frombuffer(data, dtype=np.int16))
+        
+        if speech:
+            self.current_block_size = self.min_block_size
+        else:
+            self.current_block_size = min(self.max_block_size, self.current_block_size * 2)
+    
+    def _publish(self, data: bytes) -> None:
+        """Keep captured audio in the pre-roll buffer and pass it to live taps."""
+        with self._tap_lock:
+            self.preroll.write(np.frombuffer(data, dtype=np.int16))
+            for tap in self._taps:
+                tap(data)
+    
+    def record_to_file(self, duration: float, output_path: str,
+                       preroll_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Record from the running listener stream instead of reopening the device.
+        
+        The file starts with up to preroll_seconds of audio captured before
+        the call, then continues with duration seconds of live audio.
+        
+        Args:
+            duration: Seconds of live audio to record after the call
+            output_path: Path to save the WAV file
+            preroll_seconds: Seconds of history to include (default: all buffered)
+            
+        Returns:
+            Dict with success status and file info
+        """
+        if not self.is_listening:
+            return {'success': False, 'error': 'Listener not running'}
+        
+        if preroll_seconds is None:
+            preroll_seconds = self.preroll_seconds
+        needed = int(duration * self.sample_rate)
+        frames: List[bytes] = []
+        received = [0]
+        done = threading.Event()
+        
+        def tap(data: bytes):
+            if done.is_set():
+                return
+            frames.append(data)
+            received[0] += len(data) // 2
+            if received[0] >= needed:
+                done.set()
+        
+        # Snapshot and subscribe atomically so no block is lost or duplicated
+        with self._tap_lock:
+            preroll = self.preroll.snapshot(int(preroll_seconds * self.sample_rate))
+            self._taps.append(tap)
+        
+        try:
+            print(f"Recording {duration}s from live stream "
+                  f"(+{len(preroll) / self.sample_rate:.1f}s pre-roll) to {output_path}...")
+            done.wait(timeout=duration + 5)
+        finally:
+            with self._tap_lock:
+                self._taps.remove(tap)
+        
+        live = b''.join(frames)[:needed * 2]
+        result = write_wav(output_path, preroll.tobytes() + live, self.sample_rate)
+        if result['success']:
+            result.update({
+                'duration': round(len(live) / 2 / self.sample_rate, 2),
+                'preroll': round(len(preroll) / self.sample_rate, 2),
+                'source': 'live-stream'
+            })
+        return result
+    
+    def _handle_detection(self, detection: Optional[Dict[str, Any]]) -> None:
+        """Report a detection from the spotter and fire the callback."""
+        if not detection:
+            return
+        
+        self.last_detection = detection
+        print(f"\n{'='*60}")
+        print(f"🚨 WAKE WORD DETECTED{' (early)' if detection['early'] else ''}!")
+        print(f"  Hotword: {detection['hotword']} ('{detection['key_phrase']}')")
+        print(f"  Heard: '{detection['text']}' (confidence: {detection['confidence']})")
+        print(f"{'='*60}\n")
+        
+        if self.detection_callback:
+            self.dispatcher.dispatch(self.detection_callback, detection)
+    
     def stop_listener(self) -> Dict[str, Any]:
         """Stop listening."""
         if not self.is_listening:
@@ -156,21 +655,18 @@ class VoskWakeWordDetector:
         try:
             self.is_listening = False
             
-            if self.stream:
-                self.stream.stop()
-                self.stream.close()
-                self.stream = None
+            # Close first so a source blocked on a full ring is released
+            self.audio_buffer.close()
+            if self.source:
+                self.source.stop()
+                self.source = None
             
             if self.listener_thread:
                 self.listener_thread.join(timeout=2)
                 self.listener_thread = None
             
-            # Clear queue
-            while not self.audio_queue.empty():
-                try:
-                    self.audio_queue.get_nowait()
-                except queue.Empty:
-                    break
+            # Drop any unread audio
+            self.audio_buffer.reset()
             
             print("✓ Vosk listener stopped\n")
             
@@ -182,7 +678,13 @@ class VoskWakeWordDetector:
     def update_config(self, hotword_name: str, key_phrase: str,
                      sensitivity: Optional[float] = None,
                      module: Optional[str] = None) -> Dict[str, Any]:
-        """Update configuration."""
+        """
+        Update a hotword and save it; a running listener picks it up live.
+        
+        Returns:
+            Dict with success status, the hotword config and, while
+            listening, the result of reconfigure()
+        """
         try:
             if hotword_name not in self.config.get('hotwords', {}):
                 self.config['hotwords'][hotword_name] = {}
@@ -197,12 +699,17 @@ class VoskWakeWordDetector:
             with open(self.config_path, 'w') as f:
                 json.dump(self.config, f, indent=2)
             
-            return {
+            result = {
                 'success': True,
                 'message': f'Configuration updated for {hotword_name}',
                 'config': hotword_config
             }
             
+            # Takes effect on the running listener without a restart
+            if self.is_listening:
+                result['reconfigure'] = self.reconfigure()
+            return result
+            
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
@@ -215,7 +722,45 @@ class VoskWakeWordDetector:
             'module': 'vosk-direct',
             'key_phrase': hotword_config.get('key_phrase'),
             'sensitivity': hotword_config.get('sensitivity', 0.5),
+            'hotwords': self.hotwords if self.is_listening else
+                        active_hotwords(self.config.get('hotwords', {})),
             'sample_rate': self.sample_rate,
+            'grammar': self.grammar_mode if self.is_listening else self._default_grammar_mode(),
+            'threshold': self.threshold,
+            'min_confidence': self.spotter.min_confidence if self.spotter else None,
+            'rejected_low_confidence': self.spotter.rejected if self.spotter else 0,
+            'early_trigger': self.early_trigger,
+            'early_stats': self.spotter.early_stats if self.spotter else None,
+            'partial_subscribers': len(self.spotter.partial_subscribers) if self.spotter else
+                                   len(self._partial_subscribers),
+            'max_alternatives': self.max_alternatives,
+            'min_alternatives_share': self.min_alternatives_share,
+            'recovered_from_alternatives': self.spotter.recovered if self.spotter else 0,
+            'last_detection': self.last_detection,
+            'last_reconfigure': self.last_reconfigure,
+            'dispatcher': self.dispatcher.get_stats(),
+            'vad': self.vad.get_stats() if self.vad else None,
+            'audio_source': self.source.get_stats() if self.source else
+                            {'type': self.source_config.get('type', 'microphone')},
+            'audio_buffer': self.audio_buffer.get_stats(),
+            'backpressure': {
+                'policy': self.overflow_policy,
+                'lag_ms': round(self.lag_ms),
+                'max_lag_ms': round(self.max_lag_ms),
+                'overruns': self.audio_buffer.overruns,
+                'dropped_samples': self.audio_buffer.dropped_samples,
+                'dropped_ms': round(1000 * self.audio_buffer.dropped_samples / self.sample_rate),
+                'degraded': self.degraded,
+                'degrade_entries': self.degrade_stats['entered'],
+                'degrade_skipped_blocks': self.degrade_stats['skipped_blocks']
+            },
+            'block_size': self.current_block_size,
+            'adaptive_block': self.adaptive_block,
+            'recognizer': self.spotter.get_lifecycle_stats() if self.spotter else None,
+            'decode': self.decode_stats.get_stats(),
+            'memory': process_memory(),
+            'models': model_registry.get_stats()['models'],
+            'model_loaded': self.is_ready,
             'engine_loaded': self.recognizer is not None
         }
     
@@ -223,6 +768,3 @@ class VoskWakeWordDetector:
         """Check if system is ready."""
         return True, "Vosk direct wake word detection is ready"
 
-
-# Global instance
-vosk_detector = VoskWakeWordDetector()